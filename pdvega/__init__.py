@@ -1,7 +1,14 @@
 # flake8: noqa
-import altair as alt
+from ._lazy import alt
 from . import plotting, themes
+from ._config import set_options, get_option
+from .batch import render_many
+from .report import Report
+from .streaming import StreamingChart, QueueTransport, JSONTransport
+from .sketches import Histogram, Density, QuantileSketch
+from .instrumentation import instrument, StageTimer
 from ._core import FramePlotMethods, SeriesPlotMethods
-from .plotting import scatter_matrix, andrews_curves, parallel_coordinates, lag_plot
+from .plotting import (scatter_matrix, andrews_curves, parallel_coordinates,
+                       lag_plot, autocorrelation_plot)
 
 __version__ = '0.2.01.dev0'
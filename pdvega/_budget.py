@@ -0,0 +1,377 @@
+"""Estimate the size of embedded chart data, and reduce it to fit a budget"""
+import json
+import math
+import warnings
+
+import numpy as np
+import pandas as pd
+
+from ._utils import downsample_groups
+
+# Typical number of characters of a JSON value of each dtype kind
+FLOAT_CHARS = 18
+BOOL_CHARS = 5
+DATETIME_CHARS = 21
+TIMEDELTA_CHARS = 20
+SAMPLE_SIZE = 100
+
+RECORDS_TITLE = "Number of Records"
+
+
+def _value_chars(values):
+    """Estimate the average number of characters of values in JSON"""
+    kind = values.dtype.kind
+    if kind == "f":
+        return FLOAT_CHARS
+    if kind in "iu":
+        if len(values) == 0:
+            return 1
+        lo, hi = int(values.min()), int(values.max())
+        return max(len(str(lo)), len(str(hi)))
+    if kind == "b":
+        return BOOL_CHARS
+    if kind == "M":
+        # timezone-aware dates carry an offset
+        tz = getattr(values.dtype, "tz", None)
+        return DATETIME_CHARS + (6 if tz is not None else 0)
+    if kind == "m":
+        return TIMEDELTA_CHARS
+    if values.dtype.name == "category":
+        labels = values.cat.categories
+        if len(labels) == 0:
+            return 4
+        return 2 + sum(len(str(label)) for label in labels) / float(len(labels))
+    sample = values.iloc[:SAMPLE_SIZE]
+    if len(sample) == 0:
+        return 4
+    return 2 + sum(len(str(value)) for value in sample) / float(len(sample))
+
+
+def estimate_payload(data):
+    """Estimate the size of data once embedded in a chart as JSON records.
+
+    The estimate is computed from the dtypes and the number of rows, without
+    serializing the data.
+
+    Parameters
+    ----------
+    data : DataFrame
+        the chart data
+
+    Returns
+    -------
+    rows : int
+        the number of records
+    nbytes : int
+        the estimated number of bytes of the records
+    """
+    # braces, plus a comma between records
+    row_bytes = 3.0
+    for col in data.columns:
+        # quoted name, colon, value and separating comma
+        row_bytes += len(json.dumps(str(col))) + 2 + _value_chars(data[col])
+    return len(data), int(len(data) * row_bytes)
+
+
+def row_bytes(data):
+    """The estimated number of bytes per embedded record of data"""
+    rows, nbytes = estimate_payload(data)
+    return nbytes / float(rows) if rows else 0.0
+
+
+def parse_budget(budget):
+    """Translate a payload_budget option into (max_rows, max_bytes)"""
+    if isinstance(budget, dict):
+        unknown = set(budget) - {"rows", "bytes"}
+        if unknown:
+            raise ValueError("Unrecognized payload_budget keys: {0}"
+                             "".format(sorted(unknown)))
+        max_rows, max_bytes = budget.get("rows"), budget.get("bytes")
+    elif isinstance(budget, (int, np.integer)) and not isinstance(budget, bool):
+        max_rows, max_bytes = budget, None
+    else:
+        raise ValueError("payload_budget must be a number of rows, or a dict "
+                         "with keys 'rows' and/or 'bytes'")
+    for limit in (max_rows, max_bytes):
+        if limit is not None and limit <= 0:
+            raise ValueError("payload_budget limits must be positive")
+    return max_rows, max_bytes
+
+
+def format_bytes(nbytes):
+    for unit in ("bytes", "kB", "MB"):
+        if nbytes < 1024:
+            return "{0:.0f} {1}".format(nbytes, unit)
+        nbytes /= 1024.0
+    return "{0:.1f} GB".format(nbytes)
+
+
+def bin_params(vmin, vmax, maxbins=10, base=10, divide=(5, 2)):
+    """Compute bin boundaries the way Vega-Lite does.
+
+    This mirrors the ``bin`` routine of vega-statistics, so that pre-binned
+    data lines up with the bins Vega-Lite would have chosen.
+
+    Returns
+    -------
+    start, stop, step : float
+        the extent and width of the bins
+    """
+    span = (vmax - vmin) or abs(vmin) or 1.0
+    logb = math.log(base)
+    level = math.ceil(math.log(maxbins) / logb)
+    step = base ** math.floor(math.log(span) / logb - level + 0.5)
+    while math.ceil(span / step) > maxbins:
+        step *= base
+    for div in divide:
+        value = step / div
+        if span / value <= maxbins:
+            step = value
+    value = math.log(step)
+    precision = 0 if value >= 0 else int(-value / logb) + 1
+    eps = base ** (-precision - 1)
+    nice = math.floor(vmin / step + eps) * step
+    start = nice - step if vmin < nice else nice
+    stop = math.ceil(vmax / step) * step
+    if stop == start:
+        stop = start + step
+    return start, stop, step
+
+
+def bin_codes(values, start, stop, step):
+    """The index of the bin of each value (NaN values get -1)"""
+    nbins = max(1, int(round((stop - start) / step)))
+    with np.errstate(invalid="ignore"):
+        codes = np.floor((values - start) / step + 1E-9)
+    finite = np.isfinite(codes)
+    codes = np.where(finite, np.clip(codes, 0, nbins - 1), -1)
+    return codes.astype(np.int64)
+
+
+def _column(data, field):
+    """The label of the column of data named field in the spec, or None"""
+    for col in data.columns:
+        if str(col) == field:
+            return col
+    return None
+
+
+def _group_fields(spec, data):
+    """The columns of data identifying groups: nominal channels and facets"""
+    fields = []
+    for channel, encoding in spec.get("encoding", {}).items():
+        if channel in ("x", "y", "x2", "y2") or not isinstance(encoding, dict):
+            continue
+        field = encoding.get("field")
+        if field is None or encoding.get("aggregate") is not None:
+            continue
+        if channel in ("row", "column") or encoding.get("type") in ("nominal", "ordinal"):
+            col = _column(data, field)
+            if col is not None and col not in fields:
+                fields.append(col)
+    return fields
+
+
+def _unique_name(name, data):
+    while name in data.columns:
+        name = "_" + name
+    return name
+
+
+def _binned(encoding, start, stop, step):
+    encoding = dict(encoding)
+    encoding["bin"] = {"extent": [start, stop], "step": step}
+    return encoding
+
+
+def prebin_hist(chart, data, spec, max_rows):
+    """Bin a histogram in pandas, embedding one record per bin and group"""
+    encoding = spec.get("encoding", {})
+    x, y = encoding.get("x", {}), encoding.get("y", {})
+    if "bin" not in x or y.get("aggregate") != "count":
+        return None
+    field = _column(data, x.get("field"))
+    if field is None or data[field].dtype.kind not in "iuf":
+        return None
+    values = data[field].values.astype(float)
+    finite = values[np.isfinite(values)]
+    if len(finite) == 0:
+        return None
+    maxbins = x["bin"].get("maxbins", 10) if isinstance(x["bin"], dict) else 10
+    start, stop, step = bin_params(finite.min(), finite.max(), maxbins)
+    centers = start + step * (bin_codes(values, start, stop, step) + 0.5)
+
+    keys = _group_fields(spec, data)
+    count = _unique_name("count", data)
+    frame = pd.DataFrame({field: centers}, index=data.index)
+    for key in keys:
+        frame[key] = data[key]
+    frame = frame[np.isfinite(values)]
+    binned = frame.groupby(keys + [field], sort=False, observed=True).size()
+    binned = binned.rename(count).reset_index()
+
+    chart.encoding["x"] = _binned(x, start, stop, step)
+    y = {k: v for k, v in y.items() if k != "aggregate"}
+    y.update(field=count, aggregate="sum", type="quantitative")
+    y.setdefault("title", RECORDS_TITLE)
+    chart.encoding["y"] = y
+    return binned, "pre-binned the histogram"
+
+
+def grid_heatmap(chart, data, spec, max_rows):
+    """Aggregate a heatmap in pandas, embedding one record per cell and group"""
+    encoding = spec.get("encoding", {})
+    x, y, color = (encoding.get(channel, {}) for channel in ("x", "y", "color"))
+    if "bin" not in x or "bin" not in y or "aggregate" not in color:
+        return None
+    keys = _group_fields(spec, data)
+    cells = [_column(data, x.get("field")), _column(data, y.get("field"))]
+    if any(col is None or data[col].dtype.kind not in "iuf" for col in cells):
+        return None
+    frame = pd.DataFrame(index=data.index)
+    finite = np.ones(len(data), dtype=bool)
+    for channel, enc, col in (("x", x, cells[0]), ("y", y, cells[1])):
+        values = data[col].values.astype(float)
+        good = np.isfinite(values)
+        if not good.any():
+            return None
+        finite &= good
+        maxbins = enc["bin"].get("maxbins", 10) if isinstance(enc["bin"], dict) else 10
+        start, stop, step = bin_params(values[good].min(), values[good].max(), maxbins)
+        frame[col] = start + step * (bin_codes(values, start, stop, step) + 0.5)
+        chart.encoding[channel] = _binned(enc, start, stop, step)
+    for key in keys:
+        frame[key] = data[key]
+
+    cells = keys + cells
+    if color["aggregate"] == "count" and "field" not in color:
+        field = _unique_name("count", data)
+        grouped = frame[finite].groupby(cells, sort=False, observed=True)
+        reduced = grouped.size().rename(field).reset_index()
+        color = dict(color, field=field, aggregate="sum", type="quantitative")
+        color.setdefault("title", RECORDS_TITLE)
+        chart.encoding["color"] = color
+    else:
+        field = _column(data, color.get("field"))
+        if field is None:
+            return None
+        frame[field] = data[field]
+        grouped = frame[finite].groupby(cells, sort=False, observed=True)[field]
+        reduced = grouped.agg(color["aggregate"]).reset_index()
+    return reduced, "aggregated the heatmap cells"
+
+
+def grid_scatter(chart, data, spec, max_rows):
+    """Replace the points of a scatter plot by the centroids of grid cells.
+
+    Each group of points is binned on a square grid sized to fit the
+    budget, and each occupied cell is drawn as a single point at the mean
+    position of its points, sized by their number.
+    """
+    encoding = spec.get("encoding", {})
+    x, y = encoding.get("x", {}), encoding.get("y", {})
+    fields = [_column(data, x.get("field")), _column(data, y.get("field"))]
+    if any(field is None or data[field].dtype.kind not in "iuf"
+           for field in fields):
+        return None
+    keys = _group_fields(spec, data)
+    ngroups = max(1, len(data.groupby(keys, observed=True))) if keys else 1
+    side = max(1, int(math.sqrt(max_rows / float(ngroups))))
+
+    codes = np.zeros(len(data), dtype=np.int64)
+    finite = np.ones(len(data), dtype=bool)
+    for field in fields:
+        values = data[field].values.astype(float)
+        good = np.isfinite(values)
+        if not good.any():
+            return None
+        finite &= good
+        lo, hi = values[good].min(), values[good].max()
+        with np.errstate(invalid="ignore"):
+            cell = np.floor((values - lo) / ((hi - lo) or 1.0) * side)
+        codes = codes * side + np.clip(np.nan_to_num(cell), 0, side - 1).astype(np.int64)
+
+    cell = _unique_name("cell", data)
+    count = _unique_name("count", data)
+    frame = data[finite].copy()
+    frame[cell] = codes[finite]
+    grouped = frame.groupby(keys + [cell], sort=False, observed=True)
+    numeric = [col for col in data.columns
+               if col not in keys and data[col].dtype.kind in "iuf"]
+    reduced = grouped[numeric].mean()
+    reduced[count] = grouped.size()
+    reduced = reduced.reset_index().drop(cell, axis=1)
+
+    if "size" not in encoding:
+        chart.encoding["size"] = {"field": count, "type": "quantitative",
+                                  "title": RECORDS_TITLE}
+    return reduced, "aggregated the points on a {0}x{0} grid".format(side)
+
+
+def downsample_line(chart, data, spec, max_rows):
+    """Downsample each series of a line or area chart"""
+    keys = _group_fields(spec, data)
+    ngroups = max(1, len(data.groupby(keys, observed=True))) if keys else 1
+    max_points = max(2, max_rows // ngroups)
+    return (downsample_groups(data, keys, max_points),
+            "downsampled each series to {0} points".format(max_points))
+
+
+REDUCTIONS = {
+    "hist": prebin_hist,
+    "heatmap": grid_heatmap,
+    "scatter": grid_scatter,
+    "line": downsample_line,
+    "area": downsample_line,
+}
+
+
+def apply_budget(chart, data, spec, budget, kind=None):
+    """Reduce data to fit within budget, warning about any reduction.
+
+    Parameters
+    ----------
+    chart : alt.Chart
+        the chart, whose encodings are updated in-place if needed
+    data : DataFrame
+        the chart data
+    spec : dict
+        the Vega-Lite specification of chart (without data)
+    budget : int or dict
+        the payload_budget option (see ``parse_budget``)
+    kind : string, optional
+        the kind of chart, which selects the reduction strategy
+
+    Returns
+    -------
+    data : DataFrame
+        the data, reduced if needed
+    """
+    max_rows, max_bytes = parse_budget(budget)
+    rows, nbytes = estimate_payload(data)
+    if ((max_rows is None or rows <= max_rows) and
+            (max_bytes is None or nbytes <= max_bytes)):
+        return data
+
+    target = rows if max_rows is None else max_rows
+    if max_bytes is not None:
+        target = min(target, int(max_bytes / row_bytes(data)))
+    target = max(1, target)
+
+    message = ("payload_budget: the data of this {0} chart has {1} rows "
+               "(~{2})".format(kind or "", rows, format_bytes(nbytes)))
+    reduce = REDUCTIONS.get(kind)
+    result = reduce(chart, data, spec, target) if reduce else None
+    if result is None:
+        warnings.warn(message + ", which exceeds the budget, and no "
+                      "reduction is available for it")
+        return data
+
+    data, action = result
+    rows, nbytes = estimate_payload(data)
+    message += "; {0}, leaving {1} rows (~{2})".format(action, rows,
+                                                       format_bytes(nbytes))
+    if target < rows:
+        message += ", which still exceeds the budget"
+    warnings.warn(message)
+    return data
@@ -0,0 +1,88 @@
+"""Global options for pdvega"""
+
+_options = {
+    "prune_columns": True,
+    "precision": None,
+    "quantize": None,
+    "dictionary_encode": False,
+    "temporal_encoding": None,
+    "payload_budget": None,
+    "builder": "altair",
+    "explicit_scales": False,
+}
+
+
+def get_option(key):
+    """Return the current value of the pdvega option ``key``"""
+    if key not in _options:
+        raise KeyError("Unrecognized pdvega option: {0!r}".format(key))
+    return _options[key]
+
+
+class set_options(object):
+    """Set pdvega options globally, or temporarily within a ``with`` block.
+
+    Available options:
+
+    - ``prune_columns`` (default: True): drop every column of the chart data
+      that is not referenced by the chart specification before it is
+      embedded in the chart.
+    - ``precision`` (default: None): if an integer, round floating-point
+      columns to this many decimal places. If ``'auto'``, choose the number
+      of decimals for each column from its range and the number of pixels
+      it spans on screen.
+    - ``quantize`` (default: None): if a number, snap floating-point columns
+      to a grid with this spacing. If ``'auto'``, use a grid with one step
+      per pixel spanned by the column.
+    - ``dictionary_encode`` (default: False): replace the values of nominal
+      and ordinal fields by small integer codes, and join the labels back
+      in the browser with a Vega-Lite lookup transform.
+    - ``temporal_encoding`` (default: None): if ``'epoch'``, embed datetime
+      columns as integer milliseconds since the Unix epoch rather than as
+      date strings. Timezone-aware values are converted to UTC instants and
+      displayed in the viewer's local time; timezone-naive values are
+      treated as UTC and drawn on a UTC scale, so they display unchanged.
+    - ``payload_budget`` (default: None): the maximum size of the embedded
+      data, either as a number of rows or as a dict with keys ``'rows'``
+      and/or ``'bytes'``. The size is estimated from the dtypes and number
+      of rows. Data exceeding the budget is reduced where the chart kind
+      allows it: histograms and heatmaps are binned before embedding,
+      scatter plots are aggregated on a grid, and line and area series are
+      downsampled. A warning reports what was done.
+    - ``builder`` (default: 'altair'): if ``'dict'``, plotting methods build
+      the Vega-Lite specification as plain dictionaries and return a
+      ``VegaLiteSpec`` rather than an ``alt.Chart``. This skips the
+      construction of altair objects. Use its ``to_chart`` method to obtain
+      an ``alt.Chart``.
+    - ``explicit_scales`` (default: False): write the domains of the
+      quantitative x and y scales into the specification, made nice as
+      Vega would, so that the browser does not scan the data for their
+      extents; and draw the points of line and area charts in data order
+      when the data is already sorted, so that the browser does not sort
+      them.
+
+    Each option can also be given as a keyword to an individual plotting
+    method, in which case it overrides the global value for that chart.
+
+    Examples
+    --------
+    >>> pdvega.set_options(prune_columns=False)  # doctest: +SKIP
+    >>> with pdvega.set_options(prune_columns=False):  # doctest: +SKIP
+    ...     chart = df.vgplot.scatter('x', 'y')
+    """
+    def __init__(self, **kwds):
+        for key in kwds:
+            get_option(key)
+        self._old = {key: _options[key] for key in kwds}
+        _options.update(kwds)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        _options.update(self._old)
+
+
+def pop_options(kwds):
+    """Pop any option keywords from kwds, filling in the global defaults"""
+    return {key: kwds.pop(key, value) for key, value in _options.items()}
@@ -1,13 +1,28 @@
 import numpy as np
 import pandas as pd
-import altair as alt
+from ._lazy import alt
 
 from ._utils import (
     infer_vegalite_type,
     unpivot_frame,
     warn_if_keywords_unused,
     validate_aggregation,
+    parallel_map,
+    downsample_groups,
+    top_k_categories,
+    aggregate_duplicates,
+    validate_stack,
+    stack_offsets,
+    box_stats,
+    BOX_STATS,
+    series_count,
 )
+from ._config import get_option, pop_options
+from ._data import prepare_chart, _item
+from ._spec import as_chart
+from ._validation import chart_class
+from . import _spec
+from .instrumentation import stage, traced
 from ._pandas_internals import (
     PandasObject,
     register_dataframe_accessor,
@@ -15,22 +30,100 @@ from ._pandas_internals import (
 )
 
 
-def _x(x, df, ordinal_threshold=6, **kwargs):
-    return alt.X(
+def _x(x, df, ordinal_threshold=6, api=alt, **kwargs):
+    return api.X(
         field=x,
         type=infer_vegalite_type(df[x], ordinal_threshold=ordinal_threshold),
         **kwargs
     )
 
 
-def _y(y, df, ordinal_threshold=6, **kwargs):
-    return alt.Y(
+def _y(y, df, ordinal_threshold=6, api=alt, **kwargs):
+    return api.Y(
         field=y,
         type=infer_vegalite_type(df[y], ordinal_threshold=ordinal_threshold),
         **kwargs
     )
 
 
+def _builder(kwds):
+    """The namespace used to build charts: altair, or the dict builder.
+
+    The ``builder`` option is read but not popped from kwds, as it is popped
+    with the other options by ``prepare_chart``.
+    """
+    builder = kwds.get("builder", get_option("builder"))
+    if builder == "altair":
+        return alt
+    elif builder == "dict":
+        return _spec
+    raise ValueError("builder must be 'altair' or 'dict'; got {0!r}"
+                     "".format(builder))
+
+
+HIST_MARKS = {
+    "bar": "bar",
+    "barstacked": "bar",
+    "stepfilled": {"type": "area", "interpolate": "step"},
+    "step": {"type": "line", "interpolate": "step"},
+}
+
+
+def _hist_mark(histtype):
+    """The mark drawing a histogram of the given histtype"""
+    if histtype not in HIST_MARKS:
+        raise ValueError("histtype '{0}' is not recognized" "".format(histtype))
+    mark = HIST_MARKS[histtype]
+    return dict(mark) if isinstance(mark, dict) else mark
+
+
+def _category_x(x, df, top_k, api=alt):
+    """The x encoding of a bar chart, whose rows may be limited with top_k"""
+    type = infer_vegalite_type(df[x], ordinal_threshold=50)
+    if top_k is None:
+        return api.X(x, type=type)
+    # keep the categories in data order, with the remainder last
+    if type not in ("nominal", "ordinal"):
+        type = "ordinal"
+    return api.X(x, type=type, sort=None)
+
+
+def _stacked_y(df, value_name, stack, precomputed=False, api=alt):
+    """The y encodings of a chart stacked with the given offset.
+
+    If precomputed, the chart data holds the offsets computed by
+    ``stack_offsets``, which are drawn with y and y2 encodings.
+    """
+    if not precomputed or stack is None:
+        return {"y": api.Y(value_name, type=infer_vegalite_type(df[value_name]),
+                           stack=stack)}
+    kwds = {"axis": {"format": "%"}} if stack == "normalize" else {}
+    return {
+        "y": api.Y(value_name + "_end", type="quantitative", stack=None,
+                   title=value_name, **kwds),
+        "y2": api.Y2(value_name + "_start", type="quantitative"),
+    }
+
+
+def _swap_xy(encoding):
+    """Swap the x and y (and x2 and y2) channels of an encoding in-place"""
+    for a, b in [("x", "y"), ("x2", "y2")]:
+        values = {a: _item(encoding, b), b: _item(encoding, a)}
+        for channel, value in values.items():
+            if value is alt.Undefined and isinstance(encoding, dict):
+                encoding.pop(channel, None)
+            else:
+                encoding[channel] = value
+
+
+def _group_keys(by, *keys):
+    """The columns identifying a series, optionally within groups ``by``"""
+    keys = list(keys)
+    if by is not None:
+        keys.insert(0, by)
+    return keys
+
+
 class BasePlotMethods(PandasObject):
 
     def __init__(self, data):
@@ -39,7 +132,8 @@ class BasePlotMethods(PandasObject):
     def __call__(self, kind, *args, **kwargs):
         raise NotImplementedError()
 
-    def _plot(self, data=None, width=450, height=300, title=None, figsize=None, dpi=75):
+    def _plot(self, data=None, width=450, height=300, title=None, figsize=None, dpi=75,
+              api=alt):
         if data is None:
             data = self._data
 
@@ -51,9 +145,73 @@ class BasePlotMethods(PandasObject):
             width = 0.8 * dpi * width_inches
             height = 0.8 * dpi * height_inches
 
-        chart = alt.Chart(data=data).properties(width=width, height=height, title=title)
+        Chart = chart_class() if api is alt else api.Chart
+        chart = Chart(data=data).properties(width=width, height=height, title=title)
+        return chart
+
+    def _box(self, stats, outliers, var_name, value_name, vert=True, alpha=None,
+             width=450, height=300, ax=None, kwds=None):
+        """Draw box plots from their statistics.
+
+        stats holds one row per box, with the ``var_name`` of the series and
+        the statistics computed by ``box_stats``, and outliers holds one row
+        per outlier, with its ``var_name`` and ``value_name``. The box,
+        whiskers, median and outliers are drawn as layers.
+        """
+        api = _builder(kwds)
+        title = kwds.pop("title", "")
+        props = dict(api=api, width=width, height=height,
+                     figsize=kwds.pop("figsize", None), dpi=kwds.pop("dpi", None))
+        options = pop_options(kwds)
+
+        def encode(chart, y, y2=None):
+            encoding = {
+                "x": api.X(var_name, type="nominal"),
+                "y": api.Y(y, type="quantitative", title=value_name,
+                           scale=api.Scale(zero=False)),
+            }
+            if y2 is not None:
+                encoding["y2"] = api.Y2(y2, type="quantitative")
+            return chart.encode(**encoding)
+
+        with stage("build"):
+            layers = [
+                encode(self._plot(data=stats, **props).mark_rule(), "lower", "upper"),
+                encode(self._plot(data=stats, **props).mark_bar(size=14), "q1", "q3"),
+                encode(self._plot(data=stats, **props).mark_tick(size=14, color="white"),
+                       "median"),
+            ]
+            if len(outliers):
+                layers.append(encode(self._plot(data=outliers, **props).mark_point(),
+                                     value_name))
+            if alpha is not None:
+                assert 0 <= alpha <= 1
+                layers[1:2] = [layers[1].encode(opacity=api.value(alpha))]
+            if not vert:
+                for layer in layers:
+                    _swap_xy(layer.encoding)
+
+        layers = [prepare_chart(layer, dict(options), kind="box") for layer in layers]
+        chart = alt.layer(*[as_chart(layer) for layer in layers])
+        if title:
+            chart = chart.properties(title=title)
+
+        if ax is not None:
+            return as_chart(ax) + chart
+
+        warn_if_keywords_unused("box", kwds)
         return chart
 
+    def _facet(self, chart, data, by, facet="row", api=alt):
+        """Facet chart into panels by the values of the column ``by``"""
+        if by is None:
+            return chart
+        channels = {"row": api.Row, "column": api.Column}
+        if facet not in channels:
+            raise ValueError("facet must be 'row' or 'column'")
+        channel = channels[facet](field=by, type=infer_vegalite_type(data[by]))
+        return chart.encode(**{facet: channel})
+
 
 @register_series_accessor("vgplot")
 class SeriesPlotMethods(BasePlotMethods):
@@ -68,6 +226,7 @@ class SeriesPlotMethods(BasePlotMethods):
     >>> s.vgplot.hist()  # doctest: +SKIP
     >>> s.vgplot.kde()  # doctest: +SKIP
     >>> s.vgplot.density()  # doctest: +SKIP
+    >>> s.vgplot.box()  # doctest: +SKIP
 
     Plotting methods can also be accessed by calling the accessor as a method
     with the ``kind`` argument: ``s.vgplot(kind='line', **kwds)``
@@ -83,6 +242,7 @@ class SeriesPlotMethods(BasePlotMethods):
             )
         return plot_method(**kwargs)
 
+    @traced("line")
     def line(self, alpha=None, width=450, height=300, ax=None, **kwds):
         """Line plot for Series data
 
@@ -104,32 +264,41 @@ class SeriesPlotMethods(BasePlotMethods):
         chart : altair.Chart
             The altair plot representation
         """
-        df = self._data.reset_index()
-        df.columns = map(str, df.columns)
+        with stage("reshape", self._data) as timer:
+            df = self._data.reset_index()
+            df.columns = map(str, df.columns)
+            timer.output(df)
         x, y = df.columns
 
-        chart = self._plot(
-            data=df,
-            width=width,
-            height=height,
-            title=kwds.pop("title", ""),
-            figsize=kwds.pop("figsize", None),
-            dpi=kwds.pop("dpi", None),
-        )
+        api = _builder(kwds)
+        with stage("build"):
+            chart = self._plot(
+                api=api,
+                data=df,
+                width=width,
+                height=height,
+                title=kwds.pop("title", ""),
+                figsize=kwds.pop("figsize", None),
+                dpi=kwds.pop("dpi", None),
+            )
+
+            chart = chart.mark_line().encode(x=_x(x, df, api=api), y=_y(y, df, api=api))
 
-        chart = chart.mark_line().encode(x=_x(x, df), y=_y(y, df))
+            if alpha is not None:
+                assert 0 <= alpha <= 1
+                chart = chart.encode(opacity=api.value(alpha))
 
-        if alpha is not None:
-            assert 0 <= alpha <= 1
-            chart = chart.encode(opacity=alt.value(alpha))
+        chart = prepare_chart(chart, kwds, kind="line")
 
         if ax is not None:
-            return ax + chart
+            return as_chart(ax) + as_chart(chart)
 
         warn_if_keywords_unused("line", kwds)
         return chart
 
-    def area(self, alpha=None, width=450, height=300, ax=None, **kwds):
+    @traced("area")
+    def area(self, alpha=None, width=450, height=300, ax=None, aggregate=None,
+             **kwds):
         """Area plot for Series data
 
         >>> series.vgplot.area()  # doctest: +SKIP
@@ -144,38 +313,53 @@ class SeriesPlotMethods(BasePlotMethods):
             the height of the plot in pixels
         ax: altair.Chart, optional
             chart to be overlayed with this vis (convinience method for `chart1 + chart2`)
+        aggregate : string, optional
+            one of 'sum', 'mean', 'median', 'min', 'max' or 'count'. If
+            specified, the rows sharing an x value are combined with this
+            aggregation before plotting, leaving one row per x value.
 
         Returns
         -------
         chart : alt.Chart
             altair chart representation
         """
-        df = self._data.reset_index()
-        df.columns = map(str, df.columns)
-        x, y = df.columns
+        with stage("reshape", self._data) as timer:
+            df = self._data.reset_index()
+            df.columns = map(str, df.columns)
+            x, y = df.columns
+            if aggregate is not None:
+                df = aggregate_duplicates(df, [x], y, aggregate)
+            timer.output(df)
+
+        api = _builder(kwds)
+        with stage("build"):
+            chart = self._plot(
+                api=api,
+                data=df,
+                width=width,
+                height=height,
+                title=kwds.pop("title", ""),
+                figsize=kwds.pop("figsize", None),
+                dpi=kwds.pop("dpi", None),
+            ).mark_area().encode(
+                x=_x(x, df, api=api), y=_y(y, df, api=api)
+            )
 
-        chart = self._plot(
-            data=df,
-            width=width,
-            height=height,
-            title=kwds.pop("title", ""),
-            figsize=kwds.pop("figsize", None),
-            dpi=kwds.pop("dpi", None),
-        ).mark_area().encode(
-            x=_x(x, df), y=_y(y, df)
-        )
+            if alpha is not None:
+                assert 0 <= alpha <= 1
+                chart = chart.encode(opacity=api.value(alpha))
 
-        if alpha is not None:
-            assert 0 <= alpha <= 1
-            chart = chart.encode(opacity=alt.value(alpha))
+        chart = prepare_chart(chart, kwds, kind="area")
 
         if ax is not None:
-            return ax + chart
+            return as_chart(ax) + as_chart(chart)
 
         warn_if_keywords_unused("area", kwds)
         return chart
 
-    def bar(self, alpha=None, width=450, height=300, ax=None, **kwds):
+    @traced("bar")
+    def bar(self, alpha=None, width=450, height=300, ax=None, top_k=None,
+            other_label="other", aggregate=None, **kwds):
         """Bar plot for Series data
 
         >>> series.vgplot.bar()  # doctest: +SKIP
@@ -190,6 +374,16 @@ class SeriesPlotMethods(BasePlotMethods):
             the height of the plot in pixels
         ax: altair.Chart, optional
             chart to be overlayed with this vis (convinience method for `chart1 + chart2`)
+        top_k : integer, optional
+            if specified, draw only the top_k categories with the largest
+            total value, summing the others into a single bar.
+        other_label : string, optional
+            the label of the bar summing the categories beyond ``top_k``
+            (default: 'other')
+        aggregate : string, optional
+            one of 'sum', 'mean', 'median', 'min', 'max' or 'count'. If
+            specified, the rows sharing an x value are combined with this
+            aggregation before plotting, leaving one row per bar.
 
         Returns
         -------
@@ -197,31 +391,47 @@ class SeriesPlotMethods(BasePlotMethods):
             altair chart representation
         """
 
-        df = self._data.reset_index()
-        df.columns = map(str, df.columns)
-        x, y = df.columns
+        with stage("reshape", self._data) as timer:
+            df = self._data.reset_index()
+            df.columns = map(str, df.columns)
+            x, y = df.columns
+            if aggregate is not None:
+                df = aggregate_duplicates(df, [x], y, aggregate)
+            if top_k is not None:
+                df = top_k_categories(df, x, y, top_k, other_label)
+            timer.output(df)
+
+        api = _builder(kwds)
+        with stage("build"):
+            if top_k is None:
+                xenc = _x(x, df, api=api)
+            else:
+                xenc = _category_x(x, df, top_k, api=api)
+            chart = self._plot(
+                api=api,
+                data=df,
+                width=width,
+                height=height,
+                title=kwds.pop("title", ""),
+                figsize=kwds.pop("figsize", None),
+                dpi=kwds.pop("dpi", None),
+            ).mark_bar().encode(
+                x=xenc, y=_y(y, df, api=api)
+            )
 
-        chart = self._plot(
-            data=df,
-            width=width,
-            height=height,
-            title=kwds.pop("title", ""),
-            figsize=kwds.pop("figsize", None),
-            dpi=kwds.pop("dpi", None),
-        ).mark_bar().encode(
-            x=_x(x, df), y=_y(y, df)
-        )
+            if alpha is not None:
+                assert 0 <= alpha <= 1
+                chart = chart.encode(opacity=api.value(alpha))
 
-        if alpha is not None:
-            assert 0 <= alpha <= 1
-            chart = chart.encode(opacity=alt.value(alpha))
+        chart = prepare_chart(chart, kwds, kind="bar")
 
         if ax is not None:
-            return ax + chart
+            return as_chart(ax) + as_chart(chart)
 
         warn_if_keywords_unused("bar", kwds)
         return chart
 
+    @traced("barh")
     def barh(self, alpha=None, width=450, height=300, ax=None, **kwds):
         """Horizontal bar plot for Series data
 
@@ -245,13 +455,13 @@ class SeriesPlotMethods(BasePlotMethods):
         """
         chart = self.bar(alpha=alpha, width=width, height=height, **kwds)
 
-        enc = chart.encoding
-        enc["x"], enc["y"] = enc["y"], enc["x"]
+        _swap_xy(chart.encoding)
 
         if ax is not None:
-            return ax + chart
+            return as_chart(ax) + as_chart(chart)
         return chart
 
+    @traced("hist")
     def hist(
         self,
         bins=10,
@@ -286,47 +496,45 @@ class SeriesPlotMethods(BasePlotMethods):
         chart : alt.Chart
             altair chart representation
         """
-        df = self._data.to_frame().reset_index(drop=False)
-        df.columns = df.columns.astype(str)
+        with stage("reshape", self._data) as timer:
+            df = self._data.to_frame().reset_index(drop=False)
+            df.columns = df.columns.astype(str)
+            timer.output(df)
         y, x = df.columns
 
-        marks = {
-            "bar": "bar",
-            "barstacked": "bar",
-            "stepfilled": {"type": "area", "interpolate": "step"},
-            "step": {"type": "line", "interpolate": "step"},
-        }
-
-        if histtype in marks:
-            mark = marks[histtype]
-        else:
-            raise ValueError("histtype '{0}' is not recognized" "".format(histtype))
+        mark = _hist_mark(histtype)
+
+        api = _builder(kwds)
+        with stage("build"):
+            chart = self._plot(
+                api=api,
+                data=df,
+                width=width,
+                height=height,
+                title=kwds.pop("title", ""),
+                figsize=kwds.pop("figsize", None),
+                dpi=kwds.pop("dpi", None),
+            )
 
-        chart = self._plot(
-            data=df,
-            width=width,
-            height=height,
-            title=kwds.pop("title", ""),
-            figsize=kwds.pop("figsize", None),
-            dpi=kwds.pop("dpi", None),
-        )
+            chart.mark = mark
+            chart = chart.encode(
+                x=_x(x, df, bin={"maxbins": bins}, api=api), 
+                y=_y(y, df, aggregate="count", api=api)
+            )
 
-        chart.mark = mark
-        chart = chart.encode(
-            x=_x(x, df, bin={"maxbins": bins}), 
-            y=_y(y, df, aggregate="count")
-        )
+            if alpha is not None:
+                assert 0 <= alpha <= 1
+                chart = chart.encode(opacity=api.value(alpha))
 
-        if alpha is not None:
-            assert 0 <= alpha <= 1
-            chart = chart.encode(opacity=alt.value(alpha))
+        chart = prepare_chart(chart, kwds, kind="hist")
 
         if ax is not None:
-            return ax + chart
+            return as_chart(ax) + as_chart(chart)
 
         warn_if_keywords_unused("hist", kwds)
         return chart
 
+    @traced("kde")
     def kde(self, bw_method=None, alpha=None, width=450, height=300, ax=None, **kwds):
         """Kernel Density Estimation plot for Series data
 
@@ -359,9 +567,11 @@ class SeriesPlotMethods(BasePlotMethods):
         trange = tmax - tmin
         t = np.linspace(tmin - 0.5 * trange, tmax + 0.5 * trange, 1000)
 
-        kde_ser = pd.Series(
-            gaussian_kde(data, bw_method=bw_method).evaluate(t), index=t, name=data.name
-        )
+        with stage("kde", data) as timer:
+            kde_ser = pd.Series(
+                gaussian_kde(data, bw_method=bw_method).evaluate(t), index=t, name=data.name
+            )
+            timer.output(kde_ser)
 
         kde_ser.index.name = " "
         f = self.__class__(kde_ser)
@@ -369,6 +579,53 @@ class SeriesPlotMethods(BasePlotMethods):
 
     density = kde
 
+    @traced("box")
+    def box(self, whis=1.5, max_outliers=100, vert=True, alpha=None, width=450,
+            height=300, ax=None, **kwds):
+        """Box plot for Series data
+
+        The quartiles, whiskers and outliers are computed in pandas, so that
+        the chart embeds a single row for the box, plus its outliers.
+
+        >>> series.vgplot.box()  # doctest: +SKIP
+
+        Parameters
+        ----------
+        whis : float, optional
+            the reach of the whiskers beyond the box, in interquartile ranges
+            (default: 1.5). Values beyond the whiskers are drawn as outliers.
+        max_outliers : int, optional
+            the maximum number of outliers to draw (default: 100). If there
+            are more, a sample evenly spaced in rank is drawn.
+        vert : bool, optional
+            if True (default), draw a vertical box; otherwise a horizontal one
+        alpha : float, optional
+            transparency level, 0 <= alpha <= 1
+        width : int, optional
+            the width of the plot in pixels
+        height : int, optional
+            the height of the plot in pixels
+        ax: altair.Chart, optional
+            chart to be overlayed with this vis (convinience method for `chart1 + chart2`)
+
+        Returns
+        -------
+        chart : alt.LayerChart
+            altair chart representation
+        """
+        data = self._data
+        name = "value" if data.name is None else str(data.name)
+        with stage("box", data) as timer:
+            stats, outliers = box_stats(data.values, whis=whis,
+                                        max_outliers=max_outliers)
+            stats = pd.DataFrame([dict(stats or {}, variable=name)],
+                                 columns=["variable"] + list(BOX_STATS))
+            outliers = pd.DataFrame({"variable": name, "value": outliers},
+                                    columns=["variable", "value"])
+            timer.output(stats)
+        return self._box(stats, outliers, "variable", "value", vert=vert, alpha=alpha,
+                         width=width, height=height, ax=ax, kwds=kwds)
+
 
 @register_dataframe_accessor("vgplot")
 class FramePlotMethods(BasePlotMethods):
@@ -383,6 +640,7 @@ class FramePlotMethods(BasePlotMethods):
     >>> df.vgplot.hist()  # doctest: +SKIP
     >>> df.vgplot.kde()  # doctest: +SKIP
     >>> df.vgplot.density()  # doctest: +SKIP
+    >>> df.vgplot.box()  # doctest: +SKIP
     >>> df.vgplot.scatter(x, y)  # doctest: +SKIP
     >>> df.vgplot.hexbin(x, y)  # doctest: +SKIP
 
@@ -400,6 +658,7 @@ class FramePlotMethods(BasePlotMethods):
             )
         return plot_method(x=x, y=y, **kwargs)
 
+    @traced("line")
     def line(
         self,
         x=None,
@@ -410,6 +669,10 @@ class FramePlotMethods(BasePlotMethods):
         width=450,
         height=300,
         ax=None,
+        by=None,
+        facet="row",
+        max_points=None,
+        downsample="stride",
         **kwds
     ):
         """Line plot for DataFrame data
@@ -436,6 +699,19 @@ class FramePlotMethods(BasePlotMethods):
             the height of the plot in pixels
         ax: altair.Chart, optional
             chart to be overlayed with this vis (convinience method for `chart1 + chart2`)
+        by : string, optional
+            the column by which to group the data. The groups are drawn as
+            the panels of a single faceted chart.
+        facet : string, {'row', 'column'}
+            whether to arrange the panels of a grouped chart in rows (default)
+            or columns
+        max_points : integer, optional
+            if specified, reduce each series within each group to at most
+            this many points before plotting.
+        downsample : string, {'stride', 'mean'}
+            the method used to reduce series to ``max_points``: 'stride'
+            (default) keeps every n-th point, while 'mean' averages
+            consecutive points.
 
         Returns
         -------
@@ -444,46 +720,76 @@ class FramePlotMethods(BasePlotMethods):
         """
         use_order = (x is not None)
 
-        if use_order:
-            df = self._data.reset_index()
-            order = df.columns[0]
-            df = unpivot_frame(
-                df, x=(x, order), y=y, var_name=var_name, value_name=value_name
-            )
-        else:
-            df = unpivot_frame(
-                self._data, x=x, y=y, var_name=var_name, value_name=value_name
+        with stage("reshape", self._data) as timer:
+            if use_order:
+                df = self._data.reset_index()
+                order = df.columns[0]
+                df = unpivot_frame(
+                    df, x=(x, order), y=y, var_name=var_name, value_name=value_name,
+                    by=by,
+                )
+            else:
+                df = unpivot_frame(
+                    self._data, x=x, y=y, var_name=var_name, value_name=value_name,
+                    by=by,
+                )
+                x = df.columns[0]
+
+            if max_points is not None:
+                df = downsample_groups(
+                    df, _group_keys(by, var_name), max_points, method=downsample
+                )
+            timer.output(df)
+
+        api = _builder(kwds)
+        with stage("build"):
+            chart = self._plot(
+                api=api,
+                data=df,
+                width=width,
+                height=height,
+                title=kwds.pop("title", ""),
+                figsize=kwds.pop("figsize", None),
+                dpi=kwds.pop("dpi", None),
+            ).mark_line().encode(
+                x=_x(x, df, api=api), y=_y(value_name, df, api=api), color=api.Color(var_name, type="nominal")
             )
-            x = df.columns[0]
 
-        chart = self._plot(
-            data=df,
-            width=width,
-            height=height,
-            title=kwds.pop("title", ""),
-            figsize=kwds.pop("figsize", None),
-            dpi=kwds.pop("dpi", None),
-        ).mark_line().encode(
-            x=_x(x, df), y=_y(value_name, df), color=alt.Color(var_name, type="nominal")
-        )
+            if alpha is not None:
+                assert 0 <= alpha <= 1
+                chart = chart.encode(opacity=api.value(alpha))
 
-        if alpha is not None:
-            assert 0 <= alpha <= 1
-            chart = chart.encode(opacity=alt.value(alpha))
+            chart = self._facet(chart, df, by, facet, api=api)
 
-        if use_order:
-            chart.encoding["order"] = {
-                "field": order, "type": infer_vegalite_type(df[order])
-            }
+            if use_order:
+                chart.encoding["order"] = {
+                    "field": order, "type": infer_vegalite_type(df[order])
+                }
+
+        chart = prepare_chart(chart, kwds, kind="line")
 
         if ax is not None:
-            return ax + chart
+            return as_chart(ax) + as_chart(chart)
 
         warn_if_keywords_unused("line", kwds)
         return chart
 
+    @traced("scatter")
     def scatter(
-        self, x, y, c=None, s=None, alpha=None, width=450, height=300, ax=None, **kwds
+        self,
+        x,
+        y,
+        c=None,
+        s=None,
+        alpha=None,
+        width=450,
+        height=300,
+        ax=None,
+        by=None,
+        facet="row",
+        max_points=None,
+        downsample="stride",
+        **kwds
     ):
         """Scatter plot for DataFrame data
 
@@ -507,6 +813,19 @@ class FramePlotMethods(BasePlotMethods):
             the height of the plot in pixels
         ax: altair.Chart, optional
             chart to be overlayed with this vis (convinience method for `chart1 + chart2`)
+        by : string, optional
+            the column by which to group the data. The groups are drawn as
+            the panels of a single faceted chart.
+        facet : string, {'row', 'column'}
+            whether to arrange the panels of a grouped chart in rows (default)
+            or columns
+        max_points : integer, optional
+            if specified, reduce each group to at most
+            this many points before plotting.
+        downsample : string, {'stride', 'mean'}
+            the method used to reduce series to ``max_points``: 'stride'
+            (default) keeps every n-th point, while 'mean' averages
+            consecutive points.
 
         Returns
         -------
@@ -514,33 +833,48 @@ class FramePlotMethods(BasePlotMethods):
             altair chart representation
         """
         df = self._data
+        if max_points is not None:
+            with stage("reshape", df) as timer:
+                df = downsample_groups(
+                    df, _group_keys(by), max_points, method=downsample
+                )
+                timer.output(df)
+
+        api = _builder(kwds)
+        with stage("build"):
+            chart = self._plot(
+                api=api,
+                data=df,
+                width=width,
+                height=height,
+                title=kwds.pop("title", ""),
+                figsize=kwds.pop("figsize", None),
+                dpi=kwds.pop("dpi", None),
+            ).mark_point().encode(
+                x=_x(x, df, ordinal_threshold=0, api=api), y=_y(y, df, ordinal_threshold=0, api=api)
+            )
 
-        chart = self._plot(
-            width=width,
-            height=height,
-            title=kwds.pop("title", ""),
-            figsize=kwds.pop("figsize", None),
-            dpi=kwds.pop("dpi", None),
-        ).mark_point().encode(
-            x=_x(x, df, ordinal_threshold=0), y=_y(y, df, ordinal_threshold=0)
-        )
+            if alpha is not None:
+                assert 0 <= alpha <= 1
+                chart = chart.encode(opacity=api.value(alpha))
 
-        if alpha is not None:
-            assert 0 <= alpha <= 1
-            chart = chart.encode(opacity=alt.value(alpha))
+            if c is not None:
+                chart.encoding["color"] = {"field": c, "type": infer_vegalite_type(df[c])}
 
-        if c is not None:
-            chart.encoding["color"] = {"field": c, "type": infer_vegalite_type(df[c])}
+            if s is not None:
+                chart.encoding["size"] = {"field": s, "type": infer_vegalite_type(df[s])}
 
-        if s is not None:
-            chart.encoding["size"] = {"field": s, "type": infer_vegalite_type(df[s])}
+            chart = self._facet(chart, df, by, facet, api=api)
+
+        chart = prepare_chart(chart, kwds, kind="scatter")
 
         if ax is not None:
-            return ax + chart
+            return as_chart(ax) + as_chart(chart)
 
         warn_if_keywords_unused("scatter", kwds)
         return chart
 
+    @traced("area")
     def area(
         self,
         x=None,
@@ -552,6 +886,12 @@ class FramePlotMethods(BasePlotMethods):
         width=450,
         height=300,
         ax=None,
+        by=None,
+        facet="row",
+        max_points=None,
+        downsample="stride",
+        aggregate=None,
+        precompute_stack=False,
         **kwds
     ):
         """Area plot for DataFrame data
@@ -566,9 +906,10 @@ class FramePlotMethods(BasePlotMethods):
         y : string, optional
             the column to use as the y-axis variable. If not specified, all
             columns (except x if specified) will be used.
-        stacked : bool, optional
-            if True (default) then create a stacked area chart. Otherwise,
-            areas will overlap
+        stacked : bool or string, optional
+            if True (default), then create a stacked area chart. Otherwise,
+            areas will overlap. A string sets the offset of the stack:
+            'zero' (as True), 'normalize' or 'center'.
         alpha : float, optional
             transparency level, 0 <= alpha <= 1
         var_name : string, optional
@@ -581,48 +922,93 @@ class FramePlotMethods(BasePlotMethods):
             the height of the plot in pixels
         ax: altair.Chart, optional
             chart to be overlayed with this vis (convinience method for `chart1 + chart2`)
+        by : string, optional
+            the column by which to group the data. The groups are drawn as
+            the panels of a single faceted chart.
+        facet : string, {'row', 'column'}
+            whether to arrange the panels of a grouped chart in rows (default)
+            or columns
+        max_points : integer, optional
+            if specified, reduce each series within each group to at most
+            this many points before plotting.
+        downsample : string, {'stride', 'mean'}
+            the method used to reduce series to ``max_points``: 'stride'
+            (default) keeps every n-th point, while 'mean' averages
+            consecutive points.
+        aggregate : string, optional
+            one of 'sum', 'mean', 'median', 'min', 'max' or 'count'. If
+            specified, the rows sharing an x value within each series are
+            combined with this aggregation before plotting.
+        precompute_stack : bool, optional
+            if True, compute the offsets of the stacked areas in pandas and
+            embed them in the data, rather than leaving the stacking to the
+            browser (default: False).
 
         Returns
         -------
         chart : alt.Chart
             altair chart representation
         """
-        df = unpivot_frame(
-            self._data, x=x, y=y, var_name=var_name, value_name=value_name
-        )
+        stack = validate_stack(stacked)
+        n_series = series_count(self._data, x=x, y=y, by=by)
+        with stage("reshape", self._data) as timer:
+            df = unpivot_frame(
+                self._data, x=x, y=y, var_name=var_name, value_name=value_name, by=by
+            )
 
-        x = df.columns[0]
+            x = df.columns[0]
 
-        if alpha is None and not stacked and df[var_name].nunique() > 1:
+            if aggregate is not None:
+                df = aggregate_duplicates(
+                    df, [x] + _group_keys(by, var_name), value_name, aggregate
+                )
+            if max_points is not None:
+                df = downsample_groups(
+                    df, _group_keys(by, var_name), max_points, method=downsample
+                )
+            if precompute_stack and stack is not None:
+                df = stack_offsets(
+                    df, x, var_name, value_name, stack, keys=_group_keys(by),
+                    start=value_name + "_start", end=value_name + "_end",
+                    fill=True,
+                )
+            timer.output(df)
+
+        if alpha is None and not stacked and len(df) and n_series > 1:
             alpha = 0.7
 
-        chart = self._plot(
-            data=df,
-            width=width,
-            height=height,
-            title=kwds.pop("title", ""),
-            figsize=kwds.pop("figsize", None),
-            dpi=kwds.pop("dpi", None),
-        ).mark_area().encode(
-            x=_x(x, df),
-            y=alt.Y(
-                value_name,
-                type=infer_vegalite_type(df[value_name]),
-                stack=(None, "zero")[stacked],
-            ),
-            color=alt.Color(field=var_name, type=infer_vegalite_type(df[var_name])),
-        )
+        api = _builder(kwds)
+        with stage("build"):
+            encoding = _stacked_y(df, value_name, stack, precompute_stack, api=api)
+            encoding.update(
+                x=_x(x, df, api=api),
+                color=api.Color(field=var_name, type=infer_vegalite_type(df[var_name])),
+            )
+            chart = self._plot(
+                api=api,
+                data=df,
+                width=width,
+                height=height,
+                title=kwds.pop("title", ""),
+                figsize=kwds.pop("figsize", None),
+                dpi=kwds.pop("dpi", None),
+            ).mark_area().encode(**encoding)
 
-        if alpha is not None:
-            assert 0 <= alpha <= 1
-            chart = chart.encode(opacity=alt.value(alpha))
+            if alpha is not None:
+                assert 0 <= alpha <= 1
+                chart = chart.encode(opacity=api.value(alpha))
+
+            chart = self._facet(chart, df, by, facet, api=api)
+
+        chart = prepare_chart(chart, kwds, kind="area")
 
         if ax is not None:
-            return ax + chart
+            return as_chart(ax) + as_chart(chart)
 
         warn_if_keywords_unused("area", kwds)
         return chart
 
+    @traced("bar")
     def bar(
         self,
         x=None,
@@ -634,6 +1020,14 @@ class FramePlotMethods(BasePlotMethods):
         width=450,
         height=300,
         ax=None,
+        by=None,
+        facet="row",
+        max_points=None,
+        downsample="stride",
+        top_k=None,
+        other_label="other",
+        aggregate=None,
+        precompute_stack=False,
         **kwds
     ):
         """Bar plot for DataFrame data
@@ -648,9 +1042,10 @@ class FramePlotMethods(BasePlotMethods):
         y : string, optional
             the column to use as the y-axis variable. If not specified, all
             columns (except x if specified) will be used.
-        stacked : bool, optional
-            if True (default) then create a stacked area chart. Otherwise,
-            areas will overlap
+        stacked : bool or string, optional
+            if True, then create a stacked bar chart. Otherwise (default),
+            bars will overlap. A string sets the offset of the stack:
+            'zero' (as True), 'normalize' or 'center'.
         alpha : float, optional
             transparency level, 0 <= alpha <= 1
         var_name : string, optional
@@ -663,47 +1058,103 @@ class FramePlotMethods(BasePlotMethods):
             the height of the plot in pixels
         ax: altair.Chart, optional
             chart to be overlayed with this vis (convinience method for `chart1 + chart2`)
+        by : string, optional
+            the column by which to group the data. The groups are drawn as
+            the panels of a single faceted chart.
+        facet : string, {'row', 'column'}
+            whether to arrange the panels of a grouped chart in rows (default)
+            or columns
+        max_points : integer, optional
+            if specified, reduce each series within each group to at most
+            this many points before plotting.
+        downsample : string, {'stride', 'mean'}
+            the method used to reduce series to ``max_points``: 'stride'
+            (default) keeps every n-th point, while 'mean' averages
+            consecutive points.
+        top_k : integer, optional
+            if specified, draw only the top_k categories with the largest
+            total value, summing the others into a single bar in each series.
+        other_label : string, optional
+            the label of the bar summing the categories beyond ``top_k``
+            (default: 'other')
+        aggregate : string, optional
+            one of 'sum', 'mean', 'median', 'min', 'max' or 'count'. If
+            specified, the rows sharing an x value within each series are
+            combined with this aggregation before plotting, leaving one row
+            per bar segment.
+        precompute_stack : bool, optional
+            if True, compute the offsets of the stacked bars in pandas and
+            embed them in the data, rather than leaving the stacking to the
+            browser (default: False).
 
         Returns
         -------
         chart : alt.Chart
             altair chart representation
         """
-        df = unpivot_frame(
-            self._data, x=x, y=y, var_name=var_name, value_name=value_name
-        )
-        x = df.columns[0]
+        stack = validate_stack(stacked)
+        n_series = series_count(self._data, x=x, y=y, by=by)
+        with stage("reshape", self._data) as timer:
+            df = unpivot_frame(
+                self._data, x=x, y=y, var_name=var_name, value_name=value_name, by=by
+            )
+            x = df.columns[0]
 
-        if alpha is None and not stacked and df[var_name].nunique() > 1:
+            if aggregate is not None:
+                df = aggregate_duplicates(
+                    df, [x] + _group_keys(by, var_name), value_name, aggregate
+                )
+            if top_k is not None:
+                df = top_k_categories(
+                    df, x, value_name, top_k, other_label, _group_keys(by, var_name)
+                )
+            if max_points is not None:
+                df = downsample_groups(
+                    df, _group_keys(by, var_name), max_points, method=downsample
+                )
+            if precompute_stack and stack is not None:
+                df = stack_offsets(
+                    df, x, var_name, value_name, stack, keys=_group_keys(by),
+                    start=value_name + "_start", end=value_name + "_end",
+                    fill=False,
+                )
+            timer.output(df)
+
+        if alpha is None and not stacked and len(df) and n_series > 1:
             alpha = 0.7
 
-        chart = self._plot(
-            data=df,
-            width=width,
-            height=height,
-            title=kwds.pop("title", ""),
-            figsize=kwds.pop("figsize", None),
-            dpi=kwds.pop("dpi", None),
-        ).mark_bar().encode(
-            x=alt.X(x, type=infer_vegalite_type(df[x], ordinal_threshold=50)),
-            y=alt.Y(
-                "value",
-                type=infer_vegalite_type(df["value"]),
-                stack=(None, "zero")[stacked],
-            ),
-            color=alt.Color(field="variable", type=infer_vegalite_type(df["variable"])),
-        )
+        api = _builder(kwds)
+        with stage("build"):
+            encoding = _stacked_y(df, value_name, stack, precompute_stack, api=api)
+            encoding.update(
+                x=_category_x(x, df, top_k, api=api),
+                color=api.Color(field="variable", type=infer_vegalite_type(df["variable"])),
+            )
+            chart = self._plot(
+                api=api,
+                data=df,
+                width=width,
+                height=height,
+                title=kwds.pop("title", ""),
+                figsize=kwds.pop("figsize", None),
+                dpi=kwds.pop("dpi", None),
+            ).mark_bar().encode(**encoding)
+
+            if alpha is not None:
+                assert 0 <= alpha <= 1
+                chart = chart.encode(opacity=api.value(alpha))
 
-        if alpha is not None:
-            assert 0 <= alpha <= 1
-            chart = chart.encode(opacity=alt.value(alpha))
+            chart = self._facet(chart, df, by, facet, api=api)
+
+        chart = prepare_chart(chart, kwds, kind="bar")
 
         if ax is not None:
-            return ax + chart
+            return as_chart(ax) + as_chart(chart)
 
         warn_if_keywords_unused("bar", kwds)
         return chart
 
+    @traced("barh")
     def barh(
         self,
         x=None,
@@ -715,6 +1166,10 @@ class FramePlotMethods(BasePlotMethods):
         width=450,
         height=300,
         ax=None,
+        by=None,
+        facet="row",
+        max_points=None,
+        downsample="stride",
         **kwds
     ):
         """Horizontal bar plot for DataFrame data
@@ -729,9 +1184,10 @@ class FramePlotMethods(BasePlotMethods):
         y : string, optional
             the column to use as the y-axis variable. If not specified, all
             columns (except x if specified) will be used.
-        stacked : bool, optional
-            if True (default) then create a stacked area chart. Otherwise,
-            areas will overlap
+        stacked : bool or string, optional
+            if True, then create a stacked bar chart. Otherwise (default),
+            bars will overlap. A string sets the offset of the stack:
+            'zero' (as True), 'normalize' or 'center'.
         alpha : float, optional
             transparency level, 0 <= alpha <= 1
         var_name : string, optional
@@ -744,6 +1200,19 @@ class FramePlotMethods(BasePlotMethods):
             the height of the plot in pixels
         ax: altair.Chart, optional
             chart to be overlayed with this vis (convinience method for `chart1 + chart2`)
+        by : string, optional
+            the column by which to group the data. The groups are drawn as
+            the panels of a single faceted chart.
+        facet : string, {'row', 'column'}
+            whether to arrange the panels of a grouped chart in rows (default)
+            or columns
+        max_points : integer, optional
+            if specified, reduce each series within each group to at most
+            this many points before plotting.
+        downsample : string, {'stride', 'mean'}
+            the method used to reduce series to ``max_points``: 'stride'
+            (default) keeps every n-th point, while 'mean' averages
+            consecutive points.
 
         Returns
         -------
@@ -759,15 +1228,19 @@ class FramePlotMethods(BasePlotMethods):
             value_name=value_name,
             width=width,
             height=height,
+            by=by,
+            facet=facet,
+            max_points=max_points,
+            downsample=downsample,
             **kwds
         )
 
-        enc = chart.encoding
-        enc["x"], enc["y"] = enc["y"], enc["x"]
+        _swap_xy(chart.encoding)
         if ax is not None:
-            return ax + chart
+            return as_chart(ax) + as_chart(chart)
         return chart
 
+    @traced("hist")
     def hist(
         self,
         x=None,
@@ -782,6 +1255,7 @@ class FramePlotMethods(BasePlotMethods):
         width=450,
         height=300,
         ax=None,
+        facet="row",
         **kwds
     ):
         """Histogram plot for DataFrame data
@@ -797,7 +1271,11 @@ class FramePlotMethods(BasePlotMethods):
             the column to use as the y-axis variable. If not specified, all
             columns (except x if specified) will be used.
         by : string, optional
-            the column by which to group the results
+            the column by which to group the data. The groups are drawn as
+            the panels of a single faceted chart.
+        facet : string, {'row', 'column'}
+            whether to arrange the panels of a grouped chart in rows (default)
+            or columns
         bins : integer, optional
             the maximum number of bins to use for the histogram (default: 10)
         stacked : bool, optional
@@ -823,57 +1301,58 @@ class FramePlotMethods(BasePlotMethods):
         chart : alt.Chart
             altair chart representation
         """
-        if by is not None:
-            raise NotImplementedError("vgplot.hist `by` keyword")
         if x is not None or y is not None:
             raise NotImplementedError('"x" and "y" args to hist()')
-        df = self._data.melt(var_name=var_name, value_name=value_name)
-
-        marks = {
-            "bar": "bar",
-            "barstacked": "bar",
-            "stepfilled": {"type": "area", "interpolate": "step"},
-            "step": {"type": "line", "interpolate": "step"},
-        }
+        with stage("reshape", self._data) as timer:
+            df = self._data.melt(
+                id_vars=by, var_name=var_name, value_name=value_name
+            )
+            timer.output(df)
 
-        if histtype in marks:
-            mark = marks[histtype]
-        else:
-            raise ValueError("histtype '{0}' is not recognized" "".format(histtype))
+        mark = _hist_mark(histtype)
 
-        if alpha is None and not stacked and df[var_name].nunique() > 1:
+        n_series = series_count(self._data, by=by)
+        if alpha is None and not stacked and len(df) and n_series > 1:
             alpha = 0.7
 
-        chart = self._plot(
-            data=df,
-            width=width,
-            height=height,
-            title=kwds.pop("title", ""),
-            figsize=kwds.pop("figsize", None),
-            dpi=kwds.pop("dpi", None),
-        )
+        api = _builder(kwds)
+        with stage("build"):
+            chart = self._plot(
+                api=api,
+                data=df,
+                width=width,
+                height=height,
+                title=kwds.pop("title", ""),
+                figsize=kwds.pop("figsize", None),
+                dpi=kwds.pop("dpi", None),
+            )
 
-        chart.mark = mark
-        chart = chart.encode(
-            x=alt.X(value_name, bin={"maxbins": bins}, type="quantitative"),
-            y=alt.Y(
-                aggregate="count",
-                type="quantitative",
-                stack=("zero" if stacked else None),
-            ),
-            color=alt.Color(field=var_name, type="nominal"),
-        )
+            chart.mark = mark
+            chart = chart.encode(
+                x=api.X(value_name, bin={"maxbins": bins}, type="quantitative"),
+                y=api.Y(
+                    aggregate="count",
+                    type="quantitative",
+                    stack=("zero" if stacked else None),
+                ),
+                color=api.Color(field=var_name, type="nominal"),
+            )
 
-        if alpha is not None:
-            assert 0 <= alpha <= 1
-            chart = chart.encode(opacity=alt.value(alpha))
+            if alpha is not None:
+                assert 0 <= alpha <= 1
+                chart = chart.encode(opacity=api.value(alpha))
+
+            chart = self._facet(chart, df, by, facet, api=api)
+
+        chart = prepare_chart(chart, kwds, kind="hist")
 
         if ax is not None:
-            return ax + chart
+            return as_chart(ax) + as_chart(chart)
 
         warn_if_keywords_unused("hist", kwds)
         return chart
 
+    @traced("heatmap")
     def heatmap(
         self,
         x,
@@ -885,6 +1364,8 @@ class FramePlotMethods(BasePlotMethods):
         width=450,
         height=300,
         ax=None,
+        by=None,
+        facet="row",
         **kwds
     ):
         """Heatmap plot for DataFrame data
@@ -917,6 +1398,12 @@ class FramePlotMethods(BasePlotMethods):
             the height of the plot in pixels
         ax: altair.Chart, optional
             chart to be overlayed with this vis (convinience method for `chart1 + chart2`)
+        by : string, optional
+            the column by which to group the data. The groups are drawn as
+            the panels of a single faceted chart.
+        facet : string, {'row', 'column'}
+            whether to arrange the panels of a grouped chart in rows (default)
+            or columns
 
         Returns
         -------
@@ -926,43 +1413,53 @@ class FramePlotMethods(BasePlotMethods):
         # TODO: Use actual hexbins rather than a grid heatmap
         reduce_C_function = validate_aggregation(reduce_C_function)
 
-        if C is None:
-            df = self._data[[x, y]]
-        else:
-            df = self._data[[x, y, C]]
-
-        if C is None:
-            color = alt.Color(aggregate="count", type="quantitative")
-        else:
-            color = alt.Color(field=C, aggregate=reduce_C_function, type="quantitative")
+        cols = [x, y] if C is None else [x, y, C]
+        if by is not None:
+            cols.append(by)
+        with stage("reshape", self._data) as timer:
+            df = self._data[cols]
+            timer.output(df)
+
+        api = _builder(kwds)
+        with stage("build"):
+            if C is None:
+                color = api.Color(aggregate="count", type="quantitative")
+            else:
+                color = api.Color(field=C, aggregate=reduce_C_function, type="quantitative")
+
+            color.scale = api.Scale(scheme="greens")
+
+            chart = self._plot(
+                api=api,
+                data=df,
+                width=width,
+                height=height,
+                title=kwds.pop("title", ""),
+                figsize=kwds.pop("figsize", None),
+                dpi=kwds.pop("dpi", None),
+            ).mark_rect().encode(
+                x=api.X(x, bin=api.Bin(maxbins=gridsize), type="quantitative"),
+                y=api.Y(y, bin=api.Bin(maxbins=gridsize), type="quantitative"),
+                color=color,
+            )
 
-        color.scale = alt.Scale(scheme="greens")
+            if alpha is not None:
+                assert 0 <= alpha <= 1
+                chart = chart.encode(opacity=api.value(alpha))
 
-        chart = self._plot(
-            data=df,
-            width=width,
-            height=height,
-            title=kwds.pop("title", ""),
-            figsize=kwds.pop("figsize", None),
-            dpi=kwds.pop("dpi", None),
-        ).mark_rect().encode(
-            x=alt.X(x, bin=alt.Bin(maxbins=gridsize), type="quantitative"),
-            y=alt.Y(y, bin=alt.Bin(maxbins=gridsize), type="quantitative"),
-            color=color,
-        )
+            chart = self._facet(chart, df, by, facet, api=api)
 
-        if alpha is not None:
-            assert 0 <= alpha <= 1
-            chart = chart.encode(opacity=alt.value(alpha))
+        chart = prepare_chart(chart, kwds, kind="heatmap")
 
         if ax is not None:
-            return ax + chart
+            return as_chart(ax) + as_chart(chart)
 
         warn_if_keywords_unused("hexbin", kwds)
         return chart
 
     hexbin = heatmap
 
+    @traced("kde")
     def kde(
         self,
         x=None,
@@ -972,6 +1469,7 @@ class FramePlotMethods(BasePlotMethods):
         width=450,
         height=300,
         ax=None,
+        n_jobs=None,
         **kwds
     ):
         """Kernel Density Estimate plot for DataFrame data
@@ -998,6 +1496,10 @@ class FramePlotMethods(BasePlotMethods):
             the height of the plot in pixels
         ax: altair.Chart, optional
             chart to be overlayed with this vis (convinience method for `chart1 + chart2`)
+        n_jobs : int, optional
+            the number of threads used to evaluate the column densities. If
+            None (default) the columns are evaluated serially; -1 uses all
+            available cores. The result does not depend on n_jobs.
 
         Returns
         -------
@@ -1018,9 +1520,15 @@ class FramePlotMethods(BasePlotMethods):
         trange = tmax - tmin
         t = np.linspace(tmin - 0.5 * trange, tmax + 0.5 * trange, 1000)
 
-        kde_df = pd.DataFrame(
-            {col: kde(df[col], bw_method=bw_method).evaluate(t) for col in df}, index=t
-        )
+        def evaluate(col):
+            return kde(df[col], bw_method=bw_method).evaluate(t)
+
+        with stage("kde", df) as timer:
+            densities = parallel_map(evaluate, df.columns, n_jobs=n_jobs)
+            kde_df = pd.DataFrame(
+                dict(zip(df.columns, densities)), index=t, columns=df.columns
+            )
+            timer.output(kde_df)
         kde_df.index.name = " "
 
         f = FramePlotMethods(kde_df)
@@ -1029,3 +1537,72 @@ class FramePlotMethods(BasePlotMethods):
         )
 
     density = kde
+
+    @traced("box")
+    def box(self, x=None, y=None, whis=1.5, max_outliers=100, vert=True, alpha=None,
+            var_name="variable", value_name="value", width=450, height=300,
+            ax=None, **kwds):
+        """Box plot for DataFrame data
+
+        One box is drawn for each numeric column. The quartiles, whiskers
+        and outliers are computed in pandas, so that the chart embeds a
+        single row per box, plus the outliers.
+
+        >>> dataframe.vgplot.box()  # doctest: +SKIP
+
+        Parameters
+        ----------
+        x : None
+            not supported: the boxes are drawn along the x-axis
+        y : string or list, optional
+            the column or columns to draw. If not specified, all numeric
+            columns will be used.
+        whis : float, optional
+            the reach of the whiskers beyond the box, in interquartile ranges
+            (default: 1.5). Values beyond the whiskers are drawn as outliers.
+        max_outliers : int, optional
+            the maximum number of outliers to draw per column (default: 100).
+            If there are more, a sample evenly spaced in rank is drawn.
+        vert : bool, optional
+            if True (default), draw vertical boxes; otherwise horizontal ones
+        alpha : float, optional
+            transparency level, 0 <= alpha <= 1
+        var_name : string, optional
+            the title of the axis of the columns
+        value_name : string, optional
+            the title of the axis of the values
+        width : int, optional
+            the width of the plot in pixels
+        height : int, optional
+            the height of the plot in pixels
+        ax: altair.Chart, optional
+            chart to be overlayed with this vis (convinience method for `chart1 + chart2`)
+
+        Returns
+        -------
+        chart : alt.LayerChart
+            altair chart representation
+        """
+        if x is not None:
+            raise NotImplementedError('"x" argument to df.vgplot.box()')
+        if y is None:
+            df = self._data.select_dtypes(include="number")
+        else:
+            df = self._data[[y] if np.isscalar(y) else list(y)]
+
+        with stage("box", df) as timer:
+            rows, outliers = [], []
+            for col in df.columns:
+                stats, values = box_stats(df[col].values, whis=whis,
+                                          max_outliers=max_outliers)
+                if stats is None:
+                    continue
+                rows.append(dict(stats, **{var_name: str(col)}))
+                outliers.append(pd.DataFrame({var_name: str(col), value_name: values},
+                                             columns=[var_name, value_name]))
+            stats = pd.DataFrame(rows, columns=[var_name] + list(BOX_STATS))
+            outliers = pd.concat(outliers, ignore_index=True) if outliers else \
+                pd.DataFrame(columns=[var_name, value_name])
+            timer.output(stats)
+        return self._box(stats, outliers, var_name, value_name, vert=vert, alpha=alpha,
+                         width=width, height=height, ax=ax, kwds=kwds)
@@ -0,0 +1,496 @@
+"""Routines to prepare chart data before it is embedded in the spec"""
+import re
+
+from ._lazy import alt
+import numpy as np
+import pandas as pd
+
+from ._budget import apply_budget
+from ._config import pop_options
+from ._utils import string_types
+from .instrumentation import stage
+
+
+DATUM_REFERENCE = re.compile(r"""datum\.([A-Za-z_$][\w$]*)|datum\[(['"])(.*?)\2\]""")
+
+# Automatic precision keeps this many distinct values per pixel, so that
+# rounding stays invisible when zooming in on an interactive chart.
+OVERSAMPLE = 10
+
+
+def spec_without_data(chart):
+    """Return the dictionary specification of chart, omitting its data"""
+    chart = chart.copy(deep=False)
+    chart.data = alt.Undefined
+    return chart.to_dict(validate=False)
+
+
+def referenced_fields(spec):
+    """Return the set of field names which may be referenced by spec.
+
+    This is deliberately conservative: every string in the specification
+    is treated as a potential field name, along with any ``datum.field``
+    references within expression strings.
+
+    Parameters
+    ----------
+    spec : dict
+        the Vega-Lite specification (without data)
+
+    Returns
+    -------
+    fields : set
+        the set of potentially referenced field names
+    """
+    fields = set()
+
+    def visit(obj):
+        if isinstance(obj, dict):
+            for value in obj.values():
+                visit(value)
+        elif isinstance(obj, (list, tuple)):
+            for value in obj:
+                visit(value)
+        elif isinstance(obj, string_types):
+            fields.add(obj)
+            for name, _, quoted in DATUM_REFERENCE.findall(obj):
+                fields.add(name or quoted)
+
+    visit(spec)
+    return fields
+
+
+def prune_columns(data, spec):
+    """Drop the columns of data which are not referenced by spec"""
+    fields = referenced_fields(spec)
+    keep = [col for col in data.columns if str(col) in fields]
+    if len(keep) == data.shape[1]:
+        return data
+    return data[keep]
+
+
+def replace_columns(data, replacements):
+    """Return a copy of data with some columns replaced.
+
+    Columns which are not replaced are shared with the input, not copied.
+    """
+    columns = {col: replacements.get(col, data[col]) for col in data.columns}
+    return pd.DataFrame(columns, index=data.index, columns=data.columns)
+
+
+def field_pixels(spec, width=450, height=300):
+    """Return a mapping of field names to the number of pixels they span.
+
+    Fields encoded on the x (y) axis span the width (height) of the chart;
+    fields on any other channel are assigned the larger of the two.
+    """
+    width = spec.get("width", width)
+    height = spec.get("height", height)
+    pixels = {}
+    for channel, encoding in spec.get("encoding", {}).items():
+        if not isinstance(encoding, dict):
+            continue
+        field = encoding.get("field")
+        if not isinstance(field, string_types):
+            continue
+        if channel in ("x", "x2"):
+            size = width
+        elif channel in ("y", "y2"):
+            size = height
+        else:
+            size = max(width, height)
+        pixels[field] = max(pixels.get(field, 0), size)
+    return pixels
+
+
+def _decimals(step):
+    """Number of decimal places needed to resolve a given step size"""
+    return int(np.ceil(-np.log10(step)))
+
+
+def _resolution(values, pixels):
+    """The size of one pixel in data units, or None if undefined"""
+    finite = values[np.isfinite(values)]
+    if len(finite) == 0:
+        return None
+    span = finite.max() - finite.min()
+    if span == 0:
+        span = abs(finite.max())
+    if span == 0:
+        return None
+    return span / pixels
+
+
+def round_values(values, pixels, precision=None, quantize=None):
+    """Round an array of floating point values for embedding.
+
+    Parameters
+    ----------
+    values : array_like
+        the floating-point values to round
+    pixels : int
+        the number of pixels spanned by the values on screen
+    precision : int or 'auto', optional
+        the number of decimal places to keep. If 'auto', the precision is
+        chosen from the range of the values and the number of pixels.
+    quantize : float or 'auto', optional
+        the spacing of a grid to which the values will be snapped. If 'auto',
+        the spacing of one pixel will be used.
+
+    Returns
+    -------
+    values : ndarray
+        the rounded values
+    """
+    values = np.asarray(values, dtype=float)
+    if quantize is not None:
+        if quantize == "auto":
+            step = _resolution(values, pixels)
+        else:
+            step = float(quantize)
+        if step is not None:
+            if step <= 0:
+                raise ValueError("quantize must be a positive number or 'auto'")
+            values = np.round(np.round(values / step) * step, _decimals(step) + 1)
+    if precision is not None:
+        if precision == "auto":
+            step = _resolution(values, pixels * OVERSAMPLE)
+            if step is not None:
+                values = np.round(values, _decimals(step))
+        else:
+            values = np.round(values, int(precision))
+    return values
+
+
+def round_columns(data, spec, precision=None, quantize=None):
+    """Round the floating-point columns of data (see ``round_values``)"""
+    if precision is None and quantize is None:
+        return data
+    pixels = field_pixels(spec)
+    default = max(pixels.values()) if pixels else 450
+    rounded = {}
+    for col in data.columns:
+        if data[col].dtype.kind == "f":
+            rounded[col] = round_values(data[col].values,
+                                        pixels.get(str(col), default),
+                                        precision=precision, quantize=quantize)
+    if not rounded:
+        return data
+    return replace_columns(data, rounded)
+
+
+def dictionary_encode(data, spec, key="code"):
+    """Replace the nominal and ordinal columns of data by integer codes.
+
+    Categorical columns use their existing codes; object columns are
+    factorized. Each encoded column comes with a Vega-Lite lookup transform
+    which restores the original labels in the browser, so that scales,
+    legends and axis labels are unaffected.
+
+    Parameters
+    ----------
+    data : DataFrame
+        the chart data
+    spec : dict
+        the Vega-Lite specification (without data)
+    key : string, optional
+        the name of the code field in the lookup tables
+
+    Returns
+    -------
+    data : DataFrame
+        the encoded data
+    transforms : list
+        the lookup transforms to be prepended to the chart's transforms
+    """
+    fields = set()
+    for encoding in spec.get("encoding", {}).values():
+        if not isinstance(encoding, dict):
+            continue
+        if encoding.get("type") in ("nominal", "ordinal"):
+            fields.add(encoding.get("field"))
+
+    codes = {}
+    transforms = []
+    for col in data.columns:
+        if str(col) not in fields:
+            continue
+        values = data[col]
+        if values.dtype.name == "category":
+            codes[col] = values.cat.codes.values
+            labels = values.cat.categories
+        elif values.dtype == object:
+            codes[col], labels = pd.factorize(values)
+        else:
+            continue
+        table = [{key: i, str(col): label} for i, label in enumerate(labels.tolist())]
+        transforms.append({
+            "lookup": str(col),
+            "from": {"data": {"values": table}, "key": key, "fields": [str(col)]},
+        })
+
+    if codes:
+        data = replace_columns(data, codes)
+    return data, transforms
+
+
+def epoch_milliseconds(values):
+    """Convert datetime values to milliseconds since the Unix epoch.
+
+    Timezone-aware values are converted to UTC; timezone-naive values are
+    interpreted as UTC. Missing values (NaT) are returned as NaN.
+
+    Parameters
+    ----------
+    values : Series or array_like
+        the datetime values to convert
+
+    Returns
+    -------
+    epoch : ndarray
+        int64 milliseconds, or float64 if there are missing values
+    """
+    values = np.asarray(values, dtype="datetime64[ns]")
+    epoch = values.view("int64") // 1000000
+    missing = np.isnat(values)
+    if missing.any():
+        epoch = epoch.astype(float)
+        epoch[missing] = np.nan
+    return epoch
+
+
+def encode_temporal(data):
+    """Replace the datetime columns of data by epoch milliseconds.
+
+    Returns
+    -------
+    data : DataFrame
+        the encoded data
+    naive : list
+        the names of the encoded columns which were timezone-naive
+    """
+    epochs = {}
+    naive = []
+    for col in data.columns:
+        dtype = data[col].dtype
+        if dtype.kind != "M":
+            continue
+        epochs[col] = epoch_milliseconds(data[col].values)
+        if getattr(dtype, "tz", None) is None:
+            naive.append(str(col))
+    if epochs:
+        data = replace_columns(data, epochs)
+    return data, naive
+
+
+def _item(obj, key):
+    """Look up key in an altair schema object or a plain dict"""
+    if isinstance(obj, dict):
+        return obj.get(key, alt.Undefined)
+    return obj[key]
+
+
+def use_utc_scale(chart, fields):
+    """Display the x and y encodings of the given fields on a UTC scale"""
+    for channel in ("x", "y"):
+        encoding = _item(chart.encoding, channel)
+        if encoding is alt.Undefined or _item(encoding, "field") not in fields:
+            continue
+        scale = _item(encoding, "scale")
+        if scale is alt.Undefined:
+            encoding["scale"] = {"type": "utc"}
+        else:
+            scale["type"] = "utc"
+
+
+def _tick_increment(start, stop, count):
+    """The step between ticks of a linear scale, as in d3's tickIncrement.
+
+    Steps below one are returned as the negative of their inverse, so that
+    they can be applied without floating-point error.
+    """
+    step = (stop - start) / count
+    power = np.floor(np.log10(step))
+    error = step / 10 ** power
+    factor = 10 if error >= np.sqrt(50) else 5 if error >= np.sqrt(10) \
+        else 2 if error >= np.sqrt(2) else 1
+    if power >= 0:
+        return factor * 10 ** power
+    return -(10 ** -power) / factor
+
+
+def nice_domain(vmin, vmax, count=10):
+    """Extend a domain to round values, as Vega does for ``nice`` scales"""
+    start, stop = vmin, vmax
+    for _ in range(2):
+        step = _tick_increment(start, stop, count)
+        if step > 0:
+            start, stop = np.floor(start / step) * step, np.ceil(stop / step) * step
+        else:
+            start, stop = np.ceil(start * step) / step, np.floor(stop * step) / step
+    return [float(start), float(stop)]
+
+
+def _is_stacked(spec, channel):
+    """Whether the channel is stacked, by default or explicitly"""
+    encoding = spec["encoding"][channel]
+    if "stack" in encoding:
+        return encoding["stack"] is not None
+    mark = spec.get("mark")
+    mark = mark.get("type") if isinstance(mark, dict) else mark
+    return channel == "y" and mark in ("bar", "area") and any(
+        key in spec["encoding"] for key in ("color", "detail"))
+
+
+def scale_domains(data, spec):
+    """Compute explicit domains for the quantitative x and y scales.
+
+    A domain is computed for each position channel with a quantitative,
+    unbinned, unaggregated and unstacked field, from the extent of the
+    field (and of the field of the secondary channel x2/y2). As in
+    Vega-Lite, zero is included unless the scale sets ``zero: false``, and
+    the domain is made nice unless it sets ``nice: false``.
+
+    Returns
+    -------
+    domains : dict
+        the domain of each channel, for those which were computed
+    """
+    encodings = spec.get("encoding", {})
+    domains = {}
+    for channel in ("x", "y"):
+        encoding = encodings.get(channel)
+        if not isinstance(encoding, dict) or encoding.get("type") != "quantitative":
+            continue
+        if (encoding.get("aggregate") or encoding.get("bin")
+                or _is_stacked(spec, channel)):
+            continue
+        scale = encoding.get("scale") or {}
+        if "domain" in scale or scale.get("type", "linear") != "linear":
+            continue
+        fields = [enc.get("field") for enc in (encoding, encodings.get(channel + "2"))
+                  if isinstance(enc, dict) and enc.get("field") is not None]
+        if not fields or any(field not in data for field in fields):
+            continue
+        values = np.concatenate([np.asarray(data[field], dtype=float)
+                                 for field in fields])
+        values = values[np.isfinite(values)]
+        if len(values) == 0:
+            continue
+        vmin, vmax = values.min(), values.max()
+        if scale.get("zero", True):
+            vmin, vmax = min(vmin, 0), max(vmax, 0)
+        if vmin == vmax:
+            continue
+        if scale.get("nice", True) is not False:
+            vmin, vmax = nice_domain(vmin, vmax)
+        domains[channel] = [float(vmin), float(vmax)]
+    return domains
+
+
+def is_presorted(data, spec):
+    """Whether a line or area chart's data is in drawing order.
+
+    Vega-Lite draws the points of each line (or area) in order of the
+    ``order`` field if there is one, or else of the x field. This checks
+    whether that field is non-decreasing within each series, as defined by
+    the color, detail and facet fields.
+    """
+    mark = spec.get("mark")
+    mark = mark.get("type") if isinstance(mark, dict) else mark
+    encodings = spec.get("encoding", {})
+    if mark not in ("line", "area") or not isinstance(encodings.get("x"), dict):
+        return False
+    order = encodings.get("order", encodings["x"])
+    field = order.get("field") if isinstance(order, dict) else None
+    if field not in data or data[field].dtype.kind not in "iufM":
+        return False
+    if data[field].is_monotonic_increasing:
+        return True
+
+    keys = [encodings[channel]["field"] for channel in ("color", "detail", "row", "column")
+            if isinstance(encodings.get(channel), dict)
+            and encodings[channel].get("field") in data]
+    if not keys:
+        return False
+    codes = data.groupby(keys, sort=False, observed=True).ngroup().values
+    values = np.asarray(data[field])
+    if (np.diff(codes) < 0).any():
+        perm = np.argsort(codes, kind="stable")
+        codes, values = codes[perm], values[perm]
+    same = codes[1:] == codes[:-1]
+    return not (same & (values[1:] < values[:-1])).any()
+
+
+def use_explicit_scales(chart, data):
+    """Set explicit scale domains, and skip the sorting of presorted lines"""
+    spec = spec_without_data(chart)
+    for channel, domain in scale_domains(data, spec).items():
+        encoding = _item(chart.encoding, channel)
+        scale = _item(encoding, "scale")
+        if scale is alt.Undefined:
+            encoding["scale"] = {"domain": domain}
+        else:
+            scale["domain"] = domain
+    if is_presorted(data, spec):
+        # A constant order draws the points in data order. Vega-Lite
+        # documents {"value": null}, but its v2 schema only admits
+        # non-null values, which have the same effect.
+        chart.encoding["order"] = {"value": 0}
+
+
+def prepare_chart(chart, kwds, kind=None):
+    """Prepare the data of a chart for embedding.
+
+    Options (see ``pdvega.set_options``) are popped from kwds, and the
+    chart data is transformed accordingly.
+
+    Parameters
+    ----------
+    chart : alt.Chart
+        the chart to prepare. Its data is replaced in-place.
+    kwds : dict
+        the keywords passed to the plotting method
+    kind : string, optional
+        the kind of chart (e.g. 'line'), which selects the strategy used to
+        reduce data exceeding the ``payload_budget``
+
+    Returns
+    -------
+    chart : alt.Chart
+        the prepared chart
+    """
+    options = pop_options(kwds)
+    data = chart.data
+    if not isinstance(data, pd.DataFrame):
+        return chart
+
+    with stage("finalize", data) as timer:
+        spec = spec_without_data(chart)
+        if options["prune_columns"]:
+            data = prune_columns(data, spec)
+        if options["payload_budget"] is not None:
+            data = apply_budget(chart, data, spec, options["payload_budget"], kind)
+            spec = spec_without_data(chart)
+        data = round_columns(data, spec, precision=options["precision"],
+                             quantize=options["quantize"])
+        if options["dictionary_encode"]:
+            data, lookups = dictionary_encode(data, spec)
+            if lookups:
+                transform = chart.transform
+                if transform is alt.Undefined:
+                    transform = []
+                chart.transform = lookups + list(transform)
+        if options["temporal_encoding"] == "epoch":
+            data, naive = encode_temporal(data)
+            if naive and chart.encoding is not alt.Undefined:
+                use_utc_scale(chart, naive)
+        elif options["temporal_encoding"] is not None:
+            raise ValueError("Unrecognized temporal_encoding: {0!r}"
+                             "".format(options["temporal_encoding"]))
+        if options["explicit_scales"]:
+            use_explicit_scales(chart, data)
+
+        chart.data = data
+        timer.output(data)
+    return chart
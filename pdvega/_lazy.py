@@ -0,0 +1,44 @@
+"""Deferred imports of heavy dependencies"""
+import importlib
+import types
+
+
+class LazyModule(types.ModuleType):
+    """A placeholder for a module which is imported on first attribute access.
+
+    Once the module has been imported, its attributes are copied onto the
+    placeholder, so that later lookups cost no more than for the module.
+
+    Examples
+    --------
+    >>> alt = LazyModule('altair')
+    >>> alt.Chart  # doctest: +SKIP
+    <class 'altair.vegalite.v2.api.Chart'>
+    """
+    def __init__(self, name):
+        super(LazyModule, self).__init__(name)
+        self.__dict__["_loaded"] = False
+
+    def _load(self):
+        module = importlib.import_module(self.__name__)
+        self.__dict__.update(module.__dict__)
+        self.__dict__["_loaded"] = True
+        return module
+
+    def __getattr__(self, attr):
+        if self.__dict__["_loaded"]:
+            raise AttributeError("module {0!r} has no attribute {1!r}"
+                                 "".format(self.__name__, attr))
+        return getattr(self._load(), attr)
+
+    def __dir__(self):
+        if not self.__dict__["_loaded"]:
+            self._load()
+        return sorted(self.__dict__)
+
+    def __repr__(self):
+        state = "loaded" if self.__dict__["_loaded"] else "not yet loaded"
+        return "<lazy module {0!r} ({1})>".format(self.__name__, state)
+
+
+alt = LazyModule("altair")
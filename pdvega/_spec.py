@@ -0,0 +1,215 @@
+"""A lightweight builder of Vega-Lite specifications.
+
+The functions and classes here mirror the subset of the altair API used by
+the plotting methods (``Chart``, ``X``, ``Y``, ``Color``, ``value``, ...),
+but build plain dictionaries rather than schema-wrapper objects. Plotting
+methods use this namespace in place of altair when the ``builder`` option
+is ``'dict'``.
+
+Specifications are validated against the Vega-Lite schema once per shape
+(see ``pdvega._validation``).
+"""
+import copy
+import hashlib
+import json
+
+import pandas as pd
+
+from ._lazy import alt
+from ._validation import chart_class, validate_spec
+
+
+class Channel(dict):
+    """An encoding channel definition: a dict with attribute access"""
+    def __init__(self, shorthand=None, **kwds):
+        if shorthand is not None:
+            kwds["field"] = shorthand
+        super(Channel, self).__init__(kwds)
+
+    def __getattr__(self, attr):
+        try:
+            return self[attr]
+        except KeyError:
+            raise AttributeError(attr)
+
+    def __setattr__(self, attr, value):
+        self[attr] = value
+
+
+X = Y = X2 = Y2 = Color = Size = Opacity = Row = Column = Order = Tooltip = Channel
+
+
+def value(value):
+    """A constant encoding value"""
+    return {"value": value}
+
+
+def Bin(**kwds):
+    return dict(kwds)
+
+
+def Scale(**kwds):
+    return dict(kwds)
+
+
+def _dataset_name(values):
+    # the same naming scheme as altair, so that datasets are shared with
+    # charts built by altair
+    values_json = json.dumps(values, sort_keys=True)
+    return "data-" + hashlib.md5(values_json.encode()).hexdigest()
+
+
+class VegaLiteSpec(object):
+    """A Vega-Lite chart specification held as a plain dictionary.
+
+    This is returned by the plotting methods when the ``builder`` option is
+    ``'dict'``. It supports the parts of the ``alt.Chart`` interface needed
+    to build charts, and serializes directly with ``to_dict``; use
+    ``to_chart`` to obtain an ``alt.Chart`` for further composition.
+    Layering with ``+`` or concatenating with ``|`` and ``&`` converts to
+    altair automatically.
+
+    Unlike altair charts, the methods modifying the specification
+    (``properties``, ``encode``, ``mark_*``) act in-place.
+
+    Parameters
+    ----------
+    data : DataFrame, optional
+        the chart data
+    **spec :
+        top-level properties of the specification
+    """
+    def __init__(self, data=None, **spec):
+        self.data = data
+        self.spec = spec
+
+    def __repr__(self):
+        return "VegaLiteSpec({0!r})".format(self.spec)
+
+    def properties(self, **kwds):
+        self.spec.update(kwds)
+        return self
+
+    @property
+    def mark(self):
+        return self.spec.get("mark")
+
+    @mark.setter
+    def mark(self, mark):
+        self.spec["mark"] = mark
+
+    def _mark(self, mark, kwds):
+        self.spec["mark"] = dict(kwds, type=mark) if kwds else mark
+        return self
+
+    def mark_area(self, **kwds):
+        return self._mark("area", kwds)
+
+    def mark_bar(self, **kwds):
+        return self._mark("bar", kwds)
+
+    def mark_line(self, **kwds):
+        return self._mark("line", kwds)
+
+    def mark_point(self, **kwds):
+        return self._mark("point", kwds)
+
+    def mark_rect(self, **kwds):
+        return self._mark("rect", kwds)
+
+    def mark_rule(self, **kwds):
+        return self._mark("rule", kwds)
+
+    def mark_tick(self, **kwds):
+        return self._mark("tick", kwds)
+
+    @property
+    def encoding(self):
+        return self.spec.setdefault("encoding", {})
+
+    def encode(self, **channels):
+        self.encoding.update(channels)
+        return self
+
+    @property
+    def transform(self):
+        return self.spec.get("transform", [])
+
+    @transform.setter
+    def transform(self, transform):
+        self.spec["transform"] = list(transform)
+
+    def copy(self, deep=True):
+        spec = copy.deepcopy(self.spec) if deep else dict(self.spec)
+        return self.__class__(self.data, **spec)
+
+    def _data_dict(self, datasets):
+        data = self.data
+        if isinstance(data, pd.DataFrame):
+            data = alt.data_transformers.get()(data)
+        if (isinstance(data, dict) and alt.data_transformers.consolidate_datasets
+                and "values" in data and "name" not in data):
+            values = data["values"]
+            name = _dataset_name(values)
+            datasets[name] = values
+            data = dict(data, name=name)
+            del data["values"]
+        return data
+
+    def to_dict(self, validate=True):
+        """Return the Vega-Lite specification as a dictionary.
+
+        The result matches that of the equivalent ``alt.Chart``: data are
+        converted with the active altair data transformer, and the active
+        theme is applied.
+        """
+        spec = copy.deepcopy(self.spec)
+        datasets = {}
+        if self.data is not None and self.data is not alt.Undefined:
+            spec["data"] = self._data_dict(datasets)
+        spec.setdefault("$schema", alt.SCHEMA_URL)
+        spec = alt.utils.update_nested(alt.themes.get()(), spec, copy=True)
+        if validate:
+            validate_spec(spec)
+        if datasets:
+            spec.setdefault("datasets", {}).update(datasets)
+        return spec
+
+    def to_json(self, validate=True, indent=2, sort_keys=True, **kwargs):
+        return json.dumps(self.to_dict(validate=validate), indent=indent,
+                          sort_keys=sort_keys, **kwargs)
+
+    def to_chart(self):
+        """Convert the specification into an ``alt.Chart``"""
+        chart = chart_class().from_dict(copy.deepcopy(self.spec), validate=False)
+        if self.data is not None and self.data is not alt.Undefined:
+            chart.data = self.data
+        return chart
+
+    def save(self, fp, **kwargs):
+        return self.to_chart().save(fp, **kwargs)
+
+    def _repr_mimebundle_(self, include=None, exclude=None):
+        return self.to_chart()._repr_mimebundle_(include, exclude)
+
+    def __add__(self, other):
+        return self.to_chart() + as_chart(other)
+
+    def __radd__(self, other):
+        return as_chart(other) + self.to_chart()
+
+    def __or__(self, other):
+        return self.to_chart() | as_chart(other)
+
+    def __and__(self, other):
+        return self.to_chart() & as_chart(other)
+
+
+Chart = VegaLiteSpec
+
+
+def as_chart(chart):
+    """Convert a VegaLiteSpec to an altair chart; other charts pass through"""
+    if isinstance(chart, VegaLiteSpec):
+        return chart.to_chart()
+    return chart
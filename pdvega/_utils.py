@@ -1,9 +1,17 @@
+import multiprocessing
 import warnings
+
 import numpy as np
 import pandas as pd
 
 from ._pandas_internals import infer_dtype as pd_infer_dtype
 from ._pandas_internals import _infer_dtype_kwds
+from .instrumentation import stage
+
+try:
+    string_types = (basestring,)  # noqa: F821
+except NameError:  # Python 3
+    string_types = (str,)
 
 
 def infer_vegalite_type(data, ordinal_threshold=6):
@@ -22,36 +30,152 @@ def infer_vegalite_type(data, ordinal_threshold=6):
     Adapted from code at http://github.com/altair-viz/altair/
     Licence: BSD-3
     """
-    # infer based on the dtype of the input
-    typ = pd_infer_dtype(data, **_infer_dtype_kwds)
+    with stage("infer", data):
+        # infer based on the dtype of the input
+        typ = pd_infer_dtype(data, **_infer_dtype_kwds)
 
-    # TODO: Once this returns 'O', please update test_select_x and test_select_y in test_api.py
+        # TODO: Once this returns 'O', please update test_select_x and test_select_y in test_api.py
 
-    if typ in ('mixed-integer', 'integer'):
-        if ordinal_threshold and pd.Series(data).nunique() <= ordinal_threshold:
-            return 'ordinal'
-        else:
+        if typ in ('mixed-integer', 'integer'):
+            if (ordinal_threshold and
+                    count_distinct(data, limit=ordinal_threshold) <= ordinal_threshold):
+                return 'ordinal'
+            else:
+                return 'quantitative'
+        elif typ in ('floating', 'mixed-integer-float', 'complex'):
             return 'quantitative'
-    elif typ in ('floating', 'mixed-integer-float', 'complex'):
-        return 'quantitative'
-    elif typ in ('string', 'bytes', 'categorical', 'boolean', 'mixed', 'unicode', 'object'):
-        return 'nominal'
-    elif typ in ('datetime', 'datetime64', 'timedelta',
-                 'timedelta64', 'date', 'time', 'period'):
-        return 'temporal'
-    else:
-        warnings.warn("I don't know how to infer vegalite type from '{0}'.  "
-                      "Defaulting to nominal.".format(typ))
-        return 'nominal'
+        elif typ in ('string', 'bytes', 'categorical', 'boolean', 'mixed', 'unicode', 'object'):
+            return 'nominal'
+        elif typ in ('datetime', 'datetime64', 'timedelta',
+                     'timedelta64', 'date', 'time', 'period'):
+            return 'temporal'
+        else:
+            warnings.warn("I don't know how to infer vegalite type from '{0}'.  "
+                          "Defaulting to nominal.".format(typ))
+            return 'nominal'
+
+
+# The number of leading values counted first, when only whether the count
+# exceeds a limit is needed
+DISTINCT_PROBE = 4096
+
+
+def mix_hashes(hashes):
+    """Scramble the bits of 64-bit hashes (the splitmix64 finalizer).
+
+    Python's hashes of small integers are the integers themselves; this
+    spreads them over all 64 bits, as ``hyperloglog`` requires.
+    """
+    hashes = np.asarray(hashes).astype(np.uint64)
+    with np.errstate(over='ignore'):
+        hashes ^= hashes >> np.uint64(30)
+        hashes *= np.uint64(0xbf58476d1ce4e5b9)
+        hashes ^= hashes >> np.uint64(27)
+        hashes *= np.uint64(0x94d049bb133111eb)
+        hashes ^= hashes >> np.uint64(31)
+    return hashes
+
+
+def hyperloglog(hashes, precision=14):
+    """Estimate the number of distinct values from their 64-bit hashes.
+
+    This is the HyperLogLog estimate, with the linear counting correction
+    for small cardinalities, over 2 ** precision registers; its relative
+    standard error is about 1.04 / sqrt(2 ** precision) (0.8% by default).
+    """
+    hashes = np.asarray(hashes, dtype=np.uint64)
+    if len(hashes) == 0:
+        return 0
+    m = 1 << precision
+    index = (hashes >> np.uint64(64 - precision)).astype(np.intp)
+    rest = hashes << np.uint64(precision)
+    # the position of the first set bit of the remaining bits
+    max_rank = 64 - precision + 1
+    with np.errstate(divide='ignore'):
+        top = np.floor(np.log2(rest.astype(float)))
+    rank = np.where(rest == 0, max_rank, np.minimum(64 - top, max_rank)).astype(np.intp)
+
+    # the registers hold the highest rank of the hashes they index
+    width = max_rank + 1
+    seen = np.bincount(index * width + rank, minlength=m * width).reshape(m, width) > 0
+    registers = np.where(seen.any(axis=1), width - 1 - np.argmax(seen[:, ::-1], axis=1), 0)
+
+    alpha = 0.7213 / (1 + 1.079 / m)
+    estimate = alpha * m * m / np.ldexp(1.0, -registers).sum()
+    zeros = np.count_nonzero(registers == 0)
+    if estimate <= 2.5 * m and zeros:
+        estimate = m * np.log(m / float(zeros))
+    return int(round(estimate))
+
+
+def count_distinct(values, limit=None, exact_below=10 ** 6):
+    """Count the distinct non-null values of an array, as cheaply as possible.
+
+    - categorical values are counted from their codes, without hashing;
+    - integers spanning a range no larger than their number are counted
+      with a bincount;
+    - other values are counted exactly with ``nunique``, except for object
+      arrays with more than ``exact_below`` distinct values, as estimated
+      from the repeats within a sample. Their count is estimated with
+      ``hyperloglog``, from the hashes Python caches on strings, which is
+      faster than filling the large hash table of ``nunique`` and takes
+      constant memory. The estimate depends on the process's hash seed.
+
+    Parameters
+    ----------
+    values : array-like
+        the values to count
+    limit : int, optional
+        if given, only whether the count exceeds limit is needed: the values
+        are first counted over a leading slice, and if that count exceeds
+        limit, it is returned.
+    exact_below : int, optional
+        the largest number of distinct object values counted exactly
+
+    Returns
+    -------
+    count : int
+        the (estimated) number of distinct values
+    """
+    ser = values if isinstance(values, pd.Series) else pd.Series(values)
+    if isinstance(ser.dtype, pd.CategoricalDtype):
+        codes = np.asarray(ser.cat.codes)
+        return int(np.count_nonzero(np.bincount(codes[codes >= 0], minlength=1)))
+    if limit is not None and len(ser) > DISTINCT_PROBE:
+        count = ser.iloc[:DISTINCT_PROBE].nunique()
+        if count > limit:
+            return int(count)
+    if ser.dtype.kind in 'iu':
+        # nullable integer arrays may hold missing values
+        ints = ser[ser.notnull()] if ser.hasnans else ser
+        ints = np.asarray(ints, dtype=getattr(ints.dtype, 'numpy_dtype', ints.dtype))
+        if not len(ints):
+            return 0
+        vmin, vmax = int(ints.min()), int(ints.max())
+        if vmax - vmin < max(len(ints), DISTINCT_PROBE):
+            offsets = (ints - ints.dtype.type(vmin)).astype(np.intp)
+            return int(np.count_nonzero(np.bincount(offsets)))
+    if ser.dtype.kind != 'O' or len(ser) <= exact_below:
+        return int(ser.nunique())
+    sample = ser.values[::max(len(ser) // DISTINCT_PROBE, 1)]
+    sample = sample[pd.notnull(sample)]
+    repeats = len(sample) - len(pd.unique(sample))
+    # the number of distinct values for which this many repeats are expected
+    if repeats and len(sample) ** 2 / (2.0 * repeats) <= exact_below:
+        return int(ser.nunique())
+    values = ser.values[pd.notnull(ser.values)]
+    hashes = np.fromiter(map(hash, values), dtype=np.int64, count=len(values))
+    return hyperloglog(mix_hashes(hashes))
 
 
 def unpivot_frame(frame, x=None, y=None,
-                  var_name='variable', value_name='value'):
+                  var_name='variable', value_name='value', by=None):
     """Unpivot a dataframe for use with Vega/Vega-Lite
 
     The input is a frame with any number of columns,
     output is a frame with three columns: x value, y values,
-    and variable names.
+    and variable names. If ``by`` is specified, that column is
+    kept alongside the x values rather than being unpivoted.
     """
     if x is None:
         cols = frame.columns
@@ -68,10 +192,364 @@ def unpivot_frame(frame, x=None, y=None,
         _ = frame[x] # noqa
     if y is not None:
         _ = frame[y] # noqa
+    if by is not None:
+        _ = frame[by] # noqa
+        x = (x if isinstance(x, list) else [x]) + [by]
     return frame.melt(id_vars=x, value_vars=y,
                       var_name=var_name, value_name=value_name)
 
 
+def series_count(frame, x=None, y=None, by=None):
+    """The number of series (distinct variables) of ``unpivot_frame``.
+
+    This is counted from the columns of the frame, rather than from the
+    variable column of the much longer unpivoted frame.
+    """
+    if y is not None:
+        return 1 if np.isscalar(y) else len(y)
+    ids = []
+    for key in (x, by):
+        if key is not None:
+            ids.extend(key if isinstance(key, (list, tuple)) else [key])
+    return sum(1 for col in frame.columns if col not in ids)
+
+
+def downsample_groups(frame, keys, max_points, method='stride'):
+    """Reduce each group of rows in frame to at most max_points rows.
+
+    Parameters
+    ----------
+    frame : DataFrame
+        the data to downsample
+    keys : list
+        the columns defining the groups
+    max_points : integer
+        the maximum number of rows to keep in each group
+    method : string, {'stride', 'mean'}
+        If 'stride' (default), keep every n-th row of each group. If 'mean',
+        split each group into max_points consecutive buckets of rows and
+        average the numeric and datetime columns within each bucket.
+
+    Returns
+    -------
+    frame : DataFrame
+        the downsampled data, with groups in order of first appearance
+    """
+    if method not in ('stride', 'mean'):
+        raise ValueError("Unrecognized downsampling method: {0}".format(method))
+    max_points = int(max_points)
+    if max_points <= 0:
+        raise ValueError("max_points must be a positive integer")
+
+    if keys:
+        key_codes = frame.groupby(keys, sort=False).ngroup().values
+    else:
+        key_codes = np.zeros(len(frame), dtype=int)
+    valid = key_codes >= 0
+    if not valid.all():
+        frame, key_codes = frame[valid], key_codes[valid]
+    size = np.bincount(key_codes)[key_codes]
+    if (size <= max_points).all():
+        return frame
+    position = pd.Series(key_codes).groupby(key_codes).cumcount().values
+
+    if method == 'stride':
+        step = np.ceil(size / float(max_points)).astype(int)
+        return frame[position % step == 0]
+
+    # Number the buckets of all groups consecutively and average with
+    # bincount, which (unlike groupby.mean) also handles datetime columns.
+    bucket = position * max_points // size
+    codes = pd.factorize(key_codes * max_points + bucket)[0]
+    counts = np.bincount(codes).astype(float)
+    first = np.unique(codes, return_index=True)[1]
+
+    columns = {}
+    for col in frame.columns:
+        values = frame[col]
+        if col in keys or values.dtype.kind not in 'iufM':
+            columns[col] = values.values[first]
+        elif values.dtype.kind == 'M':
+            tz = getattr(values.dtype, 'tz', None)
+            ints = np.asarray(values.values, dtype='datetime64[ns]').view('int64')
+            means = np.bincount(codes, weights=ints) / counts
+            result = pd.Series(means.astype('int64').view('datetime64[ns]'))
+            if tz is not None:
+                result = result.dt.tz_localize('UTC').dt.tz_convert(tz)
+            columns[col] = result.values if tz is None else result
+        else:
+            columns[col] = np.bincount(codes, weights=values.values) / counts
+    return pd.DataFrame(columns, columns=frame.columns)
+
+
+def aggregate_duplicates(frame, keys, value_name, agg):
+    """Combine the values of the rows sharing the same keys.
+
+    Parameters
+    ----------
+    frame : DataFrame
+        the data, in long form
+    keys : list
+        the columns identifying a mark, e.g. the x value and the variable
+    value_name : string
+        the column holding the values
+    agg : string or callable
+        the aggregation, validated with ``validate_aggregation``
+
+    Returns
+    -------
+    frame : DataFrame
+        one row per distinct keys, in order of first appearance. Rows with
+        missing keys, which groupby would drop, are not combined but follow
+        the others with their own value aggregated. If no keys are repeated,
+        frame is returned unchanged.
+    """
+    agg = validate_aggregation(agg)
+    missing = frame[keys].isnull().any(axis=1).values
+    if missing.any():
+        present = frame[~missing]
+        combined = aggregate_duplicates(present, keys, value_name, agg)
+        if combined is present:
+            return frame
+        rest = frame[missing].copy()
+        rest[value_name] = rest[value_name].groupby(
+            np.arange(len(rest))).agg(agg).values
+        return pd.concat([combined, rest], ignore_index=True)
+    grouped = frame.groupby(keys, sort=False, observed=True)
+    if grouped.ngroups == len(frame):
+        return frame
+    return grouped[value_name].agg(agg).reset_index()[frame.columns]
+
+
+STACK_OFFSETS = ('zero', 'normalize', 'center')
+
+
+def validate_stack(stacked):
+    """Translate a ``stacked`` argument into a Vega-Lite stack offset.
+
+    True is equivalent to 'zero', and False or None to no stacking (None).
+    """
+    if stacked is True:
+        return 'zero'
+    if stacked is False or stacked is None:
+        return None
+    if stacked not in STACK_OFFSETS:
+        raise ValueError("stacked must be a boolean or one of {0}; got {1!r}"
+                         "".format(STACK_OFFSETS, stacked))
+    return stacked
+
+
+def stack_offsets(frame, x, var_name, value_name, offset='zero', keys=(),
+                  start='start', end='end', fill=False):
+    """Compute the offsets of stacked marks, as Vega's stack transform would.
+
+    The values are pivoted into an array with one row per stack (x value,
+    within any groups ``keys``) and one column per series (``var_name``),
+    and stacked with a cumulative sum along the rows. The series are stacked
+    in descending order, from the bottom, as Vega-Lite 2 stacks by the
+    color field by default.
+
+    Parameters
+    ----------
+    frame : DataFrame
+        the data, in long form
+    x : string
+        the column of positions along the stacks
+    var_name : string
+        the column identifying the series
+    value_name : string
+        the column holding the values
+    offset : string, {'zero', 'normalize', 'center'}
+        'zero' stacks positive and negative values separately, from zero.
+        'normalize' stacks absolute values scaled to sum to one. 'center'
+        stacks absolute values centered around the middle of the tallest
+        stack (within each group).
+    keys : list
+        the columns defining groups (e.g. facets) stacked independently
+    start, end : string
+        the names of the output columns of the offsets
+    fill : bool
+        if True, output a (zero) row for every series of every stack, as
+        needed by areas; otherwise only for the rows present in frame.
+
+    Returns
+    -------
+    frame : DataFrame
+        one row per series of each stack, with the columns keys, x,
+        var_name, value_name, start and end. Duplicate rows are summed.
+    """
+    offset = validate_stack(offset)
+    if offset is None:
+        raise ValueError("offset must be one of {0}".format(STACK_OFFSETS))
+    keys = list(keys)
+    frame = frame[frame[var_name].notnull()]
+    stack_codes = frame.groupby(keys + [x], sort=False, observed=True).ngroup().values
+    frame, stack_codes = frame[stack_codes >= 0], stack_codes[stack_codes >= 0]
+    series_codes, series = pd.factorize(frame[var_name], sort=True)
+    n_stacks = stack_codes.max() + 1 if len(stack_codes) else 0
+
+    values = np.zeros((n_stacks, len(series)))
+    present = np.zeros(values.shape, dtype=bool)
+    np.add.at(values, (stack_codes, series_codes),
+              np.nan_to_num(np.asarray(frame[value_name], dtype=float)))
+    present[stack_codes, series_codes] = True
+    # stack the series in descending order
+    values = values[:, ::-1]
+
+    if offset == 'zero':
+        positive = np.where(values > 0, values, 0).cumsum(axis=1)
+        negative = np.where(values < 0, values, 0).cumsum(axis=1)
+        y1 = np.where(values < 0, negative, positive)
+        y0 = y1 - values
+    else:
+        heights = np.abs(values)
+        y1 = heights.cumsum(axis=1)
+        totals = y1[:, -1:] if len(series) else np.zeros((n_stacks, 1))
+        if offset == 'normalize':
+            scale = np.divide(1.0, totals, out=np.zeros_like(totals),
+                              where=totals > 0)
+            heights, y1 = heights * scale, y1 * scale
+        else:
+            first = np.unique(stack_codes, return_index=True)[1]
+            groups = (frame[keys].iloc[first].groupby(keys, sort=False, observed=True)
+                      .ngroup().values if keys else np.zeros(n_stacks, dtype=int))
+            tallest = np.zeros(groups.max() + 1 if n_stacks else 0)
+            np.maximum.at(tallest, groups, totals[:, 0])
+            y1 = y1 + ((tallest[groups] - totals[:, 0]) / 2)[:, None]
+        y0 = y1 - heights
+    values, y0, y1 = values[:, ::-1], y0[:, ::-1], y1[:, ::-1]
+
+    rows, cols = np.nonzero(np.ones_like(present) if fill else present)
+    first = np.unique(stack_codes, return_index=True)[1]
+    result = frame[keys + [x]].iloc[first[rows]].reset_index(drop=True)
+    result[var_name] = series.take(cols)
+    result[value_name] = values[rows, cols]
+    result[start] = y0[rows, cols]
+    result[end] = y1[rows, cols]
+    return result
+
+
+def top_k_categories(frame, field, value_name, k, other_label='other', keys=()):
+    """Keep the k categories with the largest total, and sum the others.
+
+    Parameters
+    ----------
+    frame : DataFrame
+        the data, in long form
+    field : string
+        the column holding the categories
+    value_name : string
+        the column holding the values
+    k : integer
+        the number of categories to keep
+    other_label : string (default: 'other')
+        the category of the summed remainder
+    keys : list
+        the columns defining the series (e.g. the variable, and the group);
+        the remainder is summed within each series.
+
+    Returns
+    -------
+    frame : DataFrame
+        the rows of the top k categories, in their original order, followed
+        by one row per series for the remainder. The categories are ranked
+        by their value summed over all series. If there are no more than k
+        categories, frame is returned unchanged.
+    """
+    k = int(k)
+    if k <= 0:
+        raise ValueError("top_k must be a positive integer")
+    codes, uniques = pd.factorize(frame[field], sort=False)
+    if len(uniques) <= k:
+        return frame
+
+    valid = codes >= 0
+    values = np.nan_to_num(np.asarray(frame[value_name], dtype=float))
+    totals = np.bincount(codes[valid], weights=values[valid], minlength=len(uniques))
+    keep = np.zeros(len(uniques), dtype=bool)
+    keep[np.argpartition(-totals, k - 1)[:k]] = True
+    in_top = np.where(valid, keep[codes], True)
+
+    rest = frame[~in_top]
+    keys = list(keys)
+    if keys:
+        other = rest.groupby(keys, sort=False)[value_name].sum().reset_index()
+    else:
+        other = pd.DataFrame({value_name: [rest[value_name].sum()]})
+    other[field] = other_label
+
+    top = frame[in_top].astype({field: object})
+    return pd.concat([top, other], ignore_index=True)[frame.columns]
+
+
+BOX_STATS = ('count', 'lower', 'q1', 'median', 'q3', 'upper')
+
+
+def sample_by_rank(values, n):
+    """At most n of the values, sorted and evenly spaced in rank.
+
+    The smallest and largest values are always included.
+    """
+    values = np.sort(values)
+    if len(values) <= n:
+        return values
+    return values[np.linspace(0, len(values) - 1, n).round().astype(np.int64)]
+
+
+def whisker_bounds(q1, q3, whis=1.5):
+    """The range within which the whiskers of a box plot extend"""
+    iqr = q3 - q1
+    return q1 - whis * iqr, q3 + whis * iqr
+
+
+def box_stats(values, whis=1.5, max_outliers=100):
+    """Compute the statistics of a box plot, as pandas' ``plot.box`` draws it.
+
+    The quartiles are interpolated linearly, as by ``Series.quantile``, from
+    a partition of the values rather than a full sort. The whiskers extend
+    to the most extreme values within ``whis`` times the interquartile range
+    of the box, and the values beyond them are outliers.
+
+    Parameters
+    ----------
+    values : array-like
+        the values; non-finite values are ignored
+    whis : float, optional
+        the reach of the whiskers, in interquartile ranges (default: 1.5)
+    max_outliers : int, optional
+        the maximum number of outliers to return. If there are more, a
+        sample evenly spaced in rank is returned.
+
+    Returns
+    -------
+    stats : dict or None
+        the count, lower whisker, quartiles and upper whisker (see
+        ``BOX_STATS``), or None if there are no finite values
+    outliers : ndarray
+        the (sampled) outliers, sorted
+    """
+    values = np.asarray(values, dtype=float).ravel()
+    values = values[np.isfinite(values)]
+    n = len(values)
+    if n == 0:
+        return None, values
+    positions = np.array([0.25, 0.5, 0.75]) * (n - 1)
+    lo = np.floor(positions).astype(np.int64)
+    hi = np.ceil(positions).astype(np.int64)
+    part = np.partition(values, np.unique(np.concatenate([lo, hi])))
+    q1, median, q3 = part[lo] + (part[hi] - part[lo]) * (positions - lo)
+    low, high = whisker_bounds(q1, q3, whis)
+    inside = (values >= low) & (values <= high)
+    if inside.any():
+        lower, upper = values[inside].min(), values[inside].max()
+    else:
+        # as in matplotlib, whiskers with no values in reach close the box
+        lower, upper = q1, q3
+    stats = dict(count=n, lower=float(lower), q1=float(q1), median=float(median),
+                 q3=float(q3), upper=float(upper))
+    return stats, sample_by_rank(values[~inside], max_outliers)
+
+
 def warn_if_keywords_unused(kind, kwds):
     if kwds:
         if len(kwds) == 1:
@@ -113,3 +591,55 @@ def validate_aggregation(agg):
         raise ValueError("Unrecognized Vega-Lite aggregation: {0}".format(agg))
 
     return agg
+
+
+def resolve_n_jobs(n_jobs):
+    """Translate an ``n_jobs`` argument into a number of workers.
+
+    ``None`` means one worker; negative values count back from the number
+    of available cores, so that ``-1`` uses all of them.
+    """
+    if n_jobs is None:
+        return 1
+    if n_jobs != int(n_jobs) or int(n_jobs) == 0:
+        raise ValueError("n_jobs must be a nonzero integer or None")
+    n_jobs = int(n_jobs)
+    if n_jobs < 0:
+        n_jobs = max(1, multiprocessing.cpu_count() + 1 + n_jobs)
+    return n_jobs
+
+
+def parallel_map(func, items, n_jobs=None):
+    """Apply func to each of items, optionally using a pool of threads.
+
+    Workers share the memory of the calling process, so arrays referenced by
+    func are not copied. Results are returned in the order of items,
+    regardless of the order in which the workers finish.
+
+    Parameters
+    ----------
+    func : callable
+        function of a single argument
+    items : iterable
+        the arguments to pass to func
+    n_jobs : integer, optional
+        the number of workers to use (see ``resolve_n_jobs``). If None
+        (default) then func is evaluated serially.
+
+    Returns
+    -------
+    results : list
+        the list ``[func(item) for item in items]``
+    """
+    items = list(items)
+    n_jobs = min(resolve_n_jobs(n_jobs), len(items))
+    if n_jobs <= 1:
+        return [func(item) for item in items]
+
+    from multiprocessing.pool import ThreadPool
+    pool = ThreadPool(n_jobs)
+    try:
+        return pool.map(func, items)
+    finally:
+        pool.close()
+        pool.join()
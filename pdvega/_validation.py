@@ -0,0 +1,130 @@
+"""Cached validation of chart specifications.
+
+The specifications built by pdvega come from a small number of templates,
+which differ from chart to chart in their data, field names and titles.
+Rather than running the JSON schema validator over every chart, each
+specification is reduced to its shape, which excludes these, and each shape
+is validated once; later specifications of the same shape are trusted.
+"""
+import json
+
+from ._lazy import alt
+from ._utils import string_types
+from .instrumentation import stage, traced
+
+# Keys whose string values are free-form, and so do not affect validity
+FREE_TEXT_KEYS = ("field", "title")
+
+_validated_shapes = set()
+_chart_class = []
+
+
+def _mask_free_text(obj, key=None):
+    if isinstance(obj, dict):
+        # inline data, e.g. the tables of dictionary_encode lookups
+        return {k: [] if k == "values" and key == "data" else _mask_free_text(v, k)
+                for k, v in obj.items()}
+    if isinstance(obj, list):
+        return [_mask_free_text(v) for v in obj]
+    if key in FREE_TEXT_KEYS and isinstance(obj, string_types):
+        return ""
+    return obj
+
+
+def spec_shape(spec):
+    """Return the shape of a specification, used as its validation key.
+
+    The data and datasets are replaced by a named data reference, the
+    values of inline data within the specification (e.g. in lookup
+    transforms) by an empty list, and the strings of the free-text keys
+    (field names and titles) are blanked.
+    The shape is itself a valid specification if and only if spec is.
+    """
+    shape = {key: value for key, value in spec.items()
+             if key not in ("data", "datasets")}
+    if "data" in spec:
+        shape["data"] = {"name": "data"}
+    return _mask_free_text(shape)
+
+
+def validate_spec(spec):
+    """Validate a unit chart specification, once per shape.
+
+    Parameters
+    ----------
+    spec : dict
+        the Vega-Lite specification of a (possibly faceted) unit chart
+
+    Returns
+    -------
+    validated : bool
+        True if the specification was checked by the schema validator, and
+        False if a specification of the same shape had already been.
+
+    Raises
+    ------
+    jsonschema.ValidationError :
+        if the specification is invalid
+    """
+    shape = spec_shape(spec)
+    key = json.dumps(shape, sort_keys=True)
+    if key in _validated_shapes:
+        return False
+    alt.Chart.validate(shape)
+    _validated_shapes.add(key)
+    return True
+
+
+def clear_cache():
+    """Forget the validated shapes"""
+    _validated_shapes.clear()
+
+
+def chart_class():
+    """The ``alt.Chart`` subclass of the charts built by pdvega.
+
+    Its ``to_dict`` validates through ``validate_spec``, and is timed as
+    the ``serialize`` stage. The class is defined on first use, so that
+    altair is only imported when needed.
+    """
+    if _chart_class:
+        return _chart_class[0]
+
+    class Chart(alt.Chart):
+        __doc__ = alt.Chart.__doc__
+
+        def to_dict(self, *args, **kwargs):
+            if args or kwargs.get("validate", True) is not True:
+                return super(Chart, self).to_dict(*args, **kwargs)
+            return self._serialize(**kwargs)
+
+        @traced("to_dict")
+        def _serialize(self, **kwargs):
+            with stage("serialize") as timer:
+                kwargs["validate"] = False
+                dct = super(Chart, self).to_dict(**kwargs)
+                try:
+                    validate_spec(dct)
+                except alt.utils.schemapi.jsonschema.ValidationError:
+                    # re-validate in depth, for altair's more helpful error
+                    kwargs["validate"] = "deep"
+                    dct = super(Chart, self).to_dict(**kwargs)
+                timer.output_spec(dct)
+            return dct
+
+        def __reduce__(self):
+            # the class is not a module attribute, so pickle a reference to
+            # the function rebuilding it instead
+            return (_restore_chart, (self.__dict__,))
+
+    Chart.__qualname__ = "Chart"
+    _chart_class.append(Chart)
+    return Chart
+
+
+def _restore_chart(state):
+    """Rebuild a pickled instance of the ``chart_class``"""
+    cls = chart_class()
+    chart = cls.__new__(cls)
+    chart.__dict__.update(state)
+    return chart
@@ -0,0 +1,223 @@
+"""Render many charts at once, optionally across a pool of processes"""
+import json
+import os
+import pickle
+import shutil
+import tempfile
+import time
+import traceback
+from collections import OrderedDict
+
+import numpy as np
+import pandas as pd
+
+from ._utils import resolve_n_jobs
+
+__all__ = ["render_many"]
+
+FORMATS = ("json", "html", "csv")
+
+
+def _is_mappable(dtype):
+    """True if values of this dtype can be stored as a memory-mapped array"""
+    return isinstance(dtype, np.dtype) and dtype.kind in "biufcmM"
+
+
+def dump_frame(data, path):
+    """Store a Series or DataFrame in the directory path.
+
+    Columns with plain numpy dtypes are written as .npy files which can be
+    memory-mapped by ``load_frame``; anything else is pickled.
+    """
+    os.makedirs(path)
+    is_series = isinstance(data, pd.Series)
+    frame = data.to_frame() if is_series else data
+    meta = {
+        "series": is_series,
+        "columns": list(frame.columns),
+        "mapped": [],
+        "pickled": {},
+    }
+
+    def store(key, values):
+        if _is_mappable(values.dtype):
+            np.save(os.path.join(path, key + ".npy"), np.asarray(values))
+            meta["mapped"].append(key)
+        elif isinstance(values, pd.Series):
+            meta["pickled"][key] = values.array
+        else:
+            meta["pickled"][key] = values
+
+    store("index", frame.index)
+    meta["index_name"] = frame.index.name
+    for i, col in enumerate(frame.columns):
+        store(str(i), frame.iloc[:, i])
+
+    with open(os.path.join(path, "meta.pkl"), "wb") as f:
+        pickle.dump(meta, f, protocol=pickle.HIGHEST_PROTOCOL)
+
+
+def load_frame(path):
+    """Load a Series or DataFrame stored with ``dump_frame``"""
+    with open(os.path.join(path, "meta.pkl"), "rb") as f:
+        meta = pickle.load(f)
+
+    def fetch(key):
+        if key in meta["mapped"]:
+            return np.load(os.path.join(path, key + ".npy"), mmap_mode="r")
+        return meta["pickled"][key]
+
+    index = pd.Index(fetch("index"), name=meta["index_name"])
+    columns = [pd.Series(fetch(str(i)), index=index, name=col)
+               for i, col in enumerate(meta["columns"])]
+    if meta["series"]:
+        return columns[0]
+    # build the frame without consolidating the columns into blocks, which
+    # would copy the memory-mapped arrays
+    frame = pd.DataFrame(OrderedDict(enumerate(columns)), index=index, copy=False)
+    frame.columns = meta["columns"]
+    return frame
+
+
+def build_chart(data, kind, kwds):
+    """Build a chart with a vgplot method, or a ``pdvega.plotting`` function"""
+    from . import plotting
+    if kind in plotting.__all__:
+        return getattr(plotting, kind)(data, **kwds)
+    return data.vgplot(kind=kind, **kwds)
+
+
+def _result(index, kind, error=None):
+    return {"job": index, "kind": kind, "error": error, "paths": [],
+            "spec": None, "timings": {}}
+
+
+def _render(job):
+    """Render a single job, recording timings and any failure"""
+    index, data, kind, kwds, out_dir, formats = job
+    result = _result(index, kind)
+    timings = result["timings"]
+    try:
+        start = time.time()
+        if not isinstance(data, (pd.Series, pd.DataFrame)):
+            data = load_frame(data)
+        timings["load"] = time.time() - start
+
+        start = time.time()
+        chart = build_chart(data, kind, dict(kwds))
+        timings["build"] = time.time() - start
+
+        start = time.time()
+        spec = chart.to_dict()
+        timings["serialize"] = time.time() - start
+
+        start = time.time()
+        if out_dir is None:
+            result["spec"] = spec
+        else:
+            base = os.path.join(out_dir, "chart-{0}".format(index))
+            for fmt in formats:
+                path = "{0}.{1}".format(base, fmt)
+                if fmt == "json":
+                    with open(path, "w") as f:
+                        json.dump(spec, f)
+                elif fmt == "html":
+                    chart.save(path)
+                elif fmt == "csv":
+                    chart.data.to_csv(path, index=False)
+                result["paths"].append(path)
+        timings["write"] = time.time() - start
+    except Exception:
+        result["error"] = traceback.format_exc()
+    return result
+
+
+def render_many(jobs, n_jobs=None, out_dir=None, formats=("json",)):
+    """Render many charts, optionally in parallel worker processes.
+
+    Failures of individual jobs, including data or keywords which cannot be
+    passed to the workers, are recorded in the results rather than aborting
+    the batch. Frames are passed to the workers as memory-mapped
+    files rather than being pickled, and a frame used by several jobs is
+    written only once.
+
+    Parameters
+    ----------
+    jobs : iterable
+        tuples ``(data, kind, kwds)``, where ``data`` is a Series or
+        DataFrame, ``kind`` is the name of a ``vgplot`` method (e.g. 'line')
+        or of a ``pdvega.plotting`` function (e.g. 'scatter_matrix'), and
+        ``kwds`` is a dictionary of keywords for that method.
+    n_jobs : int, optional
+        the number of worker processes. If None (default) the charts are
+        rendered serially in the current process; -1 uses all cores.
+    out_dir : string, optional
+        the directory in which to write the outputs, named ``chart-<i>.<fmt>``
+        for the i-th job. If None, the specifications are returned in the
+        results rather than written.
+    formats : tuple, optional
+        the outputs to write for each chart: any of 'json' (the Vega-Lite
+        specification), 'html' and 'csv' (the chart data).
+
+    Returns
+    -------
+    results : list of dict
+        one entry per job, in the order of ``jobs``, with keys ``job`` (the
+        job index), ``kind``, ``error`` (a traceback string, or None on
+        success), ``paths`` (the files written), ``spec`` (the specification,
+        if out_dir is None) and ``timings`` (seconds spent in each of the
+        load, build, serialize and write stages).
+
+    Examples
+    --------
+    >>> jobs = [(df, 'line', {}), (df, 'scatter', {'x': 'a', 'y': 'b'})]  # doctest: +SKIP
+    >>> results = pdvega.render_many(jobs, n_jobs=4, out_dir='charts')  # doctest: +SKIP
+    >>> [r['error'] for r in results if r['error']]  # doctest: +SKIP
+    """
+    for fmt in formats:
+        if fmt not in FORMATS:
+            raise ValueError("Unrecognized format: {0!r}".format(fmt))
+    if out_dir is not None and not os.path.isdir(out_dir):
+        os.makedirs(out_dir)
+
+    jobs = [tuple(job) for job in jobs]
+    n_jobs = min(resolve_n_jobs(n_jobs), len(jobs))
+    if n_jobs <= 1:
+        return [_render((i, data, kind, kwds, out_dir, formats))
+                for i, (data, kind, kwds) in enumerate(jobs)]
+
+    import multiprocessing
+    tmpdir = tempfile.mkdtemp(prefix="pdvega-")
+    try:
+        paths = {}
+        errors = {}
+        results = [None] * len(jobs)
+        tasks = []
+        for i, (data, kind, kwds) in enumerate(jobs):
+            if id(data) not in paths and id(data) not in errors:
+                path = os.path.join(tmpdir, str(i))
+                try:
+                    dump_frame(data, path)
+                    paths[id(data)] = path
+                except Exception:
+                    errors[id(data)] = traceback.format_exc()
+            if id(data) in errors:
+                results[i] = _result(i, kind, errors[id(data)])
+                continue
+            task = (i, paths[id(data)], kind, kwds, out_dir, formats)
+            try:
+                pickle.dumps(task, protocol=pickle.HIGHEST_PROTOCOL)
+            except Exception:
+                results[i] = _result(i, kind, traceback.format_exc())
+                continue
+            tasks.append(task)
+        pool = multiprocessing.Pool(n_jobs)
+        try:
+            for result in pool.map(_render, tasks, chunksize=1):
+                results[result["job"]] = result
+        finally:
+            pool.close()
+            pool.join()
+        return results
+    finally:
+        shutil.rmtree(tmpdir, ignore_errors=True)
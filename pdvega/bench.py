@@ -0,0 +1,307 @@
+"""Benchmarks of chart construction across chart kinds and data sizes.
+
+Run from the command line with::
+
+    $ python -m pdvega.bench --output results.json
+    $ python -m pdvega.bench --baseline results.json
+
+Every ``vgplot`` method and every ``pdvega.plotting`` function is timed on
+narrow and wide frames of each size. For each case the suite records the
+time to build the chart, the time to convert it to a dictionary with
+``to_dict``, the peak memory allocated over both steps (as measured by
+``tracemalloc``, where available) and the size of the serialized
+specification in bytes.
+"""
+import argparse
+import fnmatch
+import json
+import platform
+import sys
+from collections import OrderedDict
+from timeit import default_timer
+
+import numpy as np
+import pandas as pd
+
+try:
+    import tracemalloc
+except ImportError:  # Python 2
+    tracemalloc = None
+
+__all__ = ["run", "compare", "main"]
+
+SIZES = (10 ** 3, 10 ** 4, 10 ** 5, 10 ** 6, 10 ** 7)
+DEFAULT_SIZES = (10 ** 3, 10 ** 4)
+SHAPES = OrderedDict([("narrow", 3), ("wide", 20)])
+METRICS = ("build", "to_dict", "peak_memory", "payload")
+
+# Timings are noisy, so by default only relative changes larger than this
+# are reported as regressions.
+DEFAULT_THRESHOLD = 0.25
+
+
+def _plotting(name, **kwds):
+    def build(df):
+        from . import plotting
+        return getattr(plotting, name)(df, **kwds)
+    return build
+
+
+# (name, function building the chart from a frame, needs a class column)
+TARGETS = [
+    ("series.line", lambda df: df.iloc[:, 0].vgplot.line(), False),
+    ("series.area", lambda df: df.iloc[:, 0].vgplot.area(), False),
+    ("series.bar", lambda df: df.iloc[:, 0].vgplot.bar(), False),
+    ("series.barh", lambda df: df.iloc[:, 0].vgplot.barh(), False),
+    ("series.hist", lambda df: df.iloc[:, 0].vgplot.hist(), False),
+    ("series.kde", lambda df: df.iloc[:, 0].vgplot.kde(), False),
+    ("series.box", lambda df: df.iloc[:, 0].vgplot.box(), False),
+    ("frame.line", lambda df: df.vgplot.line(), False),
+    ("frame.scatter", lambda df: df.vgplot.scatter(df.columns[0], df.columns[1]), False),
+    ("frame.area", lambda df: df.vgplot.area(), False),
+    ("frame.bar", lambda df: df.vgplot.bar(), False),
+    ("frame.barh", lambda df: df.vgplot.barh(), False),
+    ("frame.hist", lambda df: df.vgplot.hist(), False),
+    ("frame.heatmap", lambda df: df.vgplot.heatmap(df.columns[0], df.columns[1]), False),
+    ("frame.kde", lambda df: df.vgplot.kde(), False),
+    ("frame.box", lambda df: df.vgplot.box(), False),
+    ("scatter_matrix", _plotting("scatter_matrix"), False),
+    ("andrews_curves", _plotting("andrews_curves", class_column="label"), True),
+    ("parallel_coordinates", _plotting("parallel_coordinates", class_column="label"), True),
+    ("lag_plot", _plotting("lag_plot"), False),
+    ("autocorrelation_plot", _plotting("autocorrelation_plot"), False),
+]
+
+
+def make_frame(rows, columns, label=False, random_state=0):
+    """Random-walk test data with the given number of rows and columns"""
+    rand = np.random.RandomState(random_state)
+    values = rand.randn(rows, columns).cumsum(0)
+    df = pd.DataFrame(values, columns=["c{0}".format(i) for i in range(columns)])
+    if label:
+        df["label"] = pd.Categorical.from_codes(rand.randint(0, 3, rows),
+                                                ["a", "b", "c"])
+    return df
+
+
+def measure(build, df, repeat=3):
+    """Measure the construction and serialization of a single chart.
+
+    Times are the best of ``repeat`` runs; memory and payload are measured
+    on a separate run, as tracing allocations slows down execution. The peak
+    memory is None if ``tracemalloc`` is not available.
+    """
+    build_times = []
+    dict_times = []
+    for _ in range(repeat):
+        start = default_timer()
+        chart = build(df)
+        build_times.append(default_timer() - start)
+        start = default_timer()
+        spec = chart.to_dict()
+        dict_times.append(default_timer() - start)
+
+    peak = None
+    if tracemalloc is not None:
+        tracemalloc.start()
+        try:
+            spec = build(df).to_dict()
+            _, peak = tracemalloc.get_traced_memory()
+        finally:
+            tracemalloc.stop()
+
+    return {
+        "build": min(build_times),
+        "to_dict": min(dict_times),
+        "peak_memory": peak,
+        "payload": len(json.dumps(spec).encode("utf-8")),
+    }
+
+
+def environment():
+    """Versions of the software being benchmarked"""
+    import altair as alt
+    import pdvega
+    return {
+        "python": platform.python_version(),
+        "pdvega": pdvega.__version__,
+        "altair": alt.__version__,
+        "pandas": pd.__version__,
+        "numpy": np.__version__,
+    }
+
+
+def run(targets=None, sizes=DEFAULT_SIZES, shapes=tuple(SHAPES), repeat=3,
+        log=None):
+    """Run the benchmark suite.
+
+    Parameters
+    ----------
+    targets : list of strings, optional
+        glob patterns selecting the benchmarks to run, e.g. ``'frame.*'``.
+        By default, all benchmarks are run.
+    sizes : tuple of ints, optional
+        the numbers of rows to benchmark
+    shapes : tuple of strings, optional
+        the frame shapes to benchmark: 'narrow' and/or 'wide'
+    repeat : int, optional
+        the number of timed runs of each benchmark
+    log : file-like, optional
+        if given, a line is written to it as each benchmark completes
+
+    Returns
+    -------
+    results : dict
+        ``environment``, the software versions, and ``results``, a list with
+        one entry per benchmark holding its ``target``, ``rows``, ``shape``,
+        ``error`` (None on success) and the measured metrics.
+    """
+    import altair as alt
+    selected = [(name, build, label) for name, build, label in TARGETS
+                if targets is None or any(fnmatch.fnmatch(name, pattern)
+                                          for pattern in targets)]
+    results = []
+
+    # altair refuses to embed more than 5000 rows by default
+    active = alt.data_transformers.active
+    options = dict(alt.data_transformers.options)
+    alt.data_transformers.enable("default", max_rows=None)
+    try:
+        for rows in sizes:
+            for shape in shapes:
+                frames = {}
+                for name, build, label in selected:
+                    if label not in frames:
+                        frames[label] = make_frame(rows, SHAPES[shape], label=label)
+                    result = {"target": name, "rows": rows, "shape": shape,
+                              "error": None}
+                    try:
+                        result.update(measure(build, frames[label], repeat=repeat))
+                    except Exception as err:
+                        result["error"] = "{0}: {1}".format(type(err).__name__, err)
+                    results.append(result)
+                    if log is not None:
+                        log.write(format_result(result) + "\n")
+                        log.flush()
+    finally:
+        alt.data_transformers.enable(active, **options)
+
+    return {"environment": environment(), "results": results}
+
+
+def _key(result):
+    return (result["target"], result["rows"], result["shape"])
+
+
+def compare(results, baseline, threshold=DEFAULT_THRESHOLD):
+    """Compare benchmark results with a baseline.
+
+    Parameters
+    ----------
+    results, baseline : dict
+        the output of ``run``
+    threshold : float, optional
+        the relative increase of a metric which counts as a regression
+
+    Returns
+    -------
+    regressions : list of dict
+        the metrics which increased by more than ``threshold``, with keys
+        ``target``, ``rows``, ``shape``, ``metric``, ``baseline``, ``value``
+        and ``ratio``. Benchmarks which fail but succeeded in the baseline
+        are reported with the metric 'error'.
+    """
+    reference = {_key(result): result for result in baseline["results"]}
+    regressions = []
+    for result in results["results"]:
+        base = reference.get(_key(result))
+        if base is None or base["error"] is not None:
+            continue
+        target, rows, shape = _key(result)
+        entry = {"target": target, "rows": rows, "shape": shape}
+        if result["error"] is not None:
+            regressions.append(dict(entry, metric="error", baseline=None,
+                                    value=result["error"], ratio=None))
+            continue
+        for metric in METRICS:
+            if not base[metric] or result[metric] is None:
+                continue
+            ratio = result[metric] / base[metric]
+            if ratio > 1 + threshold:
+                regressions.append(dict(entry, metric=metric, baseline=base[metric],
+                                        value=result[metric], ratio=ratio))
+    return regressions
+
+
+def format_result(result):
+    """Format a single benchmark result as a line of a table"""
+    line = "{target:<22} {rows:>9} {shape:<7}".format(**result)
+    if result["error"] is not None:
+        return line + "  ERROR " + result["error"].splitlines()[0]
+    peak = result["peak_memory"]
+    mem = "{0:>9.1f}MB".format(peak / 2.0 ** 20) if peak is not None else " " * 11
+    return line + (" {build:>9.4f}s {to_dict:>9.4f}s {mem} {kb:>10.1f}kB"
+                   "".format(build=result["build"], to_dict=result["to_dict"],
+                             mem=mem, kb=result["payload"] / 2.0 ** 10))
+
+
+def _parse_sizes(text):
+    return tuple(int(float(size)) for size in text.split(","))
+
+
+def main(args=None):
+    parser = argparse.ArgumentParser(
+        prog="python -m pdvega.bench",
+        description="Benchmark pdvega chart construction.")
+    parser.add_argument("targets", nargs="*",
+                        help="glob patterns of the benchmarks to run "
+                             "(default: all); e.g. 'frame.*'")
+    parser.add_argument("--sizes", type=_parse_sizes, default=DEFAULT_SIZES,
+                        help="comma-separated numbers of rows (default: 1e3,1e4)")
+    parser.add_argument("--full", action="store_true",
+                        help="run the full sweep of sizes, 1e3 to 1e7 rows")
+    parser.add_argument("--shapes", default=",".join(SHAPES),
+                        help="comma-separated frame shapes (default: narrow,wide)")
+    parser.add_argument("--repeat", type=int, default=3,
+                        help="number of timed runs of each benchmark")
+    parser.add_argument("--output", help="write the results as JSON to this file")
+    parser.add_argument("--baseline",
+                        help="compare the results with a JSON file of earlier "
+                             "results, and exit with status 1 on regressions")
+    parser.add_argument("--threshold", type=float, default=DEFAULT_THRESHOLD,
+                        help="relative increase counted as a regression")
+    args = parser.parse_args(args)
+
+    shapes = tuple(args.shapes.split(","))
+    for shape in shapes:
+        if shape not in SHAPES:
+            parser.error("unrecognized shape: {0!r}".format(shape))
+
+    sys.stdout.write("{0:<22} {1:>9} {2:<7} {3:>10} {4:>10} {5:>11} {6:>12}\n".format(
+        "target", "rows", "shape", "build", "to_dict", "peak mem", "payload"))
+    sizes = SIZES if args.full else args.sizes
+    results = run(args.targets or None, sizes=sizes, shapes=shapes,
+                  repeat=args.repeat, log=sys.stdout)
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(results, f, indent=2)
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        regressions = compare(results, baseline, threshold=args.threshold)
+        for r in regressions:
+            if r["metric"] == "error":
+                sys.stdout.write("REGRESSION {target} rows={rows} shape={shape}: "
+                                 "now fails\n".format(**r))
+            else:
+                sys.stdout.write("REGRESSION {target} rows={rows} shape={shape}: "
+                                 "{metric} {baseline:.4g} -> {value:.4g} "
+                                 "({ratio:.2f}x)\n".format(**r))
+        return 1 if regressions else 0
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,273 @@
+"""Timing of the stages of chart construction.
+
+Each plotting call is broken into stages:
+
+- ``reshape``: reshaping the input data, e.g. with ``melt`` or ``reset_index``
+- ``infer``: inferring the Vega-Lite type of the encoded fields
+- ``kde``: evaluating kernel density estimates
+- ``build``: constructing the altair chart object
+- ``finalize``: preparing the chart data for embedding (see ``set_options``)
+- ``box``: computing the statistics of box plots
+- ``serialize``: converting a chart to its Vega-Lite specification, with
+  ``to_dict`` (or ``to_json``, ``save`` and the notebook display)
+- ``call``: the plotting call (or the ``to_dict`` call) as a whole
+
+When instrumentation is enabled, every registered callback receives an
+``Event`` as each stage completes. When no callback is registered, the
+stages reduce to a check of an empty list.
+"""
+import functools
+import json
+import os
+import sys
+import threading
+from collections import OrderedDict, namedtuple
+from timeit import default_timer
+
+__all__ = ["Event", "instrument", "register_callback", "unregister_callback",
+           "StageTimer"]
+
+Event = namedtuple("Event", ["stage", "kind", "seconds", "self_seconds",
+                             "rows_in", "rows_out", "nbytes", "call_site"])
+Event.__doc__ = """A timed stage of a plotting call.
+
+``seconds`` is the wall time of the stage, and ``self_seconds`` the part of
+it not spent in nested stages (e.g. ``infer`` is nested within ``build``).
+``rows_in``/``rows_out`` are the number of rows of the data entering and
+leaving the stage, and ``nbytes`` the in-memory size of the data it
+produced, where these apply (otherwise None). For ``serialize``, ``nbytes``
+is the length of the JSON text of the specification. ``kind`` is the plotting
+method (e.g. 'line') and ``call_site`` the ``file:line`` from which it was
+called.
+"""
+
+_callbacks = []
+_local = threading.local()
+
+PACKAGE_DIR = os.path.dirname(os.path.abspath(__file__))
+TESTS_DIR = os.path.join(PACKAGE_DIR, "tests")
+
+
+def register_callback(callback):
+    """Call ``callback(event)`` for each instrumented stage"""
+    _callbacks.append(callback)
+
+
+def unregister_callback(callback):
+    """Remove a callback added with ``register_callback``"""
+    _callbacks.remove(callback)
+
+
+def _rows(data):
+    return None if data is None else len(data)
+
+
+def _nbytes(data):
+    if data is None:
+        return None
+    try:
+        return int(data.memory_usage(index=True).sum())
+    except (AttributeError, TypeError):
+        return getattr(data, "nbytes", None)
+
+
+def _emit(event):
+    for callback in list(_callbacks):
+        callback(event)
+
+
+def _call_site():
+    """The first frame outside of pdvega (or within its tests)"""
+    frame = sys._getframe(2)
+    while frame is not None:
+        filename = os.path.abspath(frame.f_code.co_filename)
+        if not filename.startswith(PACKAGE_DIR) or filename.startswith(TESTS_DIR):
+            return "{0}:{1}".format(frame.f_code.co_filename, frame.f_lineno)
+        frame = frame.f_back
+    return None
+
+
+class _NullStage(object):
+    """The stage returned when instrumentation is disabled"""
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        pass
+
+    def output(self, data=None):
+        pass
+
+    def output_spec(self, spec):
+        pass
+
+
+_NULL_STAGE = _NullStage()
+
+
+class _Stage(object):
+    def __init__(self, name, data=None):
+        self.name = name
+        self.rows_in = _rows(data)
+        self.rows_out = None
+        self.nbytes = None
+        self.nested = 0.0
+
+    def output(self, data=None):
+        """Record the data produced by the stage"""
+        self.rows_out = _rows(data)
+        self.nbytes = _nbytes(data)
+
+    def output_spec(self, spec):
+        """Record the size of the serialized specification produced"""
+        self.nbytes = len(json.dumps(spec))
+
+    def __enter__(self):
+        self.stack = getattr(_local, "stages", None)
+        if self.stack is None:
+            self.stack = _local.stages = []
+        self.stack.append(self)
+        self.start = default_timer()
+        return self
+
+    def __exit__(self, *args):
+        seconds = default_timer() - self.start
+        self.stack.pop()
+        if self.stack:
+            self.stack[-1].nested += seconds
+        call = getattr(_local, "call", None) or (None, None)
+        _emit(Event(self.name, call[0], seconds, seconds - self.nested,
+                    self.rows_in, self.rows_out, self.nbytes, call[1]))
+
+
+def stage(name, data=None):
+    """Time a stage of chart construction within a ``with`` block.
+
+    ``data`` is the input of the stage; the output can be recorded with
+    the ``output`` method of the object returned by the ``with`` statement.
+    """
+    if not _callbacks:
+        return _NULL_STAGE
+    return _Stage(name, data)
+
+
+def traced(kind):
+    """Decorate a plotting function, recording a ``call`` stage for it.
+
+    Stages within nested plotting calls (e.g. ``kde`` drawing a ``line``)
+    are attributed to the outermost call.
+    """
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwds):
+            if not _callbacks or getattr(_local, "call", None) is not None:
+                return func(*args, **kwds)
+            data = getattr(args[0], "_data", args[0]) if args else None
+            _local.call = (kind, _call_site())
+            try:
+                with _Stage("call", data if hasattr(data, "__len__") else None):
+                    return func(*args, **kwds)
+            finally:
+                _local.call = None
+        return wrapper
+    return decorator
+
+
+class instrument(object):
+    """Register callbacks for the stages of plotting calls within a block.
+
+    Parameters
+    ----------
+    *callbacks :
+        functions called with an ``Event`` as each stage completes. If none
+        are given, a new ``StageTimer`` is used.
+
+    Examples
+    --------
+    >>> with pdvega.instrument() as timer:  # doctest: +SKIP
+    ...     df.vgplot.line()
+    >>> timer.print_table()  # doctest: +SKIP
+    """
+    def __init__(self, *callbacks):
+        if not callbacks:
+            callbacks = (StageTimer(),)
+        self.callbacks = callbacks
+
+    def __enter__(self):
+        for callback in self.callbacks:
+            register_callback(callback)
+        return self.callbacks[0] if len(self.callbacks) == 1 else self.callbacks
+
+    def __exit__(self, *args):
+        for callback in self.callbacks:
+            unregister_callback(callback)
+
+
+class StageTimer(object):
+    """A callback accumulating the events of each stage.
+
+    Attributes
+    ----------
+    events : list
+        all events received, in order of completion
+    """
+    STAGES = ("reshape", "infer", "kde", "box", "build", "finalize",
+              "serialize", "call")
+
+    def __init__(self):
+        self.events = []
+
+    def __call__(self, event):
+        self.events.append(event)
+
+    def summary(self, by="stage"):
+        """Aggregate the events by stage (or by another Event field).
+
+        Returns
+        -------
+        summary : OrderedDict
+            for each stage, a dict with the number of events ``count``, the
+            total ``seconds`` and ``self_seconds``, and the totals of
+            ``rows_in``, ``rows_out`` and ``nbytes``.
+        """
+        summary = OrderedDict()
+        order = {name: i for i, name in enumerate(self.STAGES)}
+        keys = sorted(set(getattr(event, by) for event in self.events),
+                      key=lambda key: (order.get(key, len(order)), str(key)))
+        for key in keys:
+            summary[key] = {"count": 0, "seconds": 0.0, "self_seconds": 0.0,
+                            "rows_in": 0, "rows_out": 0, "nbytes": 0}
+        for event in self.events:
+            entry = summary[getattr(event, by)]
+            entry["count"] += 1
+            entry["seconds"] += event.seconds
+            entry["self_seconds"] += event.self_seconds
+            for field in ("rows_in", "rows_out", "nbytes"):
+                entry[field] += getattr(event, field) or 0
+        return summary
+
+    def table(self, by="stage"):
+        """Format the per-stage breakdown as a text table.
+
+        Each stage is credited with its own time, excluding nested stages,
+        so that the times add up to the total of the plotting calls; the
+        time of ``call`` is the remainder spent outside any other stage.
+        """
+        summary = self.summary(by=by)
+        total = sum(entry["self_seconds"] for entry in summary.values())
+        lines = ["{0:<20} {1:>6} {2:>10} {3:>7} {4:>12} {5:>12} {6:>12}".format(
+            by, "count", "seconds", "share", "rows in", "rows out", "bytes")]
+        for key, entry in summary.items():
+            share = entry["self_seconds"] / total if total else 0.0
+            lines.append("{0:<20} {1:>6} {2:>10.4f} {3:>6.1%} {4:>12} {5:>12} {6:>12}".format(
+                str(key), entry["count"], entry["self_seconds"], share,
+                entry["rows_in"], entry["rows_out"], entry["nbytes"]))
+        lines.append("{0:<20} {1:>6} {2:>10.4f}".format("total", "", total))
+        return "\n".join(lines)
+
+    def print_table(self, by="stage", file=None):
+        """Print the per-stage breakdown (see ``table``)"""
+        (file or sys.stdout).write(self.table(by=by) + "\n")
+
+    def clear(self):
+        del self.events[:]
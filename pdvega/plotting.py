@@ -1,14 +1,20 @@
 """Core plotting routines"""
 import warnings
-import altair as alt
+from ._lazy import alt
 import numpy as np
 import pandas as pd
 
-from ._utils import infer_vegalite_type
+from ._config import pop_options
+from ._data import prepare_chart, replace_columns
+from .instrumentation import traced
+from ._utils import count_distinct, infer_vegalite_type
+from ._validation import chart_class
 
-__all__ = ["scatter_matrix", "andrews_curves", "parallel_coordinates", "lag_plot"]
+__all__ = ["scatter_matrix", "andrews_curves", "parallel_coordinates", "lag_plot",
+           "autocorrelation_plot"]
 
 
+@traced("scatter_matrix")
 def scatter_matrix(frame, c=None, s=None, figsize=None, dpi=72.0, **kwds):
     """Draw a matrix of scatter plots.
 
@@ -40,6 +46,7 @@ def scatter_matrix(frame, c=None, s=None, figsize=None, dpi=72.0, **kwds):
     --------
     pandas.plotting.scatter_matrix : matplotlib version of this routine
     """
+    options = pop_options(kwds)
     if kwds:
         warnings.warn(
             "Unrecognized keywords in pdvega.scatter_matrix: {0}"
@@ -101,11 +108,49 @@ def scatter_matrix(frame, c=None, s=None, figsize=None, dpi=72.0, **kwds):
 
     chart = alt.Chart().from_dict(spec)
     chart.data = frame
-    return chart
+    return prepare_chart(chart, options)
+
+
+def _fourier_basis(t, ndim, dtype=np.float64):
+    """The Andrews curve basis [1, sin(t), cos(t), sin(2t), cos(2t), ...]"""
+    basis = np.empty((ndim, len(t)), dtype=dtype)
+    basis[0] = 1
+    for i in range(1, ndim):
+        ft = ((i + 1) // 2) * t
+        basis[i] = np.sin(ft) if i % 2 == 1 else np.cos(ft)
+    return basis
+
 
+def _blocks(n, block_size):
+    """Yield slices which split range(n) into blocks of at most block_size"""
+    block_size = max(1, int(block_size))
+    for start in range(0, n, block_size):
+        yield slice(start, min(start + block_size, n))
 
+
+def _sample_rows(n, max_rows, random_state=None):
+    """Sorted random indices of at most max_rows of n rows, or None for all"""
+    if max_rows is None or n <= max_rows:
+        return None
+    rng = np.random.RandomState(random_state)
+    return np.sort(rng.choice(n, int(max_rows), replace=False))
+
+
+@traced("andrews_curves")
 def andrews_curves(
-    data, class_column, samples=200, alpha=None, width=450, height=300, **kwds
+    data,
+    class_column,
+    samples=200,
+    alpha=None,
+    width=450,
+    height=300,
+    max_curves=None,
+    summary=None,
+    quantiles=(0.25, 0.75),
+    dtype=np.float64,
+    block_size=2 ** 20,
+    random_state=None,
+    **kwds
 ):
     """
     Generates an Andrews curves visualization for visualising clusters of
@@ -134,6 +179,19 @@ def andrews_curves(
         the width of the plot in pixels
     height : int, optional
         the height of the plot in pixels
+    max_curves : int, optional
+        If specified, draw a random sample of at most this many curves.
+    summary : string, optional
+        If ``'bands'``, draw the median curve of each class surrounded by a
+        band between the given quantiles, rather than one curve per row.
+    quantiles : tuple, optional
+        The lower and upper quantiles of the bands (default: (0.25, 0.75))
+    dtype : numpy dtype, optional
+        The dtype used to compute the curves; np.float32 halves the memory.
+    block_size : int, optional
+        The maximum number of curve points computed at once.
+    random_state : int, optional
+        The seed used when sampling curves with ``max_curves``.
     **kwds: keywords
         Additional options
 
@@ -142,50 +200,123 @@ def andrews_curves(
     chart: alt.Chart object
 
     """
+    options = pop_options(kwds)
     if kwds:
         warnings.warn(
             "Unrecognized keywords in pdvega.andrews_curves(): {0}"
             "".format(list(kwds.keys()))
         )
+    if summary not in (None, "bands"):
+        raise ValueError("summary must be None or 'bands'")
+
+    rows = _sample_rows(len(data), max_curves, random_state)
+    if rows is not None:
+        data = data.iloc[rows]
 
     t = np.linspace(-np.pi, np.pi, samples)
-    vals = data.drop(class_column, axis=1).values.T
+    vals = data.drop(class_column, axis=1).values.astype(dtype, copy=False)
+    basis = _fourier_basis(t, vals.shape[1], dtype=dtype)
+    classes = pd.Categorical(data[class_column])
+    color = alt.Color(
+        field=class_column, type=infer_vegalite_type(data[class_column])
+    )
 
-    curves = np.outer(vals[0], np.ones_like(t))
-    for i in range(1, len(vals)):
-        ft = ((i + 1) // 2) * t
-        if i % 2 == 1:
-            curves += np.outer(vals[i], np.sin(ft))
-        else:
-            curves += np.outer(vals[i], np.cos(ft))
+    if alpha is None and len(classes.categories) > 20:
+        alpha = 0.5
+    if alpha is not None:
+        assert 0 <= alpha <= 1
+
+    if summary == "bands":
+        df = _andrews_bands(vals, basis, t, classes, class_column,
+                            quantiles, block_size)
+        chart = _band_chart(df, x=alt.X(field="t", type="quantitative"),
+                            y=" ", color=color, alpha=alpha,
+                            width=width, height=height)
+        return prepare_chart(chart, options)
+
+    curves = np.empty((vals.shape[0], samples), dtype=dtype)
+    for block in _blocks(vals.shape[0], block_size // max(samples, 1)):
+        np.dot(vals[block], basis, out=curves[block])
 
     df = pd.DataFrame(
         {
             "t": np.tile(t, curves.shape[0]),
             "sample": np.repeat(np.arange(curves.shape[0]), curves.shape[1]),
             " ": curves.ravel(),
-            class_column: np.repeat(data[class_column], samples),
+            class_column: pd.Categorical.from_codes(
+                np.repeat(classes.codes, samples), classes.categories
+            ),
         }
     )
 
-    chart = alt.Chart(df).properties(width=width, height=height).mark_line()
+    chart = chart_class()(df).properties(width=width, height=height).mark_line()
     chart = chart.encode(
         x=alt.X(field="t", type="quantitative"),
         y=alt.Y(field=" ", type="quantitative"),
-        color=alt.Color(field=class_column, type=infer_vegalite_type(df[class_column])),
+        color=color,
         detail=alt.Detail(field='sample', type="quantitative")
     )
 
-    if alpha is None and df[class_column].nunique() > 20:
-        alpha = 0.5
-
     if alpha is not None:
-        assert 0 <= alpha <= 1
-        return chart.encode(opacity=alt.value(alpha))
+        chart = chart.encode(opacity=alt.value(alpha))
+
+    return prepare_chart(chart, options)
 
-    return chart
 
+def _band_quantiles(quantiles):
+    """Validate the (lower, upper) quantiles of a band around the median"""
+    lower, upper = quantiles
+    if not 0 <= lower < 0.5 < upper <= 1:
+        raise ValueError("quantiles must be (lower, upper) with "
+                         "0 <= lower < 0.5 < upper <= 1; got {0}"
+                         "".format(tuple(quantiles)))
+    return lower, upper
 
+
+def _band_chart(df, x, y, color, alpha=None, width=450, height=300):
+    """Layer a median line over a band between the "lower" and "upper" fields"""
+    band = alt.Chart().mark_area(opacity=0.3).encode(
+        x=x,
+        y=alt.Y(field="lower", type="quantitative"),
+        y2=alt.Y2(field="upper", type="quantitative"),
+        color=color,
+    )
+    line = alt.Chart().mark_line().encode(
+        x=x,
+        y=alt.Y(field=y, type="quantitative"),
+        color=color,
+    )
+    if alpha is not None:
+        line = line.encode(opacity=alt.value(alpha))
+    return alt.layer(band, line, data=df).properties(width=width, height=height)
+
+
+def _andrews_bands(vals, basis, t, classes, class_column, quantiles, block_size):
+    """Median and quantile bands of the Andrews curves of each class"""
+    lower, upper = _band_quantiles(quantiles)
+    frames = []
+    for code, label in enumerate(classes.categories):
+        class_vals = vals[classes.codes == code]
+        if len(class_vals) == 0:
+            continue
+        q = np.empty((3, len(t)))
+        step = block_size // max(len(class_vals), 1)
+        for block in _blocks(len(t), step):
+            curves = np.dot(class_vals, basis[:, block])
+            q[:, block] = np.percentile(
+                curves, [100 * lower, 50, 100 * upper], axis=0
+            )
+        frames.append(pd.DataFrame({
+            "t": t, " ": q[1], "lower": q[0], "upper": q[2],
+            class_column: label,
+        }))
+    df = pd.concat(frames, ignore_index=True)
+    df[class_column] = pd.Categorical(df[class_column],
+                                      categories=classes.categories)
+    return df
+
+
+@traced("parallel_coordinates")
 def parallel_coordinates(
     data,
     class_column,
@@ -196,6 +327,11 @@ def parallel_coordinates(
     interactive=True,
     var_name="variable",
     value_name="value",
+    summary=None,
+    quantiles=(0.25, 0.75),
+    max_lines=None,
+    normalize=None,
+    random_state=None,
     **kwds
 ):
     """
@@ -220,6 +356,18 @@ def parallel_coordinates(
         the legend title
     value_name : string, optional
         the y-axis label
+    summary : string, optional
+        If ``'bands'``, draw the median of each class on each axis surrounded
+        by a band between the given quantiles, rather than one line per row.
+    quantiles : tuple, optional
+        The lower and upper quantiles of the bands (default: (0.25, 0.75))
+    max_lines : int, optional
+        If specified, draw a random sample of at most this many lines.
+    normalize : string, optional
+        If ``'minmax'``, scale each axis to the range [0, 1] using the minimum
+        and maximum of the full data.
+    random_state : int, optional
+        The seed used when sampling lines with ``max_lines``.
 
     Returns
     -------
@@ -230,22 +378,62 @@ def parallel_coordinates(
     --------
     pandas.plotting.parallel_coordinates : matplotlib version of this routine
     """
+    options = pop_options(kwds)
     if kwds:
         warnings.warn(
             "Unrecognized keywords in pdvega.scatter_matrix: {0}"
             "".format(list(kwds.keys()))
         )
+    if summary not in (None, "bands"):
+        raise ValueError("summary must be None or 'bands'")
+    if normalize not in (None, "minmax"):
+        raise ValueError("normalize must be None or 'minmax'")
 
     # Transform the dataframe to be used in Vega-Lite
     if cols is not None:
         data = data[list(cols) + [class_column]]
     cols = data.columns
+    value_cols = [col for col in cols if col != class_column]
+
+    if normalize == "minmax":
+        values = data[value_cols]
+        vmin, vmax = values.min(), values.max()
+        span = (vmax - vmin).where(vmax > vmin, 1)
+        data = replace_columns(data, (values - vmin) / span)
+
+    if alpha is None and count_distinct(data[class_column], limit=20) > 20:
+        alpha = 0.3
+    if alpha is not None:
+        assert 0 <= alpha <= 1
+
+    if summary == "bands":
+        lower, upper = _band_quantiles(quantiles)
+        df = data.groupby(class_column)[value_cols].quantile([lower, 0.5, upper])
+        df.index.names = [class_column, "quantile"]
+        df.columns.name = var_name
+        df = df.stack().unstack("quantile")
+        df.columns = ["lower", value_name, "upper"]
+        df = df.reset_index()
+        chart = _band_chart(
+            df,
+            x=alt.X(field=var_name, type=infer_vegalite_type(df[var_name])),
+            y=value_name,
+            color=alt.Color(field=class_column,
+                            type=infer_vegalite_type(data[class_column])),
+            alpha=alpha, width=width, height=height,
+        )
+        return prepare_chart(chart, options)
+
+    rows = _sample_rows(len(data), max_lines, random_state)
+    if rows is not None:
+        data = data.iloc[rows]
+
     df = data.reset_index()
     index = (set(df.columns) - set(cols)).pop()
     assert index in df.columns
     df = df.melt([index, class_column], var_name=var_name, value_name=value_name)
 
-    chart = alt.Chart(df).properties(width=width, height=height)
+    chart = chart_class()(df).properties(width=width, height=height)
     chart = chart.mark_line().encode(
          x=alt.X(field=var_name, type=infer_vegalite_type(df[var_name])),
          y=alt.Y(field=value_name, type=infer_vegalite_type(df[value_name])),
@@ -253,24 +441,23 @@ def parallel_coordinates(
          detail=alt.Detail(field=index, type=infer_vegalite_type(df[index]))
     )
 
-    if alpha is None and df[class_column].nunique() > 20:
-        alpha = 0.3
-
     if alpha is not None:
-        assert 0 <= alpha <= 1
-        return chart.encode(opacity=alt.value(alpha))
-    return chart
+        chart = chart.encode(opacity=alt.value(alpha))
 
+    return prepare_chart(chart, options)
 
+
+@traced("lag_plot")
 def lag_plot(data, lag=1, kind="scatter", **kwds):
     """Lag plot for time series.
 
     Parameters
     ----------
-    data: pandas.Series
+    data: pandas.Series or pandas.DataFrame
         the time series to plot
-    lag: integer
-        The lag of the scatter plot, default=1
+    lag: integer or list of integers
+        The lag of the scatter plot, default=1. If a list of lags is given,
+        the result is faceted with one panel per lag.
     kind: string
         The kind of plot to use (e.g. 'scatter', 'line')
     **kwds:
@@ -280,17 +467,122 @@ def lag_plot(data, lag=1, kind="scatter", **kwds):
     -------
     chart: alt.Chart object
     """
-    if lag != int(lag) or int(lag) <= 0:
-        raise ValueError("lag must be a positive integer")
-    lag = int(lag)
+    multiple = np.ndim(lag) > 0
+    lags = np.atleast_1d(lag)
+    for k in lags:
+        if k != int(k) or int(k) <= 0:
+            raise ValueError("lag must be a positive integer")
+    lags = lags.astype(int)
+
+    values = np.asarray(data.values)
+    if values.ndim == 1:
+        values = values[:, np.newaxis]
+    n, ncols = values.shape
+    lengths = np.maximum(n - lags, 0)
+
+    # The lagged pairs of each series are the strided views values[:-k] and
+    # values[k:]; they are copied only once, into the output columns.
+    x = np.empty(ncols * lengths.sum(), dtype=values.dtype)
+    y = np.empty_like(x)
+    start = 0
+    for k, length in zip(lags, lengths):
+        size = ncols * length
+        x[start:start + size].reshape(ncols, length)[...] = values[:n - k].T
+        y[start:start + size].reshape(ncols, length)[...] = values[k:].T
+        start += size
 
-    values = data.values
     y1 = "y(t)"
-    y2 = "y(t + {0})".format(lag)
-    lags = pd.DataFrame({y1: values[:-lag].T.ravel(), y2: values[lag:].T.ravel()})
+    if multiple:
+        y2 = "y(t + lag)"
+    else:
+        y2 = "y(t + {0})".format(lags[0])
+    frame = pd.DataFrame({y1: x, y2: y})
+
+    if multiple:
+        frame["lag"] = np.repeat(lags, ncols * lengths)
+        kwds["by"] = "lag"
+        kwds.setdefault("facet", "column")
 
     if isinstance(data, pd.DataFrame):
-        lags["variable"] = np.repeat(data.columns, lags.shape[0] / data.shape[1])
+        codes = np.concatenate([np.repeat(np.arange(ncols), length)
+                                for length in lengths])
+        frame["variable"] = pd.Categorical.from_codes(codes, data.columns)
         kwds["c"] = "variable"
 
-    return lags.vgplot(kind=kind, x=y1, y=y2, **kwds)
+    return frame.vgplot(kind=kind, x=y1, y=y2, **kwds)
+
+
+def _autocorrelation(values):
+    """Autocorrelation of each column of values at every lag, via the FFT
+
+    The autocorrelation of a constant column, which is undefined, is zero.
+    """
+    n = values.shape[0]
+    x = values - values.mean(axis=0)
+    # a constant column may not be centered exactly to zero in floating point
+    x[:, (values == values[:1]).all(axis=0)] = 0
+    nfft = 2 ** int(np.ceil(np.log2(max(2 * n - 1, 1))))
+    f = np.fft.rfft(x, n=nfft, axis=0)
+    acov = np.fft.irfft(f * np.conj(f), n=nfft, axis=0)[:n]
+    variance = acov[:1]
+    return acov / np.where(variance > 0, variance, 1)
+
+
+@traced("autocorrelation_plot")
+def autocorrelation_plot(data, max_lag=None, ax=None, **kwds):
+    """Autocorrelation plot for time series.
+
+    The autocorrelation at every lag is computed at once from the Fourier
+    transform of the series, and drawn along with horizontal lines at the
+    95% (dashed) and 99% (solid) confidence bands. The autocorrelation of a
+    constant series is drawn as zero.
+
+    Parameters
+    ----------
+    data: pandas.Series or pandas.DataFrame
+        the time series to plot
+    max_lag: integer, optional
+        The largest lag to plot. By default, all lags are plotted.
+    ax: altair.Chart, optional
+        chart to be overlayed with this vis (convinience method for `chart1 + chart2`)
+    **kwds:
+        Additional keywords passed to data.vgplot.line
+
+    Returns
+    -------
+    chart: alt.LayerChart object
+
+    See Also
+    --------
+    pandas.plotting.autocorrelation_plot : matplotlib version of this routine
+    """
+    values = np.asarray(data.values, dtype=float)
+    if values.ndim == 1:
+        values = values[:, np.newaxis]
+    n = values.shape[0]
+    if max_lag is None:
+        max_lag = n - 1
+    max_lag = min(int(max_lag), n - 1)
+
+    acf = _autocorrelation(values)[1:max_lag + 1]
+    index = pd.Index(np.arange(1, max_lag + 1), name="lag")
+    if isinstance(data, pd.DataFrame):
+        acf = pd.DataFrame(acf, index=index, columns=data.columns)
+        chart = acf.vgplot.line(value_name="autocorrelation", **kwds)
+    else:
+        acf = pd.Series(acf[:, 0], index=index, name="autocorrelation")
+        chart = acf.vgplot.line(**kwds)
+
+    def confidence_rule(z, **mark_kwds):
+        bounds = pd.DataFrame({"autocorrelation": [z / np.sqrt(n), -z / np.sqrt(n)]})
+        return alt.Chart(bounds).mark_rule(color="grey", **mark_kwds).encode(
+            y=alt.Y(field="autocorrelation", type="quantitative"),
+        )
+
+    dashed = confidence_rule(1.959963984540054, strokeDash=[4, 4])
+    solid = confidence_rule(2.5758293035489004)
+
+    chart = chart + dashed + solid
+    if ax is not None:
+        return ax + chart
+    return chart
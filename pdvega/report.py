@@ -0,0 +1,289 @@
+"""Bundle many charts into a single self-contained HTML report"""
+import base64
+import copy
+import gzip
+import hashlib
+import io
+import json
+
+__all__ = ["Report"]
+
+CDN_URL = "https://cdn.jsdelivr.net/npm/{package}@{version}"
+
+HTML_TEMPLATE = u"""<!DOCTYPE html>
+<html>
+<head>
+<meta charset="utf-8">
+<title>{title}</title>
+{runtime}
+<style>
+.pdvega-chart {{ margin-bottom: 2em; }}
+</style>
+</head>
+<body>
+<h1>{title}</h1>
+{body}
+{script}
+</body>
+</html>
+"""
+
+# Datasets are decoded once, on first use, and shared between charts.
+# Compressed datasets are base64-encoded gzip, inflated with the browser's
+# DecompressionStream. Charts are embedded when they come close to the
+# viewport, or immediately if lazy loading is disabled or unsupported.
+LOADER_SCRIPT = u"""<script type="text/javascript">
+(function() {
+  var lazy = %(lazy)s;
+  var cache = {};
+
+  function readDataset(name) {
+    var el = document.getElementById("pdvega-data-" + name);
+    var text = el.textContent;
+    if (el.getAttribute("data-encoding") !== "gzip+base64") {
+      return Promise.resolve(JSON.parse(text));
+    }
+    var raw = atob(text.trim());
+    var bytes = new Uint8Array(raw.length);
+    for (var i = 0; i < raw.length; i++) bytes[i] = raw.charCodeAt(i);
+    var stream = new Blob([bytes]).stream()
+        .pipeThrough(new DecompressionStream("gzip"));
+    return new Response(stream).text().then(JSON.parse);
+  }
+
+  function dataset(name) {
+    if (!(name in cache)) cache[name] = readDataset(name);
+    return cache[name];
+  }
+
+  function render(el) {
+    var spec = JSON.parse(
+        document.getElementById(el.getAttribute("data-spec")).textContent);
+    var names = JSON.parse(el.getAttribute("data-datasets"));
+    return Promise.all(names.map(dataset)).then(function(values) {
+      spec.datasets = {};
+      names.forEach(function(name, i) { spec.datasets[name] = values[i]; });
+      return vegaEmbed(el, spec);
+    }).catch(function(err) {
+      el.textContent = "Error rendering chart: " + err;
+    });
+  }
+
+  var charts = document.querySelectorAll(".pdvega-chart");
+  if (lazy && "IntersectionObserver" in window) {
+    var observer = new IntersectionObserver(function(entries) {
+      entries.forEach(function(entry) {
+        if (entry.isIntersecting) {
+          observer.unobserve(entry.target);
+          render(entry.target);
+        }
+      });
+    }, {rootMargin: "200px"});
+    Array.prototype.forEach.call(charts, function(el) { observer.observe(el); });
+  } else {
+    Array.prototype.forEach.call(charts, render);
+  }
+})();
+</script>"""
+
+
+def _dumps(obj):
+    """Compact, deterministic JSON"""
+    return json.dumps(obj, sort_keys=True, separators=(",", ":"))
+
+
+def _script_safe(text):
+    """Escape text so that it cannot close an enclosing script tag"""
+    return text.replace("</", "<\\/")
+
+
+def _escape(text):
+    return (text.replace("&", "&amp;").replace("<", "&lt;")
+                .replace(">", "&gt;").replace('"', "&quot;"))
+
+
+def content_hash(values):
+    """Return a name for a dataset derived from its content"""
+    digest = hashlib.sha256(_dumps(values).encode("utf-8")).hexdigest()
+    return "data-" + digest[:32]
+
+
+def gzip_base64(text):
+    """Compress text with gzip and encode the result as base64"""
+    buf = io.BytesIO()
+    # a fixed mtime keeps the output reproducible
+    with gzip.GzipFile(fileobj=buf, mode="wb", mtime=0) as f:
+        f.write(text.encode("utf-8"))
+    return base64.b64encode(buf.getvalue()).decode("ascii")
+
+
+def runtime_scripts():
+    """Script tags loading vega, vega-lite and vega-embed from a CDN"""
+    import altair as alt
+    packages = [("vega", alt.VEGA_VERSION),
+                ("vega-lite", alt.VEGALITE_VERSION),
+                ("vega-embed", alt.VEGAEMBED_VERSION)]
+    return u"\n".join(
+        u'<script type="text/javascript" src="{0}"></script>'
+        u"".format(CDN_URL.format(package=package, version=version))
+        for package, version in packages)
+
+
+def extract_datasets(spec, datasets):
+    """Move all data embedded in spec into datasets, keyed by content hash.
+
+    Both the top-level ``datasets`` of the specification and inline
+    ``{"values": ...}`` data anywhere within it are replaced by named
+    references. The specification is modified in-place.
+
+    Parameters
+    ----------
+    spec : dict
+        the Vega-Lite specification
+    datasets : dict
+        the shared mapping of dataset names to values; new datasets are
+        added to it.
+
+    Returns
+    -------
+    names : list
+        the names of the datasets referenced by spec, in order of first use
+    """
+    names = []
+    renamed = {}
+
+    def add(values):
+        name = content_hash(values)
+        datasets.setdefault(name, values)
+        if name not in names:
+            names.append(name)
+        return name
+
+    for old, values in spec.pop("datasets", {}).items():
+        renamed[old] = add(values)
+
+    def visit(obj):
+        if isinstance(obj, dict):
+            data = obj.get("data")
+            if isinstance(data, dict):
+                if "values" in data and isinstance(data["values"], list):
+                    values = data.pop("values")
+                    data["name"] = add(values)
+                elif data.get("name") in renamed:
+                    data["name"] = renamed[data["name"]]
+            for value in obj.values():
+                visit(value)
+        elif isinstance(obj, list):
+            for value in obj:
+                visit(value)
+
+    visit(spec)
+    return names
+
+
+class Report(object):
+    """A collection of charts to be saved as a single HTML file.
+
+    The vega runtime is loaded once for the whole report, and datasets are
+    embedded once however many charts share them: each distinct dataset is
+    stored under a hash of its contents. Optionally the datasets are
+    gzip-compressed, to be inflated by the browser. Charts are embedded
+    lazily as they are scrolled into view, so that large reports open
+    quickly.
+
+    Parameters
+    ----------
+    title : string, optional
+        the title of the report
+    compress : boolean, optional
+        if True, gzip-compress the embedded datasets (default: False).
+        Decompression requires a browser supporting ``DecompressionStream``.
+    lazy : boolean, optional
+        if True (default), embed each chart only when it scrolls into view.
+
+    Examples
+    --------
+    >>> report = pdvega.Report('Sales')  # doctest: +SKIP
+    >>> report.add(df.vgplot.line(), title='Daily sales')  # doctest: +SKIP
+    >>> report.add(df.vgplot.hist())  # doctest: +SKIP
+    >>> report.save('sales.html')  # doctest: +SKIP
+    """
+    def __init__(self, title="pdvega report", compress=False, lazy=True):
+        self.title = title
+        self.compress = compress
+        self.lazy = lazy
+        self.charts = []
+
+    def add(self, chart, title=None):
+        """Add a chart (or a Vega-Lite specification dict) to the report.
+
+        Returns the report, so that calls can be chained.
+        """
+        self.charts.append((chart, title))
+        return self
+
+    def __len__(self):
+        return len(self.charts)
+
+    def to_dict(self):
+        """Return the chart specifications and the shared datasets.
+
+        Returns
+        -------
+        specs : list of (spec, names, title)
+            the specification of each chart with its data replaced by named
+            references, the names of the datasets it uses, and its title.
+        datasets : dict
+            the distinct datasets, keyed by name
+        """
+        datasets = {}
+        specs = []
+        for chart, title in self.charts:
+            if isinstance(chart, dict):
+                spec = copy.deepcopy(chart)
+            else:
+                spec = chart.to_dict()
+            names = extract_datasets(spec, datasets)
+            specs.append((spec, names, title))
+        return specs, datasets
+
+    def to_html(self):
+        """Return the report as a single HTML document"""
+        specs, datasets = self.to_dict()
+        blocks = []
+        for name, values in sorted(datasets.items()):
+            text = _dumps(values)
+            if self.compress:
+                blocks.append(u'<script type="application/octet-stream" '
+                              u'id="pdvega-data-{0}" data-encoding="gzip+base64">'
+                              u"{1}</script>".format(name, gzip_base64(text)))
+            else:
+                blocks.append(u'<script type="application/json" '
+                              u'id="pdvega-data-{0}">{1}</script>'
+                              u"".format(name, _script_safe(text)))
+
+        for i, (spec, names, title) in enumerate(specs):
+            if title:
+                blocks.append(u"<h2>{0}</h2>".format(_escape(title)))
+            height = spec.get("height")
+            style = ""
+            if isinstance(height, (int, float)):
+                # reserve the space of the chart so that lazy loading only
+                # triggers for charts which are actually near the viewport
+                style = ' style="min-height: {0}px"'.format(int(height))
+            blocks.append(u'<script type="application/json" id="pdvega-spec-{0}">'
+                          u"{1}</script>".format(i, _script_safe(_dumps(spec))))
+            blocks.append(u'<div class="pdvega-chart" data-spec="pdvega-spec-{0}" '
+                          u"data-datasets='{1}'{2}></div>"
+                          u"".format(i, _dumps(names), style))
+
+        return HTML_TEMPLATE.format(
+            title=_escape(self.title),
+            runtime=runtime_scripts(),
+            body=u"\n".join(blocks),
+            script=LOADER_SCRIPT % {"lazy": "true" if self.lazy else "false"})
+
+    def save(self, path):
+        """Write the report to an HTML file at path"""
+        with io.open(path, "w", encoding="utf-8") as f:
+            f.write(self.to_html())
@@ -0,0 +1,637 @@
+"""Incremental, mergeable summaries of data, rendered as charts.
+
+The objects here accumulate a summary of data fed to them in batches with
+``update``, combine with summaries of other data with ``merge``, and draw
+their chart with ``to_chart``. Partial summaries can thus be built where the
+data live (in chunks, or on several workers) and a coordinator renders the
+merged result, embedding only the summary.
+"""
+import copy
+import numbers
+
+import numpy as np
+import pandas as pd
+
+from ._budget import RECORDS_TITLE
+from ._core import SeriesPlotMethods, _builder, _hist_mark
+from ._data import prepare_chart
+from ._spec import as_chart
+from ._utils import (warn_if_keywords_unused, sample_by_rank, whisker_bounds,
+                     BOX_STATS)
+
+__all__ = ["Histogram", "Density", "QuantileSketch"]
+
+
+def _finite(values):
+    values = np.asarray(values, dtype=float).ravel()
+    return values[np.isfinite(values)]
+
+
+class Histogram(object):
+    """A histogram accumulated over batches of data.
+
+    The bins are either fixed, given by ``edges`` or by ``bins`` and
+    ``range``, or adapt to the data: by default the histogram is a sketch
+    with bins of width a power of two, aligned on zero, which are merged
+    pairwise whenever the data span more than ``max_bins`` bins. Sketches
+    with different widths can thus always be merged, exactly.
+
+    Parameters
+    ----------
+    edges : array-like, optional
+        the fixed, increasing bin edges. Values outside of them are counted
+        in the ``outside`` attribute.
+    bins : int, optional
+        with ``range``, the number of fixed bins of equal width (default: 10)
+    range : (float, float), optional
+        the extent of the fixed bins
+    max_bins : int, optional
+        the maximum number of bins of a sketch (default: 256)
+    name : string, optional
+        the name of the variable, which labels the x axis (default: 'value')
+
+    Examples
+    --------
+    >>> hist = pdvega.Histogram()  # doctest: +SKIP
+    >>> for chunk in pd.read_csv('big.csv', chunksize=10 ** 6):  # doctest: +SKIP
+    ...     hist.update(chunk['x'])
+    >>> hist.merge(hist_from_another_worker)  # doctest: +SKIP
+    >>> hist.to_chart(bins=20)  # doctest: +SKIP
+    """
+    def __init__(self, edges=None, bins=10, range=None, max_bins=256, name="value"):
+        if edges is None and range is not None:
+            edges = np.linspace(range[0], range[1], bins + 1)
+        if edges is not None:
+            edges = np.asarray(edges, dtype=float)
+            if edges.ndim != 1 or len(edges) < 2 or (np.diff(edges) <= 0).any():
+                raise ValueError("edges must be an increasing sequence of at "
+                                 "least two values")
+            self._counts = np.zeros(len(edges) - 1, dtype=np.int64)
+        else:
+            if max_bins < 2:
+                raise ValueError("max_bins must be at least 2; got {0}".format(max_bins))
+            self._counts = np.zeros(0, dtype=np.int64)
+        self._edges = edges
+        # a sketch's bin i spans [i, i + 1] * 2 ** _exponent, and _counts[0]
+        # is the count of bin _offset
+        self._exponent = None
+        self._offset = 0
+        self.max_bins = max_bins
+        self.name = name
+        self.outside = 0
+
+    @property
+    def fixed(self):
+        """Whether the bins are fixed, rather than adapted to the data"""
+        return self._edges is not None
+
+    @property
+    def step(self):
+        """The width of the bins of a sketch (None for fixed bins)"""
+        if self.fixed or self._exponent is None:
+            return None
+        return np.ldexp(1.0, self._exponent)
+
+    @property
+    def edges(self):
+        """The bin edges"""
+        if self.fixed:
+            return self._edges.copy()
+        if self._exponent is None:
+            return np.zeros(0)
+        return np.arange(self._offset, self._offset + len(self._counts) + 1) * self.step
+
+    @property
+    def counts(self):
+        """The count of each bin"""
+        return self._counts.copy()
+
+    @property
+    def count(self):
+        """The number of values in the bins"""
+        return int(self._counts.sum())
+
+    def copy(self):
+        return copy.deepcopy(self)
+
+    def _set_bins(self, exponent, indices, counts):
+        """Replace the bins of a sketch with those at the given indices,
+        coarsened as needed to fit within max_bins"""
+        if len(indices) == 0:
+            return
+        lo, hi = indices.min(), indices.max()
+        shift = 0
+        while (hi >> shift) - (lo >> shift) >= self.max_bins:
+            shift += 1
+        indices = (indices >> shift) - (lo >> shift)
+        self._exponent = exponent + shift
+        self._offset = int(lo >> shift)
+        self._counts = np.bincount(indices, weights=counts).astype(np.int64)
+
+    def _bin_indices(self):
+        return np.arange(self._offset, self._offset + len(self._counts), dtype=np.int64)
+
+    def _rebase(self, exponent):
+        """The bin indices and counts of the sketch at a larger exponent"""
+        return self._bin_indices() >> (exponent - self._exponent), self._counts
+
+    def update(self, values):
+        """Add an array of values to the histogram.
+
+        Non-finite values are ignored. Returns the histogram, so that calls
+        can be chained.
+        """
+        values = _finite(values)
+        if len(values) == 0:
+            return self
+        if self.fixed:
+            edges = self._edges
+            inside = (values >= edges[0]) & (values <= edges[-1])
+            self.outside += int(len(values) - inside.sum())
+            indices = np.searchsorted(edges, values[inside], side="right") - 1
+            # the last bin includes its right edge
+            indices = np.minimum(indices, len(self._counts) - 1)
+            self._counts += np.bincount(indices, minlength=len(self._counts))
+            return self
+
+        vmin, vmax = values.min(), values.max()
+        if self._exponent is not None:
+            edges = self.edges
+            vmin, vmax = min(vmin, edges[0]), max(vmax, edges[-1])
+        span = (vmax - vmin) or abs(vmin) or 1.0
+        # the coarsest bins needed, so that indices cannot overflow
+        exponent = int(np.ceil(np.log2(span / self.max_bins)))
+        if self._exponent is None:
+            indices, counts = np.zeros(0, dtype=np.int64), np.zeros(0)
+        else:
+            exponent = max(exponent, self._exponent)
+            indices, counts = self._rebase(exponent)
+        new = np.floor(np.ldexp(values, -exponent)).astype(np.int64)
+        self._set_bins(exponent, np.concatenate([indices, new]),
+                       np.concatenate([counts, np.ones(len(new))]))
+        return self
+
+    def merge(self, other):
+        """Add the counts of another histogram to this one.
+
+        Fixed histograms merge with fixed histograms of the same edges, and
+        sketches with sketches. Returns the histogram.
+        """
+        if not isinstance(other, Histogram):
+            raise TypeError("Cannot merge a Histogram with {0!r}".format(other))
+        if self.fixed or other.fixed:
+            if not (self.fixed and other.fixed
+                    and np.array_equal(self._edges, other._edges)):
+                raise ValueError("Histograms with different bins cannot be merged")
+            self._counts += other._counts
+            self.outside += other.outside
+            return self
+        if other._exponent is None:
+            return self
+        if self._exponent is None:
+            exponent = other._exponent
+        else:
+            exponent = max(self._exponent, other._exponent)
+        parts = [h._rebase(exponent) for h in (self, other) if h._exponent is not None]
+        self._set_bins(exponent, np.concatenate([p[0] for p in parts]),
+                       np.concatenate([p[1] for p in parts]))
+        return self
+
+    def to_frame(self, bins=None):
+        """The bins as a DataFrame of their start, end and count.
+
+        Parameters
+        ----------
+        bins : int, optional
+            the maximum number of bins. The bins of a sketch are merged
+            pairwise until there are no more than this.
+        """
+        edges, counts = self.edges, self._counts
+        if bins is not None and not self.fixed and len(counts):
+            hist = self.copy()
+            hist.max_bins = bins
+            hist._set_bins(self._exponent, self._bin_indices(), self._counts)
+            edges, counts = hist.edges, hist._counts
+        return pd.DataFrame({"start": edges[:-1], "end": edges[1:], "count": counts})
+
+    def to_chart(self, bins=10, histtype="bar", alpha=None, width=450,
+                 height=300, ax=None, **kwds):
+        """Draw the histogram.
+
+        The chart embeds one record per bin and matches that drawn by
+        ``Series.vgplot.hist`` for the same bins.
+
+        Parameters
+        ----------
+        bins : integer, optional
+            for a sketch, the maximum number of bins to draw (default: 10)
+        histtype : string, {'bar', 'step', 'stepfilled'}
+            The type of histogram to generate. Default is 'bar'.
+        alpha : float, optional
+            transparency level, 0 <= alpha <= 1
+        width : int, optional
+            the width of the plot in pixels
+        height : int, optional
+            the height of the plot in pixels
+        ax: altair.Chart, optional
+            chart to be overlayed with this vis (convinience method for `chart1 + chart2`)
+
+        Returns
+        -------
+        chart : alt.Chart
+            altair chart representation
+        """
+        mark = _hist_mark(histtype)
+        bins = self.to_frame(bins)
+        name = str(self.name)
+        df = pd.DataFrame({name: (bins["start"] + bins["end"]) / 2,
+                           "count": bins["count"]})
+        df = df[df["count"] > 0].reset_index(drop=True)
+
+        widths = np.diff(bins["start"].tolist() + bins["end"].tolist()[-1:])
+        uniform = len(widths) > 0 and np.allclose(widths, widths[0])
+        if uniform:
+            x_bin = {"extent": [float(bins["start"].iloc[0]),
+                                float(bins["end"].iloc[-1])],
+                     "step": float(widths[0]), "nice": False}
+        else:
+            # bins of unequal width are drawn from their edges
+            df = bins[bins["count"] > 0].rename(columns={"start": name})
+            mark = "bar"
+
+        api = _builder(kwds)
+        plot = SeriesPlotMethods(pd.Series([], dtype=float, name=name))
+        chart = plot._plot(
+            api=api,
+            data=df,
+            width=width,
+            height=height,
+            title=kwds.pop("title", ""),
+            figsize=kwds.pop("figsize", None),
+            dpi=kwds.pop("dpi", None),
+        )
+        chart.mark = mark
+        y = api.Y(field="count", type="quantitative", aggregate="sum",
+                  title=RECORDS_TITLE)
+        if uniform:
+            chart = chart.encode(x=api.X(name, bin=x_bin, type="quantitative"), y=y)
+        else:
+            chart = chart.encode(x=api.X(name, type="quantitative"),
+                                 x2=api.X2("end", type="quantitative"), y=y)
+        if alpha is not None:
+            assert 0 <= alpha <= 1
+            chart = chart.encode(opacity=api.value(alpha))
+
+        chart = prepare_chart(chart, kwds)
+
+        if ax is not None:
+            return as_chart(ax) + as_chart(chart)
+
+        warn_if_keywords_unused("to_chart", kwds)
+        return chart
+
+
+class Density(object):
+    """A kernel density estimate accumulated over batches of data.
+
+    The values are binned into a fine ``Histogram`` sketch, along with
+    their count, mean and variance, which merge exactly. The density is
+    evaluated from the bin counts with a Gaussian kernel, whose bandwidth is
+    chosen from the variance as by ``scipy.stats.gaussian_kde``. With the
+    default ``gridsize`` the binning error is negligible at the resolution
+    of a chart.
+
+    Parameters
+    ----------
+    bw_method : str or scalar, optional
+        The method used to calculate the estimator bandwidth: 'scott'
+        (default), 'silverman', or a scalar factor of the standard deviation.
+        See `scipy.stats.gaussian_kde` for more details.
+    gridsize : int, optional
+        the maximum number of bins in which values are accumulated
+        (default: 1024)
+    name : string, optional
+        the name of the variable (default: 'value')
+
+    Examples
+    --------
+    >>> density = pdvega.Density()  # doctest: +SKIP
+    >>> density.update(chunk1).update(chunk2)  # doctest: +SKIP
+    >>> density.merge(density_from_another_worker).to_chart()  # doctest: +SKIP
+    """
+    def __init__(self, bw_method=None, gridsize=1024, name="value"):
+        if not (bw_method is None or bw_method in ("scott", "silverman")
+                or isinstance(bw_method, numbers.Real)):
+            raise ValueError("bw_method must be 'scott', 'silverman' or a "
+                             "scalar; got {0!r}".format(bw_method))
+        self.bw_method = bw_method
+        self.name = name
+        self.histogram = Histogram(max_bins=gridsize, name=name)
+        self.n = 0
+        self.mean = 0.0
+        self._m2 = 0.0
+        self.min = np.inf
+        self.max = -np.inf
+
+    @property
+    def variance(self):
+        """The sample variance of the values (with ddof=1)"""
+        return self._m2 / (self.n - 1) if self.n > 1 else np.nan
+
+    def copy(self):
+        return copy.deepcopy(self)
+
+    def _combine(self, n, mean, m2, vmin, vmax):
+        # Chan et al.'s update of the mean and sum of squared deviations
+        total = self.n + n
+        delta = mean - self.mean
+        self.mean += delta * n / total
+        self._m2 += m2 + delta ** 2 * self.n * n / total
+        self.n = total
+        self.min, self.max = min(self.min, vmin), max(self.max, vmax)
+
+    def update(self, values):
+        """Add an array of values to the estimate.
+
+        Non-finite values are ignored. Returns the density, so that calls
+        can be chained.
+        """
+        values = _finite(values)
+        if len(values) == 0:
+            return self
+        mean = values.mean()
+        self._combine(len(values), mean, ((values - mean) ** 2).sum(),
+                      values.min(), values.max())
+        self.histogram.update(values)
+        return self
+
+    def merge(self, other):
+        """Add the values of another density estimate to this one"""
+        if not isinstance(other, Density):
+            raise TypeError("Cannot merge a Density with {0!r}".format(other))
+        if other.n == 0:
+            return self
+        self._combine(other.n, other.mean, other._m2, other.min, other.max)
+        self.histogram.merge(other.histogram)
+        return self
+
+    def bandwidth(self):
+        """The standard deviation of the Gaussian kernel"""
+        if self.bw_method is None or self.bw_method == "scott":
+            factor = self.n ** (-1. / 5)
+        elif self.bw_method == "silverman":
+            factor = (self.n * 3 / 4.) ** (-1. / 5)
+        else:
+            factor = self.bw_method
+        return factor * np.sqrt(self.variance)
+
+    def evaluate(self, points):
+        """Evaluate the estimated density at the given points"""
+        if self.n < 2:
+            raise ValueError("A density estimate requires at least two values")
+        points = np.asarray(points, dtype=float)
+        edges, counts = self.histogram.edges, self.histogram.counts
+        keep = counts > 0
+        centers = ((edges[:-1] + edges[1:]) / 2)[keep]
+        weights = counts[keep] / float(self.n)
+        bw = self.bandwidth()
+        z = (points[:, None] - centers[None, :]) / bw
+        return np.exp(-0.5 * z ** 2).dot(weights) / (bw * np.sqrt(2 * np.pi))
+
+    def to_series(self, npoints=1000):
+        """The density evaluated over the range of the data, and half that
+        range on either side, as drawn by ``Series.vgplot.kde``"""
+        trange = self.max - self.min
+        t = np.linspace(self.min - 0.5 * trange, self.max + 0.5 * trange, npoints)
+        ser = pd.Series(self.evaluate(t), index=t, name=self.name)
+        ser.index.name = " "
+        return ser
+
+    def to_chart(self, alpha=None, width=450, height=300, ax=None, **kwds):
+        """Draw the density estimate.
+
+        Parameters
+        ----------
+        alpha : float, optional
+            transparency level, 0 <= alpha <= 1
+        width : int, optional
+            the width of the plot in pixels
+        height : int, optional
+            the height of the plot in pixels
+        ax: altair.Chart, optional
+            chart to be overlayed with this vis (convinience method for `chart1 + chart2`)
+
+        Returns
+        -------
+        chart : alt.Chart
+            altair chart representation
+        """
+        return self.to_series().vgplot.line(alpha=alpha, width=width,
+                                            height=height, ax=ax, **kwds)
+
+
+class QuantileSketch(object):
+    """A mergeable sketch of a distribution, for quantiles and box plots.
+
+    The values are held in levels of compactors, as in the KLL sketch: each
+    value at level h stands for 2 ** h values. When a level holds more than
+    ``k`` values, they are sorted and every other one is promoted to the
+    next level, so that the sketch holds O(k log(n / k)) values, and
+    quantiles are estimated within a rank error of order log2(n / k) / k.
+    Until more than ``k`` values have been added, the quantiles are exact.
+    The ``max_outliers`` smallest and largest values are kept exactly, for
+    the outliers of box plots.
+
+    Parameters
+    ----------
+    k : int, optional
+        the capacity of each level (default: 256)
+    max_outliers : int, optional
+        the number of extreme values kept on either side, and the maximum
+        number of outliers drawn by ``to_chart`` (default: 100)
+    name : string, optional
+        the name of the variable (default: 'value')
+
+    Examples
+    --------
+    >>> sketch = pdvega.QuantileSketch()  # doctest: +SKIP
+    >>> for chunk in pd.read_csv('big.csv', chunksize=10 ** 6):  # doctest: +SKIP
+    ...     sketch.update(chunk['x'])
+    >>> sketch.quantile([0.25, 0.5, 0.75])  # doctest: +SKIP
+    >>> sketch.merge(sketch_from_another_worker).to_chart()  # doctest: +SKIP
+    """
+    def __init__(self, k=256, max_outliers=100, name="value"):
+        if k < 2:
+            raise ValueError("k must be at least 2; got {0}".format(k))
+        self.k = k
+        self.max_outliers = max_outliers
+        self.name = name
+        self.n = 0
+        self._levels = []
+        self._compactions = 0
+        self.lowest = np.zeros(0)
+        self.highest = np.zeros(0)
+        self.min = np.inf
+        self.max = -np.inf
+
+    @property
+    def size(self):
+        """The number of values held by the sketch"""
+        return sum(len(level) for level in self._levels)
+
+    def copy(self):
+        return copy.deepcopy(self)
+
+    def _add_level(self, h, values):
+        if h == len(self._levels):
+            self._levels.append(values)
+        else:
+            self._levels[h] = np.concatenate([self._levels[h], values])
+
+    def _compress(self):
+        h = 0
+        while h < len(self._levels):
+            level = self._levels[h]
+            if len(level) > self.k:
+                level = np.sort(level)
+                # alternate between the even and odd values, so that
+                # compactions do not bias the quantiles up or down
+                offset = self._compactions % 2
+                self._compactions += 1
+                if len(level) % 2:
+                    # the odd value out stays at this level
+                    keep = level[-1:] if offset else level[:1]
+                    level = level[:-1] if offset else level[1:]
+                else:
+                    keep = level[:0]
+                self._levels[h] = keep
+                self._add_level(h + 1, level[offset::2])
+            h += 1
+
+    def _update_extremes(self, lowest, highest):
+        m = self.max_outliers
+        lowest = np.concatenate([self.lowest, lowest])
+        highest = np.concatenate([self.highest, highest])
+        if m == 0:
+            lowest, highest = lowest[:0], highest[:0]
+        if len(lowest) > m:
+            lowest = np.partition(lowest, m - 1)[:m]
+        if len(highest) > m:
+            highest = np.partition(highest, len(highest) - m)[len(highest) - m:]
+        self.lowest, self.highest = np.sort(lowest), np.sort(highest)
+
+    def update(self, values):
+        """Add an array of values to the sketch.
+
+        Non-finite values are ignored. Returns the sketch, so that calls
+        can be chained.
+        """
+        values = _finite(values)
+        if len(values) == 0:
+            return self
+        self.n += len(values)
+        self._add_level(0, values)
+        self._compress()
+        self._update_extremes(values, values)
+        self.min = min(self.min, values.min())
+        self.max = max(self.max, values.max())
+        return self
+
+    def merge(self, other):
+        """Add the values of another sketch to this one"""
+        if not isinstance(other, QuantileSketch):
+            raise TypeError("Cannot merge a QuantileSketch with {0!r}".format(other))
+        if other.n == 0:
+            return self
+        self._update_extremes(other.lowest, other.highest)
+        self.min, self.max = min(self.min, other.min), max(self.max, other.max)
+        self.n += other.n
+        for h, level in enumerate(other._levels):
+            self._add_level(h, level)
+        self._compress()
+        return self
+
+    def quantile(self, q):
+        """Estimate the q-th quantiles of the values.
+
+        The quantiles are interpolated linearly between values, as by
+        ``Series.quantile``, and are exact for sketches of at most ``k``
+        values.
+        """
+        if self.n == 0:
+            raise ValueError("Quantiles of an empty sketch are undefined")
+        q = np.asarray(q, dtype=float)
+        if len(self._levels) == 1:
+            return np.quantile(self._levels[0], q)
+        items = np.concatenate(self._levels)
+        weights = np.concatenate([np.full(len(level), 2.0 ** h)
+                                  for h, level in enumerate(self._levels)])
+        order = np.argsort(items, kind="mergesort")
+        items, weights = items[order], weights[order]
+        # the rank of each value is the middle of the run it stands for
+        ranks = np.cumsum(weights) - (weights + 1) / 2
+        result = np.interp(q * (self.n - 1), ranks, items)
+        return np.clip(result, self.min, self.max)
+
+    def box_stats(self, whis=1.5):
+        """Estimate the statistics of a box plot, as ``box_stats`` computes them.
+
+        Returns
+        -------
+        stats : dict or None
+            the count, lower whisker, quartiles and upper whisker, or None
+            for an empty sketch
+        outliers : ndarray
+            the outliers among the extreme values kept by the sketch, at
+            most ``max_outliers`` of them
+        """
+        if self.n == 0:
+            return None, np.zeros(0)
+        q1, median, q3 = self.quantile([0.25, 0.5, 0.75])
+        low, high = whisker_bounds(q1, q3, whis)
+        values = np.concatenate(self._levels + [self.lowest, self.highest])
+        inside = values[(values >= low) & (values <= high)]
+        if len(inside):
+            lower, upper = inside.min(), inside.max()
+        else:
+            lower, upper = q1, q3
+        outliers = np.concatenate([self.lowest[self.lowest < low],
+                                   self.highest[self.highest > high]])
+        stats = dict(count=self.n, lower=float(lower), q1=float(q1),
+                     median=float(median), q3=float(q3), upper=float(upper))
+        return stats, sample_by_rank(outliers, self.max_outliers)
+
+    def to_chart(self, whis=1.5, vert=True, alpha=None, width=450, height=300,
+                 ax=None, **kwds):
+        """Draw the box plot of the sketched values.
+
+        Parameters
+        ----------
+        whis : float, optional
+            the reach of the whiskers beyond the box, in interquartile ranges
+            (default: 1.5). Values beyond the whiskers are drawn as outliers.
+        vert : bool, optional
+            if True (default), draw a vertical box; otherwise a horizontal one
+        alpha : float, optional
+            transparency level, 0 <= alpha <= 1
+        width : int, optional
+            the width of the plot in pixels
+        height : int, optional
+            the height of the plot in pixels
+        ax: altair.Chart, optional
+            chart to be overlayed with this vis (convinience method for `chart1 + chart2`)
+
+        Returns
+        -------
+        chart : alt.LayerChart
+            altair chart representation
+        """
+        name = str(self.name)
+        stats, outliers = self.box_stats(whis)
+        stats = pd.DataFrame([dict(stats or {}, variable=name)],
+                             columns=["variable"] + list(BOX_STATS))
+        outliers = pd.DataFrame({"variable": name, "value": outliers},
+                                columns=["variable", "value"])
+        plot = SeriesPlotMethods(pd.Series([], dtype=float, name=name))
+        return plot._box(stats, outliers, "variable", "value", vert=vert, alpha=alpha,
+                         width=width, height=height, ax=ax, kwds=kwds)
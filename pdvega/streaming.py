@@ -0,0 +1,289 @@
+"""Live-updating charts, fed by incremental changesets.
+
+A ``StreamingChart`` holds the data of a chart as a sequence of batches,
+each serialized once when it is appended. Appending data emits a changeset
+with the records of the new rows and the id below which rows fell out of
+the rolling window, rather than a new specification with the whole history,
+so that the work of each update grows with the new rows only. A client
+applies the changesets to the named dataset of the chart with Vega's
+``view.change``.
+"""
+import collections
+import json
+import numbers
+
+try:
+    import queue
+except ImportError:  # Python 2
+    import Queue as queue
+
+import numpy as np
+import pandas as pd
+
+from ._config import get_option
+from ._lazy import alt
+
+__all__ = ["StreamingChart", "QueueTransport", "JSONTransport"]
+
+STREAM_KINDS = ("line", "area", "scatter")
+
+# Each embedded record is tagged with the id of the row of data it plots;
+# ids increase with each row appended
+ROW_FIELD = "_row"
+
+# Data options whose effect would differ between batches
+BATCH_OPTIONS = {"dictionary_encode": False, "explicit_scales": False,
+                 "payload_budget": None}
+
+# Options whose 'auto' setting adapts to the range of each batch
+AUTO_OPTIONS = ("precision", "quantize")
+
+# Keywords of the plotting methods which combine or drop rows of data
+ROW_KEYWORDS = ("aggregate", "max_points", "precompute_stack")
+
+# values holds the records of the rows of the batch as appended, from the
+# row id first; data holds the rows still in the window, from the row id start
+_Batch = collections.namedtuple("_Batch", ["first", "start", "data", "values"])
+
+
+class QueueTransport(object):
+    """Deliver changesets through an in-process queue.
+
+    Parameters
+    ----------
+    maxsize : int, optional
+        the maximum number of pending changesets (default: unbounded)
+    """
+    def __init__(self, maxsize=0):
+        self.queue = queue.Queue(maxsize)
+
+    def send(self, changeset):
+        self.queue.put(changeset)
+
+    def receive(self, block=True, timeout=None):
+        """Return the next changeset; see ``queue.Queue.get``"""
+        return self.queue.get(block, timeout)
+
+
+class JSONTransport(object):
+    """Deliver changesets as JSON text through a callable.
+
+    Parameters
+    ----------
+    write : callable
+        called with the JSON text of each changeset, e.g. the ``send``
+        method of a websocket connection
+    """
+    def __init__(self, write):
+        self.write = write
+
+    def send(self, changeset):
+        self.write(json.dumps(changeset, separators=(",", ":")))
+
+
+class StreamingChart(object):
+    """A chart whose data are appended to incrementally.
+
+    The initial data and each appended batch are plotted with a ``vgplot``
+    method, and the resulting rows serialized once and kept. ``to_chart``
+    returns the chart of the current window, with its data in the dataset
+    ``name``; ``append`` returns (and sends through the transport) the
+    changeset bringing a client's copy of that dataset up to date::
+
+        {"name": name, "insert": [records], "remove_below": row id}
+
+    Every record carries the id of the row of data it plots in its ``_row``
+    field, and the ids increase with each row appended, so that the rows
+    evicted from the window are removed with the single predicate
+    ``_row < remove_below``. ``remove_below`` is None if no rows were
+    evicted. Rows which stay in the window are never sent again.
+
+    Options which would encode batches inconsistently
+    (``dictionary_encode``, ``explicit_scales``, ``payload_budget``, and
+    ``precision`` or ``quantize`` set to 'auto') are disabled for streaming
+    charts; a fixed ``precision`` or ``quantize`` applies to every batch.
+
+    Parameters
+    ----------
+    data : Series or DataFrame
+        the initial data
+    kind : string
+        the ``vgplot`` method: one of 'line', 'area' or 'scatter'
+    window : int, string or Timedelta, optional
+        if an int, keep only this many of the most recent rows of data. If
+        a time span, keep only the rows whose index is within this span of
+        that of the most recent row; this requires a DatetimeIndex, with
+        data appended in time order. By default all rows are kept.
+    transport : object, optional
+        an object with a ``send(changeset)`` method, such as a
+        ``QueueTransport`` or ``JSONTransport``, to which the changesets are
+        passed
+    name : string, optional
+        the name of the chart's dataset (default: 'stream')
+    **kwds :
+        keywords passed to the plotting method. Keywords which combine or
+        drop rows (``aggregate``, ``max_points`` and ``precompute_stack``)
+        are not supported.
+
+    Examples
+    --------
+    >>> transport = pdvega.QueueTransport()  # doctest: +SKIP
+    >>> stream = pdvega.StreamingChart(ser, 'line', window=500,
+    ...                                transport=transport)  # doctest: +SKIP
+    >>> stream.to_chart()  # doctest: +SKIP
+    >>> stream.append(new_values)  # doctest: +SKIP
+    >>> transport.receive()  # doctest: +SKIP
+    {'name': 'stream', 'insert': [...], 'remove_below': None}
+    """
+    def __init__(self, data, kind="line", window=None, transport=None,
+                 name="stream", **kwds):
+        if kind not in STREAM_KINDS:
+            raise ValueError("kind must be one of {0}; got {1!r}"
+                             "".format(STREAM_KINDS, kind))
+        if not isinstance(data, (pd.Series, pd.DataFrame)):
+            raise TypeError("data must be a Series or DataFrame")
+        for key in ROW_KEYWORDS:
+            if kwds.get(key):
+                raise ValueError("{0!r} is not supported by streaming charts"
+                                 "".format(key))
+        if isinstance(window, numbers.Integral):
+            if window < 1:
+                raise ValueError("window must be at least 1; got {0}".format(window))
+        elif window is not None:
+            window = pd.Timedelta(window)
+            if not isinstance(data.index, pd.DatetimeIndex):
+                raise ValueError("A time window requires a DatetimeIndex")
+        self.kind = kind
+        self.window = window
+        self.transport = transport
+        self.name = name
+        self.kwds = dict(kwds, **BATCH_OPTIONS)
+        for key in AUTO_OPTIONS:
+            if self.kwds.get(key, get_option(key)) == "auto":
+                self.kwds[key] = None
+        self._template = data.iloc[:0]
+        self._next_row = 0
+        self._batches = collections.deque()
+        self._size = 0
+        self._add(data)
+        self._evict()
+
+    def __len__(self):
+        """The number of rows of data in the window"""
+        return self._size
+
+    @property
+    def data(self):
+        """The data in the window"""
+        return pd.concat([self._template] + [batch.data for batch in self._batches])
+
+    def _serialize(self, data, start):
+        if len(data) == 0:
+            return []
+        kwds = dict(self.kwds, builder="dict")
+        values = data.vgplot(kind=self.kind, **kwds).data
+        # the plotted frame holds one record per row, or one per row for
+        # each column of a DataFrame, in order of the rows within each column
+        repeats, remainder = divmod(len(values), len(data))
+        if remainder:
+            raise ValueError("The rows of the plotted data do not match those "
+                             "of the appended data")
+        rows = np.tile(np.arange(start, start + len(data)), repeats)
+        return alt.utils.data.to_values(values.assign(**{ROW_FIELD: rows}))["values"]
+
+    def _add(self, data):
+        start = self._next_row
+        batch = _Batch(start, start, data, self._serialize(data, start))
+        self._batches.append(batch)
+        self._next_row += len(data)
+        self._size += len(data)
+        return batch
+
+    def _n_expired(self, data):
+        """The number of leading rows of a batch to evict"""
+        if self.window is None:
+            return 0
+        if isinstance(self.window, numbers.Integral):
+            return min(len(data), max(self._size - self.window, 0))
+        cutoff = self._batches[-1].data.index[-1] - self.window
+        return int(data.index.searchsorted(cutoff, side="right"))
+
+    def _evict(self):
+        """Evict the rows outside the window.
+
+        Returns the id of the first row kept, or None if no rows were
+        evicted. The records of a partially evicted batch are kept as they
+        are, and filtered when the whole window is serialized.
+        """
+        cutoff = None
+        while self._batches:
+            oldest = self._batches[0]
+            n = self._n_expired(oldest.data)
+            if n == 0:
+                break
+            self._size -= n
+            cutoff = oldest.start + n
+            if n < len(oldest.data):
+                self._batches[0] = oldest._replace(start=cutoff,
+                                                   data=oldest.data.iloc[n:])
+                break
+            self._batches.popleft()
+        return cutoff
+
+    def append(self, data):
+        """Append rows of data, and emit the changeset for the update.
+
+        Parameters
+        ----------
+        data : Series or DataFrame
+            the new rows, of the same type (and columns) as the initial data
+
+        Returns
+        -------
+        changeset : dict
+            the records to insert, and the row id below which records are
+            removed (or None). It is also passed to the transport, if any.
+        """
+        if type(data) is not type(self._template):
+            raise TypeError("Expected a {0}, got a {1}"
+                            "".format(type(self._template).__name__,
+                                      type(data).__name__))
+        if (isinstance(data, pd.DataFrame)
+                and not data.columns.equals(self._template.columns)):
+            raise ValueError("Appended columns do not match: {0} != {1}"
+                             "".format(list(data.columns),
+                                       list(self._template.columns)))
+        if len(data) == 0:
+            return {"name": self.name, "insert": [], "remove_below": None}
+
+        batch = self._add(data)
+        cutoff = self._evict()
+        insert = batch.values
+        if cutoff is not None and cutoff > batch.first:
+            # the batch is partly or wholly outside the window
+            insert = [row for row in insert if row[ROW_FIELD] >= cutoff]
+        changeset = {"name": self.name, "insert": insert, "remove_below": cutoff}
+        if self.transport is not None:
+            self.transport.send(changeset)
+        return changeset
+
+    def to_chart(self):
+        """Return the chart of the data in the window.
+
+        Its data is a reference to the dataset ``name``, whose values are
+        included in the ``datasets`` of the specification.
+        """
+        chart = self.data.vgplot(kind=self.kind, **self.kwds)
+        chart.data = {"name": self.name}
+        values = []
+        for batch in self._batches:
+            if batch.start > batch.first:
+                values.extend(row for row in batch.values
+                              if row[ROW_FIELD] >= batch.start)
+            else:
+                values.extend(batch.values)
+        return chart.properties(datasets={self.name: values})
+
+    def to_dict(self):
+        """Return the Vega-Lite specification of the chart of the window"""
+        return self.to_chart().to_dict()
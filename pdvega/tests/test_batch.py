@@ -0,0 +1,91 @@
+import json
+import os
+
+import numpy as np
+import pandas as pd
+import pytest
+
+import pdvega
+from pdvega.batch import dump_frame, load_frame
+
+
+@pytest.fixture
+def frame():
+    return pd.DataFrame({
+        'x': np.arange(10.0),
+        'y': np.arange(10),
+        't': pd.date_range('2017', periods=10, tz='US/Eastern'),
+        'label': pd.Categorical(list('ABABABABAB')),
+        's': list('abcdefghij'),
+    }, index=pd.date_range('2018', periods=10, name='when'))
+
+
+def test_dump_load_frame(frame, tmpdir):
+    path = str(tmpdir.join('frame'))
+    dump_frame(frame, path)
+    pd.testing.assert_frame_equal(load_frame(path), frame, check_freq=False)
+
+    path = str(tmpdir.join('series'))
+    dump_frame(frame['x'], path)
+    pd.testing.assert_series_equal(load_frame(path), frame['x'], check_freq=False)
+
+
+def test_load_frame_mapped(frame, tmpdir, monkeypatch):
+    mapped = []
+    load = np.load
+
+    def record_load(*args, **kwds):
+        mapped.append(load(*args, **kwds))
+        return mapped[-1]
+
+    monkeypatch.setattr(np, 'load', record_load)
+    path = str(tmpdir.join('frame'))
+    dump_frame(frame[['x', 'y']], path)
+    loaded = load_frame(path)
+    assert np.shares_memory(loaded['x'].values, mapped[1])
+    assert np.shares_memory(loaded['y'].values, mapped[2])
+
+
+@pytest.mark.parametrize('n_jobs', [None, 2])
+def test_render_many(frame, tmpdir, n_jobs):
+    out_dir = str(tmpdir.join('out'))
+    jobs = [
+        (frame[['x', 'y']], 'line', {}),
+        (frame, 'scatter', {'x': 'x', 'y': 'y', 'c': 'label'}),
+        (frame, 'not_a_kind', {}),
+        (frame[['x', 'y', 'label']], 'parallel_coordinates',
+         {'class_column': 'label'}),
+    ]
+    results = pdvega.render_many(jobs, n_jobs=n_jobs, out_dir=out_dir,
+                                 formats=('json', 'csv'))
+
+    assert [r['job'] for r in results] == [0, 1, 2, 3]
+    assert [r['error'] is None for r in results] == [True, True, False, True]
+    assert "not valid" in results[2]['error']
+
+    for r in results[:2] + results[3:]:
+        assert set(r['timings']) == {'load', 'build', 'serialize', 'write'}
+        json_path, csv_path = r['paths']
+        with open(json_path) as f:
+            spec = json.load(f)
+        assert spec['mark'] == ('point' if r['kind'] == 'scatter' else 'line')
+        assert os.path.exists(csv_path)
+
+
+def test_render_many_specs(frame):
+    results = pdvega.render_many([(frame['x'], 'hist', {'bins': 5})])
+    assert results[0]['error'] is None
+    assert results[0]['spec']['encoding']['x']['bin'] == {'maxbins': 5}
+
+    with pytest.raises(ValueError):
+        pdvega.render_many([(frame['x'], 'hist', {})], formats=('png',))
+
+
+def test_render_many_unpicklable(frame):
+    bad = pd.DataFrame({'x': [lambda: None] * 3})
+    jobs = [(bad, 'line', {}), (frame['x'], 'line', {}),
+            (frame['x'], 'line', {'y': lambda: None}), (bad, 'hist', {})]
+    results = pdvega.render_many(jobs, n_jobs=2)
+    assert [r['job'] for r in results] == [0, 1, 2, 3]
+    assert [r['error'] is None for r in results] == [False, True, False, False]
+    assert results[1]['spec']['mark'] == 'line'
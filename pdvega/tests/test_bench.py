@@ -0,0 +1,34 @@
+import json
+
+from pdvega import bench
+
+
+def test_run_and_compare():
+    results = bench.run(['series.line', 'andrews_curves'], sizes=(100,),
+                        shapes=('narrow',), repeat=1)
+    assert [r['target'] for r in results['results']] == ['series.line', 'andrews_curves']
+    for result in results['results']:
+        assert result['error'] is None
+        assert result['rows'] == 100
+        assert result['payload'] > 0
+        assert result['peak_memory'] > 0
+    assert bench.compare(results, results) == []
+
+    baseline = json.loads(json.dumps(results))
+    baseline['results'][0]['payload'] //= 2
+    regressions = bench.compare(results, baseline, threshold=0.5)
+    assert [(r['target'], r['metric']) for r in regressions] == [('series.line', 'payload')]
+
+
+def test_main(tmpdir, capsys):
+    output = str(tmpdir.join('results.json'))
+    args = ['frame.scatter', '--sizes', '1e2', '--shapes', 'wide',
+            '--repeat', '1', '--output', output]
+    assert bench.main(args) == 0
+    with open(output) as f:
+        results = json.load(f)
+    assert len(results['results']) == 1
+    assert results['results'][0]['shape'] == 'wide'
+    assert 'frame.scatter' in capsys.readouterr().out
+
+    assert bench.main(args + ['--baseline', output, '--threshold', '100']) == 0
@@ -0,0 +1,105 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+import pdvega  # noqa
+from pdvega._budget import bin_params, estimate_payload, parse_budget
+from pdvega.tests.utils import validate_vegalite
+
+
+@pytest.fixture
+def df():
+    rand = np.random.RandomState(0)
+    df = pd.DataFrame(rand.randn(20000, 3), columns=['a', 'b', 'c'])
+    df['g'] = pd.Categorical(rand.choice(['x', 'y'], 20000))
+    return df
+
+
+def test_estimate_payload(df):
+    df = df.assign(i=np.arange(len(df)), s=df.g.astype(str),
+                   t=pd.date_range('2018', periods=len(df), freq='s'))
+    rows, nbytes = estimate_payload(df)
+    assert rows == len(df)
+    actual = len(df.to_json(orient='records', date_format='iso'))
+    assert 0.8 < nbytes / actual < 1.25
+
+
+def test_parse_budget():
+    assert parse_budget(100) == (100, None)
+    assert parse_budget({'bytes': 1000}) == (None, 1000)
+    with pytest.raises(ValueError):
+        parse_budget({'cols': 10})
+    with pytest.raises(ValueError):
+        parse_budget('10MB')
+    with pytest.raises(ValueError):
+        parse_budget(0)
+
+
+@pytest.mark.parametrize('extent,maxbins,expected', [
+    ((0, 100), 10, (0, 100, 10)),
+    ((0.3, 9.7), 10, (0, 10, 1)),
+    ((-4.1, 4.3), 10, (-5, 5, 1)),
+    ((0, 1), 20, (0, 1, 0.05)),
+])
+def test_bin_params(extent, maxbins, expected):
+    assert np.allclose(bin_params(*extent, maxbins=maxbins), expected)
+
+
+def test_under_budget_unchanged(df):
+    chart = df[['a', 'b']].vgplot.hist(payload_budget={'rows': 10 ** 6})
+    assert len(chart.data) == 2 * len(df)
+    assert chart.encoding.x.bin == {'maxbins': 10}
+
+
+def test_hist_prebinned(df):
+    with pytest.warns(UserWarning, match='pre-binned'):
+        chart = df[['a', 'b']].vgplot.hist(bins=20, payload_budget=1000)
+    validate_vegalite(chart)
+    assert len(chart.data) <= 40
+    assert chart.data.groupby('variable')['count'].sum().tolist() == [20000, 20000]
+    spec = chart.to_dict()
+    assert spec['encoding']['y']['aggregate'] == 'sum'
+    start, stop = spec['encoding']['x']['bin']['extent']
+    step = spec['encoding']['x']['bin']['step']
+    counts, _ = np.histogram(df.a, bins=np.arange(start, stop + step / 2, step))
+    binned = chart.data[chart.data.variable == 'a'].sort_values('value')
+    assert counts[counts > 0].tolist() == binned['count'].tolist()
+
+
+def test_heatmap_aggregated(df):
+    with pytest.warns(UserWarning, match='heatmap'):
+        chart = df.vgplot.heatmap('a', 'b', gridsize=10, payload_budget=1000)
+    validate_vegalite(chart)
+    assert chart.data['count'].sum() == len(df)
+    assert chart.to_dict()['encoding']['color']['aggregate'] == 'sum'
+
+    with pytest.warns(UserWarning):
+        chart = df.vgplot.heatmap('a', 'b', C='c', reduce_C_function='max',
+                                  gridsize=10, payload_budget=1000)
+    validate_vegalite(chart)
+    assert chart.data['c'].max() == df.c.max()
+
+
+def test_scatter_grid(df):
+    with pytest.warns(UserWarning, match='grid'):
+        chart = df.vgplot.scatter('a', 'b', c='g', payload_budget=2000)
+    validate_vegalite(chart)
+    assert len(chart.data) <= 2000
+    assert chart.data['count'].sum() == len(df)
+    assert set(chart.data['g']) == {'x', 'y'}
+    assert chart.to_dict()['encoding']['size']['field'] == 'count'
+
+
+def test_line_downsampled(df):
+    with pytest.warns(UserWarning, match='downsampled'):
+        chart = df[['a', 'b']].vgplot.line(payload_budget={'bytes': 50000})
+    validate_vegalite(chart)
+    rows, nbytes = estimate_payload(chart.data)
+    assert nbytes <= 50000
+    assert set(chart.data['variable']) == {'a', 'b'}
+
+
+def test_no_reduction_warns(df):
+    with pytest.warns(UserWarning, match='no reduction'):
+        chart = df[['a']].vgplot.bar(payload_budget=100)
+    assert len(chart.data) == len(df)
@@ -0,0 +1,25 @@
+import pytest
+
+import pdvega
+
+
+def test_set_options():
+    assert pdvega.get_option('prune_columns') is True
+
+    with pdvega.set_options(prune_columns=False):
+        assert pdvega.get_option('prune_columns') is False
+    assert pdvega.get_option('prune_columns') is True
+
+    pdvega.set_options(prune_columns=False)
+    try:
+        assert pdvega.get_option('prune_columns') is False
+    finally:
+        pdvega.set_options(prune_columns=True)
+
+
+def test_set_options_bad_key():
+    with pytest.raises(KeyError):
+        pdvega.set_options(not_an_option=True)
+
+    with pytest.raises(KeyError):
+        pdvega.get_option('not_an_option')
@@ -1,5 +1,6 @@
 import pytest
 
+import numpy as np
 import pandas as pd
 
 import altair as alt
@@ -352,3 +353,183 @@ def test_ser_kde():
         x=' ',
         y='x',
     )
+
+
+@pytest.mark.parametrize("n_jobs", [2, -1])
+def test_df_kde_n_jobs(n_jobs):
+    df = pd.DataFrame({"y": range(10), "x": [1, 2, 2, 3, 5, 8, 8, 9, 9, 9]})
+    serial = df.vgplot.kde(bw_method="scott").data
+    parallel = df.vgplot.kde(bw_method="scott", n_jobs=n_jobs).data
+    assert list(pd.unique(parallel["variable"])) == ["y", "x"]
+    pd.testing.assert_frame_equal(serial, parallel)
+
+
+@pytest.fixture
+def hosts():
+    return pd.DataFrame({
+        "t": list(range(10)) * 3,
+        "cpu": range(30),
+        "mem": range(30),
+        "host": np.repeat(["a", "b", "c"], 10),
+    })
+
+
+def test_line_by(hosts):
+    plot = hosts.vgplot.line(x="t", by="host")
+    utils.validate_vegalite(plot)
+    utils.check_encodings(plot, x="t", y="value", color="variable",
+                          order="index", row="host")
+    data = plot.data
+    assert set(pd.unique(data["variable"])) == {"cpu", "mem"}
+    assert len(data) == 2 * len(hosts)
+
+
+@pytest.mark.parametrize("downsample", ["stride", "mean"])
+def test_line_by_max_points(hosts, downsample):
+    plot = hosts.vgplot.line(x="t", y="cpu", by="host", facet="column",
+                             max_points=4, downsample=downsample)
+    utils.validate_vegalite(plot)
+    assert plot["encoding"]["column"]["field"] == "host"
+    counts = plot.data.groupby(["host", "variable"]).size()
+    assert (counts <= 4).all()
+    assert len(counts) == 3
+
+
+def test_scatter_by(hosts):
+    plot = hosts.vgplot.scatter(x="cpu", y="mem", by="host")
+    utils.validate_vegalite(plot)
+    utils.check_encodings(plot, x="cpu", y="mem", row="host")
+    assert set(plot.data.columns) == {"cpu", "mem", "host"}
+
+    with pytest.raises(ValueError):
+        hosts.vgplot.scatter(x="cpu", y="mem", by="host", facet="layer")
+
+
+@pytest.mark.parametrize("kind", ["area", "bar", "barh", "hist"])
+def test_frame_by(hosts, kind):
+    plot = hosts[["cpu", "mem", "host"]].vgplot(kind=kind, by="host")
+    utils.validate_vegalite(plot)
+    assert plot["encoding"]["row"]["field"] == "host"
+    assert set(pd.unique(plot.data["variable"])) == {"cpu", "mem"}
+
+
+def test_heatmap_by(hosts):
+    plot = hosts.vgplot.heatmap(x="cpu", y="mem", by="host", facet="column")
+    utils.validate_vegalite(plot)
+    utils.check_encodings(plot, x="cpu", y="mem", color=utils.IGNORE,
+                          column="host")
+
+
+@pytest.mark.parametrize("kind", ["bar", "barh"])
+def test_frame_bar_top_k(kind):
+    df = pd.DataFrame({"a": np.arange(100.0), "b": np.ones(100)})
+    plot = df.vgplot(kind=kind, top_k=3, other_label="rest")
+    utils.validate_vegalite(plot)
+    data = plot.data
+    assert list(pd.unique(data["index"])) == [97, 98, 99, "rest"]
+    assert data.groupby("variable")["value"].sum().tolist() == [4950, 100]
+    channel = "x" if kind == "bar" else "y"
+    assert plot.to_dict()["encoding"][channel]["sort"] is None
+
+
+def test_series_bar_top_k():
+    counts = pd.Series(list("aaabbc") + list("defghij")).value_counts()
+    plot = counts.vgplot.bar(top_k=2)
+    utils.validate_vegalite(plot)
+    assert list(plot.data["index"]) == ["a", "b", "other"]
+    assert list(plot.data.iloc[:, 1]) == [3, 2, 8]
+
+
+@pytest.mark.parametrize("kind", ["bar", "area"])
+def test_frame_aggregate(hosts, kind):
+    plot = hosts.vgplot(kind=kind, x="t", y=["cpu", "mem"], aggregate="sum")
+    utils.validate_vegalite(plot)
+    data = plot.data
+    assert len(data) == 20
+    expected = hosts.groupby("t")["cpu"].sum()
+    actual = data[data["variable"] == "cpu"].set_index("t")["value"]
+    assert (actual == expected).all()
+
+    plot = hosts.vgplot(kind=kind, x="t", by="host", aggregate="mean")
+    assert len(plot.data) == len(hosts) * 2
+
+
+@pytest.mark.parametrize("kind", ["bar", "area"])
+def test_series_aggregate(kind):
+    ser = pd.Series([1, 2, 3, 4], index=["a", "b", "a", "a"])
+    plot = ser.vgplot(kind=kind, aggregate="mean")
+    utils.validate_vegalite(plot)
+    assert plot.data.values.tolist() == [["a", 8 / 3], ["b", 2]]
+
+
+@pytest.mark.parametrize("kind", ["area", "bar", "barh"])
+@pytest.mark.parametrize("stacked", [True, "normalize", "center"])
+def test_precompute_stack(kind, stacked):
+    df = pd.DataFrame({"x": [1, 4, 2, 3, 5], "y": [6, 3, 4, 5, 2]})
+    plot = df.vgplot(kind=kind, stacked=stacked, precompute_stack=True)
+    utils.validate_vegalite(plot)
+    encoding = plot.to_dict()["encoding"]
+    y, y2 = ("y", "y2") if kind != "barh" else ("x", "x2")
+    assert encoding[y]["field"] == "value_end"
+    assert encoding[y]["stack"] is None
+    assert encoding[y2]["field"] == "value_start"
+
+    data = plot.data
+    ends = data.groupby("index")["value_end"].max()
+    if stacked is True:
+        assert (ends == df.sum(axis=1)).all()
+    elif stacked == "normalize":
+        assert np.allclose(ends, 1)
+
+    plot = df.vgplot(kind=kind, stacked=stacked)
+    assert plot.to_dict()["encoding"][y]["stack"] == \
+        ("zero" if stacked is True else stacked)
+
+
+@pytest.mark.parametrize("kind", ["area", "bar"])
+def test_precompute_stack_order(kind):
+    df = pd.DataFrame({"a": [1, 2], "c": [3, 4], "b": [5, 6]})
+    # without precomputation, Vega-Lite 2 stacks the series in descending
+    # order of the color field, as there is no order encoding
+    encoding = df.vgplot(kind=kind, stacked=True).to_dict()["encoding"]
+    assert encoding["color"]["field"] == "variable"
+    assert "order" not in encoding
+
+    data = df.vgplot(kind=kind, stacked=True, precompute_stack=True).data
+    for _, stack in data.groupby("index"):
+        stack = stack.sort_values("value_start")
+        assert stack["variable"].tolist() == ["c", "b", "a"]
+
+
+def test_series_box():
+    ser = pd.Series(np.r_[np.arange(20.0), 100.0], name="x")
+    plot = ser.vgplot.box()
+    utils.validate_vegalite(plot)
+    whiskers, box, median, outliers = plot.layer
+    assert box.data[["variable", "q1", "q3"]].values.tolist() == [["x", 5.0, 15.0]]
+    assert median.data["median"].tolist() == [10.0]
+    assert whiskers.data[["lower", "upper"]].values.tolist() == [[0.0, 19.0]]
+    assert outliers.data["value"].tolist() == [100.0]
+    assert box.to_dict()["encoding"]["y"]["scale"] == {"zero": False}
+
+
+@pytest.mark.parametrize("vert", [True, False])
+def test_frame_box(vert):
+    rand = np.random.RandomState(0)
+    df = pd.DataFrame({"a": rand.randn(1000), "b": rand.randn(1000),
+                       "c": ["u", "v"] * 500})
+    plot = df.vgplot.box(vert=vert, max_outliers=5, title="boxes")
+    utils.validate_vegalite(plot)
+    assert plot.title == "boxes"
+    box = plot.layer[1]
+    assert box.data["variable"].tolist() == ["a", "b"]
+    assert np.allclose(box.data["q1"], df[["a", "b"]].quantile(0.25))
+    outliers = plot.layer[3].data
+    assert outliers.groupby("variable").size().max() <= 5
+    encoding = box.to_dict()["encoding"]
+    assert encoding["x" if vert else "y"]["field"] == "variable"
+    assert encoding["y2" if vert else "x2"]["field"] == "q3"
+
+    plot = df.vgplot(kind="box", y="a", builder="dict")
+    utils.validate_vegalite(plot)
+    assert plot.layer[1].data["variable"].tolist() == ["a"]
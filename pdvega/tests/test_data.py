@@ -0,0 +1,206 @@
+import json
+
+import numpy as np
+from numpy.testing import assert_allclose
+import pandas as pd
+import pytest
+
+import pdvega
+from pdvega._data import (referenced_fields, prune_columns, round_values,
+                          round_columns, dictionary_encode, epoch_milliseconds,
+                          nice_domain, is_presorted)
+from pdvega.tests.utils import validate_vegalite
+
+
+def test_referenced_fields():
+    spec = {
+        'encoding': {'x': {'field': 'a', 'type': 'quantitative'},
+                     'tooltip': [{'field': 'b', 'type': 'nominal'}]},
+        'transform': [{'filter': 'datum.c > 0'},
+                      {'calculate': "datum['d e'] * 2", 'as': 'f'}],
+    }
+    fields = referenced_fields(spec)
+    assert {'a', 'b', 'c', 'd e', 'f'} <= fields
+
+
+def test_prune_columns():
+    df = pd.DataFrame({'a': range(3), 'b': range(3), 'c': range(3)})
+    spec = {'encoding': {'x': {'field': 'a'}, 'y': {'field': 'c'}}}
+    assert list(prune_columns(df, spec).columns) == ['a', 'c']
+
+    spec = {'encoding': {'x': {'field': 'a'}, 'y': {'field': 'b'},
+                         'color': {'field': 'c'}}}
+    assert prune_columns(df, spec) is df
+
+
+def test_scatter_prunes_columns():
+    df = pd.DataFrame({'x': range(5), 'y': range(5), 'c': range(5),
+                       'unused': range(5)})
+    chart = df.vgplot.scatter(x='x', y='y', c='c')
+    assert list(chart.data.columns) == ['x', 'y', 'c']
+
+    chart = df.vgplot.scatter(x='x', y='y', prune_columns=False)
+    assert list(chart.data.columns) == list(df.columns)
+
+    with pdvega.set_options(prune_columns=False):
+        chart = df.vgplot.scatter(x='x', y='y')
+    assert list(chart.data.columns) == list(df.columns)
+
+
+def test_scatter_matrix_prunes_columns():
+    df = pd.DataFrame({'x': range(5), 'y': range(5), 'label': list('ABABA')})
+    chart = pdvega.scatter_matrix(df)
+    assert list(chart.data.columns) == ['x', 'y']
+
+    chart = pdvega.scatter_matrix(df, c='label')
+    assert list(chart.data.columns) == ['x', 'y', 'label']
+
+
+def test_round_values():
+    values = np.array([0.123456, 1.987654, np.nan])
+    assert_allclose(round_values(values, 100, precision=2), [0.12, 1.99, np.nan])
+
+    # auto precision: range of ~2 over 100 pixels (x10 oversampling) -> 0.002
+    assert_allclose(round_values(values, 100, precision='auto'),
+                    [0.123, 1.988, np.nan])
+
+    assert_allclose(round_values(values, 100, quantize=0.5), [0.0, 2.0, np.nan])
+
+    quantized = round_values(np.linspace(0, 1, 1000), 10, quantize='auto')
+    assert len(np.unique(quantized)) == 11
+
+
+def test_chart_precision():
+    df = pd.DataFrame({'x': np.linspace(0, 1, 50), 'y': np.random.rand(50)})
+    full = df.vgplot.line(x='x', y='y')
+    chart = df.vgplot.line(x='x', y='y', precision='auto')
+    assert (chart.data['value'] != full.data['value']).any()
+    assert len(json.dumps(chart.to_dict())) < len(json.dumps(full.to_dict()))
+
+    with pdvega.set_options(precision=1):
+        chart = df.vgplot.scatter(x='x', y='y')
+    assert_allclose(chart.data['y'], np.round(df['y'], 1))
+    # input data is unchanged
+    assert (df['y'] != np.round(df['y'], 1)).any()
+
+
+def test_round_columns_non_string_columns():
+    df = pd.DataFrame({0: [0.11, 0.22], 1: ['a', 'b']})
+    rounded = round_columns(df, {}, precision=1)
+    assert list(rounded.columns) == [0, 1]
+    assert_allclose(rounded[0], [0.1, 0.2])
+    assert list(rounded[1]) == ['a', 'b']
+
+
+def test_dictionary_encode():
+    df = pd.DataFrame({'x': range(6), 'label': list('ABCABC'),
+                       'cat': pd.Categorical(list('pqpqpq'), categories=['q', 'p'])})
+    spec = {'encoding': {'x': {'field': 'x', 'type': 'quantitative'},
+                         'color': {'field': 'label', 'type': 'nominal'},
+                         'shape': {'field': 'cat', 'type': 'nominal'}}}
+    encoded, transforms = dictionary_encode(df, spec)
+    assert list(encoded['x']) == list(df['x'])
+    assert list(encoded['label']) == [0, 1, 2, 0, 1, 2]
+    assert list(encoded['cat']) == [1, 0, 1, 0, 1, 0]
+
+    lookup = {t['lookup']: t['from'] for t in transforms}
+    assert lookup['label']['data']['values'] == [
+        {'code': 0, 'label': 'A'}, {'code': 1, 'label': 'B'}, {'code': 2, 'label': 'C'}
+    ]
+    assert lookup['cat']['data']['values'] == [
+        {'code': 0, 'cat': 'q'}, {'code': 1, 'cat': 'p'}
+    ]
+    assert lookup['cat']['fields'] == ['cat']
+
+
+def test_chart_dictionary_encode():
+    df = pd.DataFrame({'x': range(10), 'y': range(10), 'z': range(10),
+                       'c': list('ABABABABAB')})
+    chart = df[['x', 'y', 'z']].vgplot.line(dictionary_encode=True)
+    validate_vegalite(chart)
+    spec = chart.to_dict()
+    assert spec['encoding']['color']['field'] == 'variable'
+    assert spec['transform'][0]['lookup'] == 'variable'
+    assert set(chart.data['variable']) == {0, 1, 2}
+
+    chart = pdvega.parallel_coordinates(df, 'c', dictionary_encode=True)
+    validate_vegalite(chart)
+    assert {t['lookup'] for t in chart.to_dict()['transform']} == {'variable', 'c'}
+
+
+def test_epoch_milliseconds():
+    values = pd.to_datetime(['1970-01-01', '2017-01-01 00:00:00.001', None])
+    epoch = epoch_milliseconds(values)
+    assert_allclose(epoch, [0, 1483228800001, np.nan])
+
+    values = pd.date_range('2017', periods=3, freq='H', tz='US/Eastern')
+    epoch = epoch_milliseconds(pd.Series(values))
+    assert epoch.dtype == np.int64
+    assert list(epoch) == [1483246800000 + i * 3600000 for i in range(3)]
+
+
+def test_chart_temporal_encoding():
+    ser = pd.Series(range(5), index=pd.date_range('2017', periods=5))
+    chart = ser.vgplot.line(temporal_encoding='epoch')
+    validate_vegalite(chart)
+    spec = chart.to_dict()
+    assert spec['encoding']['x']['type'] == 'temporal'
+    assert spec['encoding']['x']['scale'] == {'type': 'utc'}
+    assert chart.data['index'][1] == 1483315200000
+
+    ser.index = ser.index.tz_localize('UTC')
+    with pdvega.set_options(temporal_encoding='epoch'):
+        chart = ser.vgplot.line()
+    validate_vegalite(chart)
+    spec = chart.to_dict()
+    assert 'scale' not in spec['encoding']['x']
+    assert chart.data['index'][1] == 1483315200000
+
+
+@pytest.mark.parametrize('extent,expected', [
+    ((0.3, 9.7), [0, 10]),
+    ((-4.1, 4.3), [-5, 5]),
+    ((12, 987), [0, 1000]),
+    ((0.013, 0.087), [0.01, 0.09]),
+])
+def test_nice_domain(extent, expected):
+    assert_allclose(nice_domain(*extent), expected)
+
+
+def test_is_presorted():
+    spec = {'mark': 'line',
+            'encoding': {'x': {'field': 'x', 'type': 'quantitative'},
+                         'color': {'field': 'c', 'type': 'nominal'}}}
+    df = pd.DataFrame({'x': [0, 1, 2, 0, 1, 2], 'c': list('aaabbb')})
+    assert is_presorted(df, spec)
+    assert not is_presorted(df.iloc[::-1], spec)
+    assert not is_presorted(df, dict(spec, mark='point'))
+    del spec['encoding']['color']
+    assert not is_presorted(df, spec)
+
+
+def test_chart_explicit_scales():
+    df = pd.DataFrame({'x': np.arange(10), 'y': np.linspace(0.3, 9.7, 10),
+                       'z': np.linspace(1, 2, 10)})
+    chart = df.vgplot.line(explicit_scales=True)
+    validate_vegalite(chart)
+    spec = chart.to_dict()
+    assert spec['encoding']['x']['scale'] == {'domain': [0, 9]}
+    assert spec['encoding']['y']['scale'] == {'domain': [0, 10]}
+    assert spec['encoding']['order'] == {'value': 0}
+
+    shuffled = df.sample(frac=1, random_state=0)
+    chart = shuffled.vgplot.line(x='y', y='x', explicit_scales=True)
+    assert chart.to_dict()['encoding']['order']['field'] == 'index'
+
+    chart = df.vgplot.scatter('x', 'z', explicit_scales=True)
+    validate_vegalite(chart)
+    spec = chart.to_dict()
+    assert spec['encoding']['y']['scale'] == {'domain': [0, 2]}
+    assert 'order' not in spec['encoding']
+
+    # stacked and binned channels are left to Vega-Lite
+    spec = df.vgplot.area(explicit_scales=True).to_dict()
+    assert 'domain' not in spec['encoding']['y'].get('scale', {})
+    spec = df.vgplot.hist(explicit_scales=True).to_dict()
+    assert 'scale' not in spec['encoding']['x']
@@ -0,0 +1,54 @@
+import json
+import subprocess
+import sys
+
+import pytest
+
+# A generous bound on the time to import pdvega once pandas is loaded, in
+# seconds, to catch gross regressions on busy CI machines. Heavy
+# dependencies being imported eagerly are caught by test_import_is_lazy.
+IMPORT_BUDGET = 2.0
+
+SCRIPT = """
+import json, sys
+from timeit import default_timer
+import pandas
+start = default_timer()
+import pdvega
+elapsed = default_timer() - start
+print(json.dumps({
+    'elapsed': elapsed,
+    'modules': [name for name in ('altair', 'scipy', 'jsonschema')
+                if name in sys.modules],
+    'accessors': [hasattr(pandas.Series, 'vgplot'),
+                  hasattr(pandas.DataFrame, 'vgplot')],
+}))
+"""
+
+
+def run_import():
+    output = subprocess.check_output([sys.executable, '-c', SCRIPT])
+    return json.loads(output.decode('utf-8').strip().splitlines()[-1])
+
+
+def test_import_is_lazy():
+    result = run_import()
+    assert result['modules'] == []
+    assert result['accessors'] == [True, True]
+
+
+def test_import_time_budget():
+    # take the best of a few runs to reduce the noise of a busy machine
+    elapsed = min(run_import()['elapsed'] for _ in range(3))
+    assert elapsed < IMPORT_BUDGET
+
+
+def test_lazy_module():
+    from pdvega._lazy import LazyModule
+    json_module = LazyModule('json')
+    assert 'not yet loaded' in repr(json_module)
+    assert json_module.dumps([1]) == '[1]'
+    assert '(loaded)' in repr(json_module)
+    assert json_module.loads is json.loads
+    with pytest.raises(AttributeError):
+        json_module.not_an_attribute
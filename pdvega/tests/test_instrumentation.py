@@ -0,0 +1,91 @@
+import json
+
+import numpy as np
+import pandas as pd
+import pytest
+
+import pdvega
+from pdvega import instrumentation
+
+
+@pytest.fixture
+def df():
+    rand = np.random.RandomState(0)
+    return pd.DataFrame(rand.randn(100, 3), columns=['a', 'b', 'c'])
+
+
+def test_disabled_stage_is_shared():
+    assert instrumentation.stage('build') is instrumentation.stage('reshape')
+
+
+def test_instrument_events(df):
+    with pdvega.instrument() as timer:
+        df.vgplot.line()
+    assert instrumentation._callbacks == []
+
+    stages = [event.stage for event in timer.events]
+    assert stages[-1] == 'call'
+    assert {'reshape', 'infer', 'build', 'finalize'} <= set(stages)
+    assert all(event.kind == 'line' for event in timer.events)
+    assert all(event.call_site.startswith(__file__.rstrip('c'))
+               for event in timer.events)
+
+    reshape, = [event for event in timer.events if event.stage == 'reshape']
+    assert reshape.rows_in == 100
+    assert reshape.rows_out == 300
+    assert reshape.nbytes > 0
+
+    call = timer.events[-1]
+    nested = sum(event.seconds for event in timer.events
+                 if event.stage in ('reshape', 'build', 'finalize'))
+    assert call.self_seconds == pytest.approx(call.seconds - nested)
+
+
+def test_nested_calls_attributed_to_outer_kind(df):
+    events = []
+    with pdvega.instrument(events.append):
+        df.vgplot.kde()
+    assert 'kde' in [event.stage for event in events]
+    assert [event.stage for event in events].count('call') == 1
+    assert {event.kind for event in events} == {'kde'}
+
+
+def test_register_callback(df):
+    events = []
+    instrumentation.register_callback(events.append)
+    try:
+        pdvega.lag_plot(df.a)
+    finally:
+        instrumentation.unregister_callback(events.append)
+    assert events[-1].stage == 'call'
+    assert events[-1].kind == 'lag_plot'
+    count = len(events)
+    df.vgplot.line()
+    assert len(events) == count
+
+
+def test_stage_timer_table(df):
+    with pdvega.instrument() as timer:
+        df.vgplot.line()
+        df.vgplot.hist()
+    summary = timer.summary()
+    assert list(summary)[:2] == ['reshape', 'infer']
+    assert summary['call']['count'] == 2
+    assert sum(entry['self_seconds'] for entry in summary.values()) == pytest.approx(
+        sum(event.seconds for event in timer.events if event.stage == 'call'))
+
+    table = timer.table(by='kind')
+    assert table.splitlines()[0].split()[0] == 'kind'
+    assert 'hist' in table and 'total' in table
+
+
+def test_serialize_stage(df):
+    chart = df.vgplot.line()
+    with pdvega.instrument() as timer:
+        spec = chart.to_dict()
+    stages = [event.stage for event in timer.events]
+    assert stages == ['serialize', 'call']
+    serialize = timer.events[0]
+    assert serialize.kind == 'to_dict'
+    assert serialize.nbytes == len(json.dumps(spec))
+    assert serialize.call_site.startswith(__file__.rstrip('c'))
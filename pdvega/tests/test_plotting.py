@@ -111,6 +111,109 @@ def test_andrews_curves():
     assert len(df) == n_samples * n_points
 
 
+def test_parallel_coordinates_bands():
+    rng = np.random.RandomState(0)
+    data = pd.DataFrame(rng.rand(100, 3), columns=list('xyz'))
+    data['c'] = list('AB') * 50
+    plot = pdvega.parallel_coordinates(data, 'c', summary='bands',
+                                       quantiles=(0.1, 0.9))
+    utils.validate_vegalite(plot)
+    spec = plot.to_dict()
+    assert spec['layer'][1]['encoding']['x']['field'] == 'variable'
+    assert spec['layer'][1]['encoding']['y']['field'] == 'value'
+
+    df = utils.get_data(plot)
+    assert len(df) == 2 * 3
+    row = df[(df['c'] == 'A') & (df['variable'] == 'y')].iloc[0]
+    yA = data.loc[data['c'] == 'A', 'y']
+    assert np.allclose(row[['lower', 'value', 'upper']].astype(float),
+                       yA.quantile([0.1, 0.5, 0.9]))
+
+    for quantiles in [(0.75, 0.25), (0.5, 0.9)]:
+        with pytest.raises(ValueError):
+            pdvega.parallel_coordinates(data, 'c', summary='bands',
+                                        quantiles=quantiles)
+
+
+def test_parallel_coordinates_max_lines_normalize():
+    data = pd.DataFrame({'x': range(100), 'y': np.arange(100) * 10.0,
+                         'c': list('AB') * 50})
+    plot = pdvega.parallel_coordinates(data, 'c', max_lines=10,
+                                       normalize='minmax', random_state=0)
+    utils.validate_vegalite(plot)
+    df = utils.get_data(plot)
+    assert df['index'].nunique() == 10
+    assert len(df) == 10 * 2
+    # normalization uses the full data, and is applied before sampling
+    for _, group in df.groupby('index'):
+        assert np.allclose(group['value'], group['index'] / 99)
+
+    with pytest.raises(ValueError):
+        pdvega.parallel_coordinates(data, 'c', normalize='blah')
+
+
+def _andrews_reference(data, class_column, samples):
+    t = np.linspace(-np.pi, np.pi, samples)
+    vals = data.drop(class_column, axis=1).values.T
+    curves = np.outer(vals[0], np.ones_like(t))
+    for i in range(1, len(vals)):
+        ft = ((i + 1) // 2) * t
+        if i % 2 == 1:
+            curves += np.outer(vals[i], np.sin(ft))
+        else:
+            curves += np.outer(vals[i], np.cos(ft))
+    return curves
+
+
+@pytest.mark.parametrize('dtype', [np.float64, np.float32])
+@pytest.mark.parametrize('block_size', [50, 2 ** 20])
+def test_andrews_curves_values(dtype, block_size):
+    rng = np.random.RandomState(0)
+    data = pd.DataFrame(rng.rand(30, 4), columns=list('abcd'))
+    data['c'] = list('ABC') * 10
+    plot = pdvega.andrews_curves(data, 'c', samples=20, dtype=dtype,
+                                 block_size=block_size)
+    df = utils.get_data(plot)
+    expected = _andrews_reference(data, 'c', 20)
+    assert np.allclose(df[' '].values.reshape(expected.shape), expected,
+                       rtol=1E-5, atol=1E-5)
+    assert list(df['c'][::20]) == list(data['c'])
+
+
+def test_andrews_curves_max_curves():
+    data = pd.DataFrame({'x': range(100), 'y': range(100),
+                         'c': list('AB') * 50})
+    plot = pdvega.andrews_curves(data, 'c', samples=10, max_curves=20,
+                                 random_state=0)
+    utils.validate_vegalite(plot)
+    df = utils.get_data(plot)
+    assert len(df) == 20 * 10
+    assert df['sample'].nunique() == 20
+
+
+def test_andrews_curves_bands():
+    rng = np.random.RandomState(0)
+    data = pd.DataFrame(rng.rand(200, 3), columns=list('xyz'))
+    data['c'] = list('AB') * 100
+    plot = pdvega.andrews_curves(data, 'c', samples=50, summary='bands',
+                                 block_size=1000)
+    utils.validate_vegalite(plot)
+    spec = plot.to_dict()
+    assert spec['layer'][0]['mark'] == {'type': 'area', 'opacity': 0.3}
+    assert spec['layer'][1]['mark'] == 'line'
+
+    df = utils.get_data(plot)
+    assert len(df) == 2 * 50
+    assert (df['lower'] <= df[' ']).all() and (df[' '] <= df['upper']).all()
+
+    curves = _andrews_reference(data[data['c'] == 'A'], 'c', 50)
+    median = df[df['c'] == 'A'][' '].values
+    assert np.allclose(median, np.median(curves, axis=0))
+
+    with pytest.raises(ValueError):
+        pdvega.andrews_curves(data, 'c', summary='blah')
+
+
 @pytest.mark.parametrize('lag', [1, 5])
 def test_lag_plot(lag):
     data = pd.DataFrame({'x': range(10),
@@ -140,3 +243,58 @@ def test_lag_plot(lag):
     utils.check_encodings(plot, x='y(t)', y='y(t + {0})'.format(lag),
                           color='variable')
     assert lag_data.shape == (2 * (data.shape[0] - lag), 3)
+
+
+def test_lag_plot_multiple_lags():
+    data = pd.DataFrame({'x': np.arange(20.0), 'y': np.arange(20.0) ** 2})
+    lags = [1, 2, 7]
+
+    plot = pdvega.lag_plot(data['x'], lag=lags)
+    utils.validate_vegalite(plot)
+    utils.check_encodings(plot, x='y(t)', y='y(t + lag)', column='lag')
+    lag_data = utils.get_data(plot)
+    assert len(lag_data) == sum(20 - lag for lag in lags)
+    assert np.all(lag_data['y(t + lag)'] - lag_data['y(t)'] == lag_data['lag'])
+
+    plot = pdvega.lag_plot(data, lag=lags)
+    utils.validate_vegalite(plot)
+    utils.check_encodings(plot, x='y(t)', y='y(t + lag)', column='lag',
+                          color='variable')
+    lag_data = utils.get_data(plot)
+    assert len(lag_data) == 2 * sum(20 - lag for lag in lags)
+    ydata = lag_data[lag_data['variable'] == 'y']
+    assert np.allclose(np.sqrt(ydata['y(t + lag)']) - np.sqrt(ydata['y(t)']),
+                       ydata['lag'])
+
+    with pytest.raises(ValueError):
+        pdvega.lag_plot(data, lag=[1, 0])
+
+
+def test_autocorrelation_plot():
+    rng = np.random.RandomState(0)
+    ser = pd.Series(rng.randn(100).cumsum(), name='x')
+    plot = pdvega.autocorrelation_plot(ser)
+    utils.validate_vegalite(plot)
+    spec = plot.to_dict()
+    assert spec['layer'][0]['mark'] == 'line'
+
+    acf = utils.get_data(plot.layer[0])
+    assert list(acf.columns) == ['lag', 'autocorrelation']
+    assert len(acf) == len(ser) - 1
+    centered = ser - ser.mean()
+    lag = 3
+    direct = (centered[:-lag].values * centered[lag:].values).sum() / (centered ** 2).sum()
+    assert np.isclose(acf['autocorrelation'][lag - 1], direct)
+
+    frame = pd.DataFrame({'x': ser, 'y': rng.randn(100)})
+    plot = pdvega.autocorrelation_plot(frame, max_lag=10)
+    utils.validate_vegalite(plot)
+    acf = utils.get_data(plot.layer[0])
+    assert len(acf) == 2 * 10
+    assert set(acf['variable']) == {'x', 'y'}
+
+    constant = pd.Series(np.full(20, 0.1), name='c')
+    with np.errstate(all='raise'):
+        plot = pdvega.autocorrelation_plot(constant)
+    acf = utils.get_data(plot.layer[0])
+    assert (acf['autocorrelation'] == 0).all()
@@ -0,0 +1,80 @@
+import base64
+import gzip
+import json
+import re
+
+import numpy as np
+import pandas as pd
+import pytest
+
+import pdvega
+from pdvega.report import extract_datasets, gzip_base64
+
+
+@pytest.fixture
+def df():
+    rand = np.random.RandomState(0)
+    return pd.DataFrame({'x': rand.rand(20), 'y': rand.rand(20)})
+
+
+def scripts(html, kind):
+    pattern = r'<script type="{0}" id="([^"]+)"[^>]*>(.*?)</script>'.format(kind)
+    return dict(re.findall(pattern, html, flags=re.S))
+
+
+def test_extract_datasets():
+    values = [{'a': 1}, {'a': 2}]
+    spec = {'layer': [{'data': {'values': values}, 'mark': 'point'},
+                      {'data': {'name': 'old'}, 'mark': 'line'}],
+            'datasets': {'old': list(values)}}
+    datasets = {}
+    names = extract_datasets(spec, datasets)
+    assert len(names) == 1
+    assert datasets == {names[0]: values}
+    assert 'datasets' not in spec
+    assert spec['layer'][0]['data'] == {'name': names[0]}
+    assert spec['layer'][1]['data'] == {'name': names[0]}
+
+
+def test_report_deduplicates_data(df):
+    report = pdvega.Report('My Report')
+    report.add(df.vgplot.scatter('x', 'y'), title='first')
+    report.add(df.vgplot.scatter('x', 'y', alpha=0.5), title='second')
+    report.add(df.vgplot.line())
+    specs, datasets = report.to_dict()
+    assert len(specs) == 3
+    assert specs[0][1] == specs[1][1]
+    assert len(datasets) == 2
+
+    html = report.to_html()
+    assert html.count('vega-embed@') == 1
+    assert html.count('<div class="pdvega-chart"') == 3
+    assert '<h2>first</h2>' in html
+    blocks = scripts(html, 'application/json')
+    data = {key[len('pdvega-data-'):]: json.loads(value)
+            for key, value in blocks.items() if key.startswith('pdvega-data-')}
+    assert data == datasets
+    spec = json.loads(blocks['pdvega-spec-0'])
+    assert spec['data'] == {'name': specs[0][1][0]}
+
+
+def test_report_compress(df):
+    report = pdvega.Report(compress=True).add(df.vgplot.line())
+    specs, datasets = report.to_dict()
+    blocks = scripts(report.to_html(), 'application/octet-stream')
+    assert len(blocks) == 1
+    name, = datasets
+    text = gzip.decompress(base64.b64decode(blocks['pdvega-data-' + name]))
+    assert json.loads(text.decode('utf-8')) == datasets[name]
+    assert gzip_base64('abc') == gzip_base64('abc')
+
+
+def test_report_escapes_script(tmpdir):
+    df = pd.DataFrame({'x': ['</script>', 'b'], 'y': [1, 2]})
+    report = pdvega.Report(lazy=False).add(df.vgplot.bar('x', 'y'))
+    path = str(tmpdir.join('report.html'))
+    report.save(path)
+    with open(path) as f:
+        html = f.read()
+    assert '</script>"' not in html
+    assert 'var lazy = false;' in html
@@ -0,0 +1,135 @@
+import numpy as np
+import pytest
+
+import pdvega
+from pdvega._utils import box_stats
+from pdvega.tests.utils import validate_vegalite
+
+
+@pytest.fixture
+def values():
+    return np.random.RandomState(0).randn(10000)
+
+
+def test_fixed_histogram(values):
+    hist = pdvega.Histogram(range=(-2, 2), bins=8)
+    for chunk in np.array_split(values, 3):
+        hist.update(chunk)
+    counts, _ = np.histogram(values, bins=np.linspace(-2, 2, 9))
+    assert hist.counts.tolist() == counts.tolist()
+    assert hist.outside == (abs(values) > 2).sum()
+
+    other = pdvega.Histogram(edges=hist.edges).update(values)
+    assert (hist.merge(other).counts == 2 * counts).all()
+    with pytest.raises(ValueError):
+        hist.merge(pdvega.Histogram())
+
+
+def test_histogram_sketch(values):
+    hist = pdvega.Histogram(max_bins=64)
+    for chunk in np.array_split(values, 5):
+        hist.update(chunk)
+    assert hist.count == len(values)
+    assert len(hist.counts) <= 64
+    assert np.log2(hist.step) % 1 == 0
+    edges = hist.edges
+    assert (edges[0] <= values.min()) and (values.max() < edges[-1])
+    counts, _ = np.histogram(values, bins=edges)
+    assert hist.counts.tolist() == counts.tolist()
+
+    # partials with different bin widths merge exactly
+    left = pdvega.Histogram(max_bins=64).update(values[:10])
+    right = pdvega.Histogram(max_bins=64).update(values[10:])
+    assert left.step != right.step
+    assert left.merge(right).counts.tolist() == hist.counts.tolist()
+
+    frame = hist.to_frame(bins=10)
+    assert len(frame) <= 10
+    assert frame['count'].sum() == len(values)
+
+
+def test_histogram_chart(values):
+    hist = pdvega.Histogram(name='x').update(values)
+    chart = hist.to_chart(bins=10, histtype='step', alpha=0.5)
+    validate_vegalite(chart)
+    spec = chart.to_dict()
+    assert spec['mark'] == {'type': 'line', 'interpolate': 'step'}
+    assert spec['encoding']['x']['field'] == 'x'
+    assert set(spec['encoding']['x']['bin']) == {'extent', 'step', 'nice'}
+    assert chart.data['count'].sum() == len(values)
+
+    # edges which are not multiples of the step are drawn where they are
+    hist = pdvega.Histogram(range=(0.5, 10.5), bins=10).update(values + 5)
+    spec = hist.to_chart().to_dict()
+    assert spec['encoding']['x']['bin'] == {'extent': [0.5, 10.5], 'step': 1.0,
+                                            'nice': False}
+
+    hist = pdvega.Histogram(edges=[-5, -1, 0, 1, 5]).update(values)
+    chart = hist.to_chart(builder='dict')
+    validate_vegalite(chart)
+    spec = chart.to_dict()
+    assert spec['encoding']['x2']['field'] == 'end'
+    assert chart.data['count'].tolist() == hist.counts.tolist()
+
+
+@pytest.mark.parametrize('bw_method', [None, 'silverman', 0.3])
+def test_density(values, bw_method):
+    from scipy.stats import gaussian_kde
+
+    density = pdvega.Density(bw_method=bw_method)
+    other = pdvega.Density(bw_method=bw_method)
+    density.update(values[:5000])
+    other.update(values[5000:])
+    density.merge(other)
+    assert density.n == len(values)
+    assert np.isclose(density.variance, values.var(ddof=1))
+    t = np.linspace(-3, 3, 25)
+    expected = gaussian_kde(values, bw_method=bw_method).evaluate(t)
+    assert np.allclose(density.evaluate(t), expected, atol=1e-3)
+
+    chart = density.to_chart()
+    validate_vegalite(chart)
+    assert len(chart.data) == 1000
+
+
+def test_density_invalid():
+    with pytest.raises(ValueError):
+        pdvega.Density(bw_method='wide')
+    with pytest.raises(ValueError):
+        pdvega.Density().update([1.0]).evaluate([0.0])
+
+
+def test_quantile_sketch():
+    values = np.random.RandomState(0).standard_t(3, 100000)
+    sketch = pdvega.QuantileSketch(k=128, max_outliers=20)
+    for chunk in np.array_split(values, 40):
+        sketch.update(chunk)
+    other = pdvega.QuantileSketch(k=128, max_outliers=20).update(values)
+    sketch.merge(other)
+    assert sketch.n == 2 * len(values)
+    assert sketch.size < 2000
+    assert sketch.min == values.min() and sketch.max == values.max()
+
+    q = np.linspace(0, 1, 21)
+    ranks = np.searchsorted(np.sort(values), sketch.quantile(q)) / len(values)
+    assert np.abs(ranks - q).max() < 0.02
+
+    stats, outliers = sketch.box_stats()
+    assert stats['count'] == 2 * len(values)
+    assert stats['lower'] < stats['q1'] < stats['median'] < stats['q3'] < stats['upper']
+    assert len(outliers) == 20 and outliers.max() == values.max()
+
+
+def test_quantile_sketch_exact():
+    values = np.random.RandomState(0).standard_t(2, 100)
+    sketch = pdvega.QuantileSketch().update(values[:50]).merge(
+        pdvega.QuantileSketch().update(values[50:]))
+    assert np.allclose(sketch.quantile([0.1, 0.5, 0.9]),
+                       np.quantile(values, [0.1, 0.5, 0.9]))
+    stats, outliers = box_stats(values)
+    assert sketch.box_stats()[0] == stats
+    assert sketch.box_stats()[1].tolist() == outliers.tolist()
+
+    chart = sketch.to_chart(vert=False)
+    validate_vegalite(chart)
+    assert chart.layer[2].data['median'].tolist() == [stats['median']]
@@ -0,0 +1,88 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+import altair as alt
+import pdvega
+from pdvega import _validation
+from pdvega._spec import VegaLiteSpec
+
+
+@pytest.fixture
+def df():
+    rand = np.random.RandomState(0)
+    df = pd.DataFrame(rand.randn(50, 3), columns=['a', 'b', 'c'])
+    df['g'] = rand.choice(['x', 'y'], 50)
+    return df
+
+
+@pytest.mark.parametrize('kind,kwds', [
+    ('line', {}),
+    ('area', {}),
+    ('bar', {}),
+    ('barh', {}),
+    ('hist', {'bins': 5}),
+    ('kde', {}),
+    ('scatter', {'x': 'a', 'y': 'b', 'c': 'g', 's': 'c', 'alpha': 0.5}),
+    ('heatmap', {'x': 'a', 'y': 'b', 'C': 'c'}),
+    ('line', {'x': 'a', 'y': 'b', 'by': 'g', 'facet': 'column'}),
+])
+def test_dict_builder_matches_altair(df, kind, kwds):
+    data = df if 'x' in kwds else df[['a', 'b']]
+    expected = getattr(data.vgplot, kind)(**kwds)
+    spec = getattr(data.vgplot, kind)(builder='dict', **kwds)
+    assert isinstance(spec, VegaLiteSpec)
+    assert spec.to_dict() == expected.to_dict()
+    assert spec.to_chart().to_dict() == expected.to_dict()
+
+
+def test_dict_builder_series(df):
+    expected = df.a.vgplot.hist(title='a')
+    with pdvega.set_options(builder='dict'):
+        spec = df.a.vgplot.hist(title='a')
+    assert spec.to_dict() == expected.to_dict()
+
+
+def test_dict_builder_options(df):
+    df['t'] = pd.date_range('2018', periods=len(df))
+    kwds = dict(x='t', y='a', temporal_encoding='epoch', precision=2,
+                dictionary_encode=True)
+    expected = df.vgplot.line(**kwds)
+    spec = df.vgplot.line(builder='dict', **kwds)
+    assert spec.to_dict() == expected.to_dict()
+    assert spec.to_dict()['encoding']['x']['scale'] == {'type': 'utc'}
+
+
+def test_dict_builder_layering(df):
+    chart = df.vgplot.scatter('a', 'b')
+    layered = df.vgplot.line('a', 'b', builder='dict', ax=chart)
+    assert isinstance(layered, alt.LayerChart)
+    assert len(layered.to_dict()['layer']) == 2
+
+    layered = df.vgplot.line('a', 'b', builder='dict') + chart
+    assert isinstance(layered, alt.LayerChart)
+
+
+def test_validated_once_per_template(df, monkeypatch):
+    calls = []
+    validate = alt.Chart.validate
+    monkeypatch.setattr(_validation, '_validated_shapes', set())
+    monkeypatch.setattr(alt.Chart, 'validate',
+                        lambda spec: calls.append(spec) or validate(spec))
+    for col in ['a', 'b', 'c']:
+        df[[col]].vgplot.line(builder='dict', title=col).to_dict()
+    assert len(calls) == 1
+    df.vgplot.scatter('a', 'b', builder='dict').to_dict()
+    assert len(calls) == 2
+
+
+def test_invalid_spec_raises():
+    spec = VegaLiteSpec(mark='nonsense')
+    with pytest.raises(Exception):
+        spec.to_dict()
+    assert spec.to_dict(validate=False)['mark'] == 'nonsense'
+
+
+def test_invalid_builder(df):
+    with pytest.raises(ValueError):
+        df.vgplot.line(builder='vega')
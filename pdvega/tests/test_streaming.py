@@ -0,0 +1,107 @@
+import json
+
+import numpy as np
+import pandas as pd
+import pytest
+
+import pdvega
+from pdvega.streaming import ROW_FIELD
+from pdvega.tests.utils import validate_vegalite
+
+
+def series(start, stop):
+    index = pd.date_range('2018', periods=stop, freq='s')[start:]
+    return pd.Series(np.arange(start, stop, dtype=float), index=index, name='v')
+
+
+def apply(values, changeset):
+    """Apply a changeset as a client would"""
+    cutoff = changeset['remove_below']
+    if cutoff is not None:
+        values = [row for row in values if row[ROW_FIELD] >= cutoff]
+    return values + changeset['insert']
+
+
+def test_append():
+    stream = pdvega.StreamingChart(series(0, 5), 'line')
+    spec = stream.to_dict()
+    assert spec['data'] == {'name': 'stream'}
+    values = spec['datasets']['stream']
+    assert [row['v'] for row in values] == [0, 1, 2, 3, 4]
+
+    changeset = stream.append(series(5, 7))
+    assert changeset['remove_below'] is None
+    assert [row['v'] for row in changeset['insert']] == [5, 6]
+    values = apply(values, changeset)
+    assert values == stream.to_dict()['datasets']['stream']
+    assert stream.append(series(7, 7))['insert'] == []
+
+
+def test_row_window():
+    df = pd.DataFrame({'a': np.arange(4.), 'b': np.arange(4.)})
+    stream = pdvega.StreamingChart(df, 'area', window=3)
+    assert len(stream) == 3
+    values = stream.to_dict()['datasets']['stream']
+
+    new = pd.DataFrame({'a': [4.], 'b': [5.]}, index=[4])
+    changeset = stream.append(new)
+    assert changeset['remove_below'] == 2
+    # only the new row is sent, though the window ends within a batch
+    assert sorted(row[ROW_FIELD] for row in changeset['insert']) == [4, 4]
+    values = apply(values, changeset)
+    chart = stream.to_chart()
+    validate_vegalite(chart)
+    assert values == chart.to_dict()['datasets']['stream']
+    assert sorted(row['index'] for row in values) == [2, 2, 3, 3, 4, 4]
+
+    # a batch larger than the window
+    new = pd.DataFrame({'a': np.arange(5.), 'b': np.arange(5.)}, index=range(5, 10))
+    values = apply(values, stream.append(new))
+    assert sorted({row['index'] for row in values}) == [7, 8, 9]
+
+
+def test_time_window():
+    transport = pdvega.QueueTransport()
+    stream = pdvega.StreamingChart(series(0, 5), 'line', window='3s',
+                                   transport=transport, builder='dict')
+    assert stream.data.index[0] == pd.Timestamp('2018-01-01 00:00:02')
+    values = stream.to_dict()['datasets']['stream']
+    changeset = stream.append(series(5, 7))
+    assert transport.receive(timeout=1) is changeset
+    values = apply(values, changeset)
+    assert [row['v'] for row in values] == [4, 5, 6]
+
+    with pytest.raises(ValueError):
+        pdvega.StreamingChart(series(0, 5).reset_index(drop=True), window='3s')
+
+
+def test_json_transport():
+    sent = []
+    df = series(0, 3).to_frame().assign(w=1.0)
+    stream = pdvega.StreamingChart(df[:2], 'scatter', x='v', y='w',
+                                   transport=pdvega.JSONTransport(sent.append))
+    stream.append(df[2:])
+    assert json.loads(sent[0])['insert'] == [{'v': 2.0, 'w': 1.0, ROW_FIELD: 2}]
+
+
+def test_invalid():
+    with pytest.raises(ValueError):
+        pdvega.StreamingChart(series(0, 5), 'kde')
+    with pytest.raises(ValueError):
+        pdvega.StreamingChart(series(0, 5), 'area', aggregate='sum')
+    stream = pdvega.StreamingChart(series(0, 5), 'line')
+    with pytest.raises(TypeError):
+        stream.append(series(5, 6).to_frame())
+
+
+def test_auto_precision_disabled():
+    values = pd.Series([0.123456789, 0.5, 1000.987654321], name='v')
+    with pdvega.set_options(precision='auto', quantize='auto'):
+        stream = pdvega.StreamingChart(values[:2], 'line')
+        changeset = stream.append(values[2:].copy())
+    rows = stream.to_dict()['datasets']['stream']
+    assert [row['v'] for row in rows] == values.tolist()
+    assert [row['v'] for row in changeset['insert']] == [1000.987654321]
+
+    stream = pdvega.StreamingChart(values, 'line', precision=2)
+    assert [row['v'] for row in stream.to_dict()['datasets']['stream']] == [0.12, 0.5, 1000.99]
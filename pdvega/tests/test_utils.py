@@ -3,7 +3,22 @@ import pytest
 import pandas as pd
 import numpy as np
 
-from pdvega._utils import infer_vegalite_type, unpivot_frame, validate_aggregation
+from pdvega._utils import (
+    infer_vegalite_type,
+    unpivot_frame,
+    validate_aggregation,
+    parallel_map,
+    resolve_n_jobs,
+    downsample_groups,
+    top_k_categories,
+    aggregate_duplicates,
+    stack_offsets,
+    validate_stack,
+    box_stats,
+    sample_by_rank,
+    count_distinct,
+    series_count,
+)
 
 test_cases = [
     (pd.Series(np.random.rand(20)), 'quantitative'),
@@ -82,3 +97,200 @@ def test_validate_aggregation():
     with pytest.raises(ValueError) as err:
         validate_aggregation(np.array)
     assert str(err.value).startswith("Unrecognized Vega-Lite aggregation")
+
+
+@pytest.mark.parametrize('n_jobs', [None, 1, 3, -1])
+def test_parallel_map(n_jobs):
+    items = list(range(20))
+    assert parallel_map(lambda i: i ** 2, items, n_jobs=n_jobs) == [i ** 2 for i in items]
+    assert parallel_map(len, [], n_jobs=n_jobs) == []
+
+
+def test_resolve_n_jobs():
+    assert resolve_n_jobs(None) == 1
+    assert resolve_n_jobs(4) == 4
+    assert resolve_n_jobs(-1) >= 1
+
+    with pytest.raises(ValueError):
+        resolve_n_jobs(0)
+    with pytest.raises(ValueError):
+        resolve_n_jobs(1.5)
+
+
+def test_unpivot_by():
+    frame = pd.DataFrame({'x': range(4), 'y': range(4), 'g': list('abab')})
+    df = unpivot_frame(frame, by='g')
+    assert list(df.columns) == ['index', 'g', 'variable', 'value']
+    assert set(pd.unique(df['variable'])) == {'x', 'y'}
+
+    df = unpivot_frame(frame, x='x', by='g')
+    assert list(df.columns) == ['x', 'g', 'variable', 'value']
+    assert set(pd.unique(df['variable'])) == {'y'}
+
+
+def test_downsample_groups():
+    frame = pd.DataFrame({'g': ['a'] * 10 + ['b'] * 3,
+                          'x': np.arange(13.0),
+                          't': pd.date_range('2017', periods=13)})
+
+    df = downsample_groups(frame, ['g'], 5)
+    assert list(df['x']) == [0, 2, 4, 6, 8, 10, 11, 12]
+
+    df = downsample_groups(frame, ['g'], 5, method='mean')
+    assert list(df['g']) == ['a'] * 5 + ['b'] * 3
+    assert list(df['x']) == [0.5, 2.5, 4.5, 6.5, 8.5, 10, 11, 12]
+    assert df['t'].iloc[0] == pd.Timestamp('2017-01-01 12:00')
+
+    df = downsample_groups(frame, [], 4)
+    assert list(df['x']) == [0, 4, 8, 12]
+
+    assert downsample_groups(frame, ['g'], 20) is frame
+
+    with pytest.raises(ValueError):
+        downsample_groups(frame, ['g'], 5, method='median')
+
+
+def test_top_k_categories():
+    frame = pd.DataFrame({'x': list('abcde') * 2,
+                          'variable': ['u'] * 5 + ['v'] * 5,
+                          'value': [5, 1, 4, 2, 3, 1, 1, 1, 1, 1]})
+
+    df = top_k_categories(frame, 'x', 'value', 2, keys=['variable'])
+    assert list(df['x']) == ['a', 'c', 'a', 'c', 'other', 'other']
+    assert list(df['value']) == [5, 4, 1, 1, 6, 3]
+    assert list(df['variable']) == ['u', 'u', 'v', 'v', 'u', 'v']
+
+    df = top_k_categories(frame, 'x', 'value', 3, other_label='rest')
+    assert set(df['x']) == {'a', 'c', 'e', 'rest'}
+    assert df['value'].sum() == frame['value'].sum()
+
+    assert top_k_categories(frame, 'x', 'value', 5) is frame
+
+    with pytest.raises(ValueError):
+        top_k_categories(frame, 'x', 'value', 0)
+
+
+def test_aggregate_duplicates():
+    frame = pd.DataFrame({'x': [1, 1, 2, 1, 2],
+                          'variable': list('aabba'),
+                          'value': [1.0, 2.0, 3.0, 4.0, 5.0]})
+    keys = ['x', 'variable']
+
+    df = aggregate_duplicates(frame, keys, 'value', 'sum')
+    assert list(df.columns) == ['x', 'variable', 'value']
+    assert df.values.tolist() == [[1, 'a', 3.0], [2, 'b', 3.0], [1, 'b', 4.0],
+                                  [2, 'a', 5.0]]
+
+    df = aggregate_duplicates(frame, keys, 'value', np.max)
+    assert list(df['value']) == [2.0, 3.0, 4.0, 5.0]
+    df = aggregate_duplicates(frame, keys, 'value', 'count')
+    assert list(df['value']) == [2, 1, 1, 1]
+
+    assert aggregate_duplicates(frame, ['x', 'value'], 'value', 'sum') is frame
+
+    # rows with a missing x are not dropped
+    frame.loc[3:, 'x'] = np.nan
+    df = aggregate_duplicates(frame, keys, 'value', 'sum')
+    assert df.values.tolist()[:2] == [[1, 'a', 3.0], [2, 'b', 3.0]]
+    assert df['value'].tolist()[2:] == [4.0, 5.0]
+    assert df['x'].isnull().sum() == 2
+    df = aggregate_duplicates(frame, keys, 'value', 'count')
+    assert list(df['value']) == [2, 1, 1, 1]
+    frame.loc[0, 'x'] = 3
+    frame.loc[4, 'variable'] = 'c'
+    assert aggregate_duplicates(frame, ['x', 'variable'], 'value', 'sum') is frame
+    with pytest.raises(ValueError):
+        aggregate_duplicates(frame, keys, 'value', 'mode')
+
+
+def test_validate_stack():
+    assert validate_stack(True) == 'zero'
+    assert validate_stack(False) is None
+    assert validate_stack('center') == 'center'
+    with pytest.raises(ValueError):
+        validate_stack('silhouette')
+
+
+@pytest.mark.parametrize('offset,start,end', [
+    ('zero', [2, 0, 0, 1, 0], [3, 2, -1, 4, 1]),
+    ('normalize', [0.75, 0.25, 0, 0.25, 0], [1, 0.75, 0.25, 1, 0.25]),
+    ('center', [3, 1, 0, 1, 0], [4, 3, 1, 4, 1]),
+])
+def test_stack_offsets(offset, start, end):
+    frame = pd.DataFrame({'x': [1, 1, 1, 2, 2],
+                          'variable': ['b', 'a', 'c', 'a', 'b'],
+                          'value': [2.0, 1.0, -1.0, 3.0, 1.0]})
+    df = stack_offsets(frame, 'x', 'variable', 'value', offset)
+    assert list(df.columns) == ['x', 'variable', 'value', 'start', 'end']
+    assert list(df['variable']) == ['a', 'b', 'c', 'a', 'b']
+    assert np.allclose(df['start'], start)
+    assert np.allclose(df['end'], end)
+
+
+def test_stack_offsets_fill_groups():
+    frame = pd.DataFrame({'x': [1, 1, 2, 1],
+                          'g': ['p', 'p', 'p', 'q'],
+                          'variable': ['a', 'b', 'a', 'b'],
+                          'value': [1.0, 2.0, 3.0, 4.0]})
+    df = stack_offsets(frame, 'x', 'variable', 'value', 'center', keys=['g'],
+                       fill=True)
+    assert len(df) == 6
+    assert list(df.columns) == ['g', 'x', 'variable', 'value', 'start', 'end']
+    # the tallest stack in group p is 3: the stack at x=2 is centered on it
+    p2 = df[(df.g == 'p') & (df.x == 2)]
+    assert p2['start'].tolist() == [0, 0] and p2['end'].tolist() == [3, 0]
+    q1 = df[df.g == 'q']
+    assert q1['start'].tolist() == [4, 0] and q1['end'].tolist() == [4, 4]
+
+
+@pytest.mark.parametrize('n', [2, 7, 1000])
+def test_box_stats(n):
+    values = np.random.RandomState(n).standard_t(2, n)
+    values[::5] = np.nan
+    stats, outliers = box_stats(values, max_outliers=10)
+    ser = pd.Series(values).dropna()
+    q1, median, q3 = ser.quantile([0.25, 0.5, 0.75])
+    assert stats['count'] == len(ser)
+    assert np.allclose([stats['q1'], stats['median'], stats['q3']], [q1, median, q3])
+    low, high = q1 - 1.5 * (q3 - q1), q3 + 1.5 * (q3 - q1)
+    inside = ser[(ser >= low) & (ser <= high)]
+    assert stats['lower'] == inside.min() and stats['upper'] == inside.max()
+    beyond = np.sort(ser[(ser < low) | (ser > high)])
+    assert len(outliers) == min(len(beyond), 10)
+    assert set(outliers) <= set(beyond)
+    assert box_stats([np.nan])[0] is None
+
+
+def test_sample_by_rank():
+    assert sample_by_rank([3, 1, 2], 5).tolist() == [1, 2, 3]
+    assert sample_by_rank(np.arange(100)[::-1], 3).tolist() == [0, 50, 99]
+
+
+def test_count_distinct():
+    cat = pd.Categorical(['a', 'b', None, 'a'], categories=['a', 'b', 'c'])
+    assert count_distinct(cat) == 2
+    assert count_distinct(np.arange(10000) % 7 - 3) == 7
+    assert count_distinct([1.5, np.nan, 1.5, 2.5]) == 2
+    assert count_distinct([]) == 0
+    assert count_distinct(pd.Series([1, None, 3, 1], dtype='Int64')) == 2
+    assert count_distinct(pd.Series([None, None], dtype='Int64')) == 0
+    assert infer_vegalite_type(pd.Series([1, None, 3], dtype='Int64')) == 'ordinal'
+
+    # the leading slice already exceeds the limit
+    assert count_distinct(np.arange(10 ** 5) * 1.5, limit=20) == 4096
+
+
+def test_count_distinct_estimate():
+    values = np.array(['v{0}'.format(i) for i in range(50000)] * 2 + [None],
+                      dtype=object)
+    assert count_distinct(values) == 50000
+    estimate = count_distinct(values, exact_below=1000)
+    assert abs(estimate - 50000) < 0.03 * 50000
+
+
+def test_series_count():
+    df = pd.DataFrame({'x': [1], 'y': [2], 'z': [3], 'g': ['a']})
+    assert series_count(df) == 4
+    assert series_count(df, x='x', by='g') == 2
+    assert series_count(df, x='x', y='y') == 1
+    assert series_count(df, x='x', y=['y', 'z']) == 2
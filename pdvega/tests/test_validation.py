@@ -0,0 +1,101 @@
+import pickle
+
+import numpy as np
+import pandas as pd
+import pytest
+
+import altair as alt
+from pdvega import _validation
+from pdvega._validation import chart_class, spec_shape, validate_spec
+
+
+@pytest.fixture
+def df():
+    rand = np.random.RandomState(0)
+    return pd.DataFrame(rand.randn(100, 3), columns=['a', 'b', 'c'])
+
+
+@pytest.fixture
+def calls(monkeypatch):
+    calls = []
+    validate = alt.Chart.validate
+    monkeypatch.setattr(_validation, '_validated_shapes', set())
+    monkeypatch.setattr(alt.Chart, 'validate',
+                        lambda spec: calls.append(spec) or validate(spec))
+    return calls
+
+
+def test_spec_shape():
+    spec = {'mark': 'point', 'data': {'values': [{'a': 1}]},
+            'datasets': {'data-1': [{'a': 1}]}, 'title': 'A',
+            'encoding': {'x': {'field': 'a', 'type': 'quantitative'}}}
+    shape = spec_shape(spec)
+    assert shape == {'mark': 'point', 'data': {'name': 'data'}, 'title': '',
+                     'encoding': {'x': {'field': '', 'type': 'quantitative'}}}
+    assert spec_shape(dict(spec, title='B', data={'url': 'a.json'})) == shape
+
+
+def test_spec_shape_lookup_data():
+    def spec(values, width):
+        return {'mark': 'bar', 'width': width,
+                'transform': [{'lookup': 'a', 'from': {
+                    'data': {'values': values}, 'key': 'a', 'fields': ['b']}}],
+                'encoding': {'x': {'field': 'b', 'type': 'nominal'}}}
+    shape = spec_shape(spec([{'a': 0, 'b': 'x'}], 400))
+    assert shape['transform'][0]['from']['data'] == {'values': []}
+    assert spec_shape(spec([{'a': 1, 'b': 'y'}] * 3, 400)) == shape
+    assert spec_shape(spec([], 300)) != shape
+
+
+def test_validated_once_per_shape(df, calls):
+    assert validate_spec(df.vgplot.scatter('a', 'b').to_dict(validate=False))
+    for x, y in [('a', 'c'), ('b', 'c')]:
+        df.vgplot.scatter(x, y).to_dict()
+    assert len(calls) == 1
+    df.vgplot.scatter('a', 'b', alpha=0.5).to_dict()
+    assert len(calls) == 2
+
+    # dictionary-encoded labels differ per chart
+    df['d'] = np.repeat(['x', 'y'], 50)
+    for i in range(3):
+        df.iloc[i::3].assign(d=df['d'] + str(i)).vgplot.bar(
+            x='d', y='a', dictionary_encode=True).to_dict()
+    assert len(calls) == 3
+
+
+def test_numbers_are_validated(calls):
+    ser = pd.Series(np.arange(10.0))
+    ser.vgplot.hist(bins=10).to_dict()
+    with pytest.raises(Exception):
+        ser.vgplot.hist(bins=1).to_dict()
+
+
+def test_data_not_validated(df, calls):
+    with alt.data_transformers.enable(consolidate_datasets=False):
+        spec = df.vgplot.line().to_dict()
+    assert len(spec['data']['values']) == 300
+    assert calls[0]['data'] == {'name': 'data'}
+
+
+def test_invalid_chart_raises(df, calls):
+    chart = df.vgplot.scatter('a', 'b').encode(x=alt.X('a', bin='many'))
+    with pytest.raises(Exception):
+        chart.to_dict()
+    assert chart.to_dict(validate=False)['encoding']['x']['bin'] == 'many'
+
+
+def test_chart_class(df):
+    chart = df.vgplot.line()
+    assert isinstance(chart, alt.Chart)
+    assert type(chart) is chart_class()
+    assert type(chart.interactive()) is chart_class()
+    assert isinstance(chart + chart, alt.LayerChart)
+
+
+def test_chart_pickle(df):
+    chart = df.vgplot.scatter('a', 'b')
+    assert pickle.dumps(chart)
+    restore, args = chart.__reduce__()
+    restored = restore(*args)
+    assert type(restored) is chart_class()
+    assert restored.to_dict() == chart.to_dict()
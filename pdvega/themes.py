@@ -1,4 +1,4 @@
-import altair as alt
+from ._lazy import alt
 
 
 def enable(theme):